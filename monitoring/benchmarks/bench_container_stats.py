@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Container Stats Benchmark
+Compares per-container resource sampling from the Docker stats API with
+direct cgroup v2 file reads, as done by ContainerStatsCollector
+
+- naive: one blocking stats call per container (dockerd waits for a second
+  CPU sample on each call), as `docker stats --no-stream` does
+- api: one-shot stats calls fanned out over the collector's thread pool
+- cgroup: cpu.stat, memory.*, io.stat and net/dev reads from a cgroup tree
+  (the pid behind net/dev is inspected once, on the warm-up sample)
+
+The cgroup tree is generated in a temporary directory with the same file
+layout as /sys/fs/cgroup, so no Docker daemon is needed.
+
+Usage:
+    python3 bench_container_stats.py [--sizes 6 50 200] [--stats-latency 0.02] [--naive-max 6]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import docker
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'health-check'))
+
+from fake_docker import API_VERSION, FakeDockerServer, make_containers  # noqa: E402
+from container_stats import ContainerStatsCollector  # noqa: E402
+
+
+def build_cgroup_tree(root, proc, containers):
+    """Write cgroup v2 and /proc files for each container (systemd driver layout)"""
+    os.makedirs(proc, exist_ok=True)
+    with open(os.path.join(proc, 'meminfo'), 'w') as f:
+        f.write("MemTotal:       16384000 kB\nMemAvailable:    8192000 kB\n")
+    with open(os.path.join(root, 'cgroup.controllers'), 'w') as f:
+        f.write("cpuset cpu io memory pids\n")
+
+    for i, container in enumerate(containers):
+        directory = os.path.join(root, 'system.slice', f"docker-{container['id']}.scope")
+        os.makedirs(directory)
+        pid = str(container['pid'])
+        files = {
+            'cpu.stat': f"usage_usec {i * 1000000}\nuser_usec {i * 600000}\nsystem_usec {i * 400000}\n",
+            'memory.current': f"{(64 + i % 8 * 32) * 1048576}\n",
+            'memory.max': "max\n" if i % 2 else f"{1024 * 1048576}\n",
+            'memory.stat': "anon 50331648\nfile 16777216\ninactive_file 8388608\nactive_file 8388608\n",
+            'io.stat': f"8:0 rbytes={i * 4096} wbytes={i * 8192} rios=10 wios=20 dbytes=0 dios=0\n",
+        }
+        for name, content in files.items():
+            with open(os.path.join(directory, name), 'w') as f:
+                f.write(content)
+
+        net = os.path.join(proc, pid, 'net')
+        os.makedirs(net)
+        with open(os.path.join(proc, pid, 'cgroup'), 'w') as f:
+            f.write(f"0::/system.slice/docker-{container['id']}.scope\n")
+        with open(os.path.join(net, 'dev'), 'w') as f:
+            f.write("Inter-|   Receive                                                |  Transmit\n"
+                    " face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed\n"
+                    "    lo:     100       1    0    0    0     0          0         0      100       1    0    0    0     0       0          0\n"
+                    f"  eth0: {i * 2048}      10    0    0    0     0          0         0 {i * 1024}      10    0    0    0     0       0          0\n")
+
+
+def time_runs(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Docker stats API against cgroup v2 reads')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[6, 50, 200])
+    parser.add_argument('--stats-latency', type=float, default=0.02, help='Per stats call latency in seconds')
+    parser.add_argument('--precpu-delay', type=float, default=1.0,
+                        help='Extra wait of a non one-shot stats call in seconds')
+    parser.add_argument('--naive-max', type=int, default=6, help='Largest size to run the naive loop for')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'containers':>10} {'naive':>10} {'api':>10} {'cgroup':>10} {'api/cgroup':>11}")
+    for size in args.sizes:
+        containers = [c for c in make_containers(size) if c['state'] == 'running']
+        ids = {c['name']: c['id'] for c in containers}
+        server = FakeDockerServer(containers, stats_latency=args.stats_latency,
+                                  precpu_delay=args.precpu_delay).start()
+        try:
+            client = docker.APIClient(base_url=server.base_url, version=API_VERSION)
+
+            naive = None
+            if size <= args.naive_max:
+                def naive_loop():
+                    for container_id in ids.values():
+                        client.stats(container_id, stream=False)
+                naive = time_runs(naive_loop, 1)
+
+            api = ContainerStatsCollector(source='api', max_workers=args.workers)
+            api_time = time_runs(lambda: api.sample(client, ids), args.repeat)
+
+            with tempfile.TemporaryDirectory() as tmp:
+                root, proc = os.path.join(tmp, 'cgroup'), os.path.join(tmp, 'proc')
+                os.makedirs(root)
+                build_cgroup_tree(root, proc, containers)
+                cgroup = ContainerStatsCollector(source='cgroup', cgroup_root=root, proc_path=proc)
+                cgroup.sample(client, ids)  # resolve cgroup directories once, as the daemon does
+                cgroup_time = time_runs(lambda: cgroup.sample(client, ids), args.repeat)
+
+            naive_text = f"{naive * 1000:>8.1f}ms" if naive is not None else f"{'-':>10}"
+            print(f"{len(ids):>10} {naive_text} {api_time * 1000:>8.1f}ms {cgroup_time * 1000:>8.2f}ms "
+                  f"{api_time / cgroup_time:>10.0f}x")
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Container Check Benchmark
+Compares per-container inspect calls against the bulk snapshot used by
+HealthChecker.check_containers, using the fake Docker Engine API
+
+Usage:
+    python3 bench_containers.py [--sizes 6 50 200] [--latency 0.002] [--inspect-latency 0.004]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import docker
+import yaml
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'health-check'))
+
+from fake_docker import API_VERSION, FakeDockerServer, make_containers  # noqa: E402
+from health_checker import HealthChecker  # noqa: E402
+
+
+def write_config(containers, path):
+    """Write a health-check config monitoring the given fake containers"""
+    with open(os.path.join(HERE, '..', 'health-check', 'config.yml')) as f:
+        config = yaml.safe_load(f)
+
+    entries = [
+        {'name': c['name'], 'display': c['name'], 'penalty_down': 10, 'penalty_restart': 5}
+        for c in containers
+    ]
+    config['containers'] = {'critical': entries[:3], 'standard': entries[3:]}
+    # Measure the snapshot + inspect path, without history or the events index
+    config['restart_detection']['source'] = 'inspect'
+    config['history']['enabled'] = False
+    config['container_resources']['enabled'] = False
+    config['log_analysis']['enabled'] = False
+    config['network_checks']['enabled'] = False
+    config['baselines']['enabled'] = False
+    config['disk_growth']['enabled'] = False
+    config['remediation']['enabled'] = False
+    config['forwarder']['enabled'] = False
+    with open(path, 'w') as f:
+        yaml.safe_dump(config, f)
+
+
+def legacy_check(client, names):
+    """The original approach: one containers.get (full inspect) per configured container"""
+    for name in names:
+        try:
+            container = client.containers.get(name)
+            container.status
+            container.attrs['State']['StartedAt']
+        except docker.errors.NotFound:
+            pass
+
+
+def time_runs(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark container checks against a fake Docker API')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[6, 50, 200])
+    parser.add_argument('--latency', type=float, default=0.002, help='Per-request latency in seconds')
+    parser.add_argument('--inspect-latency', type=float, default=0.004, help='Inspect latency in seconds')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'containers':>10} {'legacy':>10} {'snapshot':>10} {'speedup':>8} {'inspects':>9}")
+    for size in args.sizes:
+        containers = make_containers(size)
+        server = FakeDockerServer(containers, args.latency, args.inspect_latency).start()
+        try:
+            client = docker.DockerClient(base_url=server.base_url, version=API_VERSION)
+            names = [c['name'] for c in containers]
+
+            with tempfile.TemporaryDirectory() as tmp:
+                config_path = os.path.join(tmp, 'config.yml')
+                write_config(containers, config_path)
+                checker = HealthChecker(config_path=config_path, docker_client=client)
+
+                def snapshot_check():
+                    checker.score = 100
+                    checker.issues = []
+                    checker.check_containers()
+
+                legacy = time_runs(lambda: legacy_check(client, names), args.repeat)
+                server.reset_counts()
+                snapshot = time_runs(snapshot_check, args.repeat)
+                inspects = server.request_counts['inspect'] // args.repeat
+
+            print(f"{size:>10} {legacy * 1000:>8.1f}ms {snapshot * 1000:>8.1f}ms {legacy / snapshot:>7.1f}x {inspects:>9}")
+        finally:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Forwarder Multi-Topic Load Test
+Pushes messages across many topics through the fake ntfy server and counts
+what the forwarder delivers to the fake Telegram API
+
+One extra topic is stalled (the stream opens but never sends anything) to
+show that it does not hold up the others.
+
+Usage:
+    python3 bench_forwarder_topics.py [--topics 12] [--messages 3000] [--publishers 8]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+from fake_ntfy import FakeNtfyServer  # noqa: E402
+from fake_telegram import FakeTelegramServer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the forwarder across many ntfy topics')
+    parser.add_argument('--topics', type=int, default=12)
+    parser.add_argument('--messages', type=int, default=3000)
+    parser.add_argument('--publishers', type=int, default=8)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    args = parser.parse_args()
+
+    topics = [f"load-{i:02d}" for i in range(args.topics)]
+    stalled_topic = 'load-stalled'
+
+    ntfy = FakeNtfyServer(stalled_topics=[stalled_topic]).start()
+    telegram = FakeTelegramServer().start()
+
+    # The forwarder reads its configuration at import time
+    os.environ.update({
+        'NTFY_URL': ntfy.url,
+        'NTFY_TOPICS': ','.join(topics + [stalled_topic]),
+        'TELEGRAM_API_URL': telegram.url,
+        'TELEGRAM_BOT_TOKEN': 'bench-token',
+        'TELEGRAM_CHAT_ID': '1',
+        # Lift the per-chat rate limit so the test measures forwarder capacity
+        'TELEGRAM_RATE_PER_SECOND': '100000',
+        'TELEGRAM_BURST': '1000',
+        'DELIVERY_WORKERS': '4',
+        'DELIVERY_QUEUE_SIZE': '10000',
+    })
+    sys.path.insert(0, os.path.join(HERE, '..', 'telegram-forwarder'))
+    import forwarder
+    forwarder.logger.setLevel('WARNING')
+
+    stop_event = threading.Event()
+    forwarder.create_delivery_queue()
+    forwarder.start_subscribers(forwarder.NTFY_TOPICS, stop_event)
+    if not ntfy.wait_for_subscribers(forwarder.NTFY_TOPICS):
+        print("Subscribers did not connect in time")
+        sys.exit(1)
+
+    session = requests.Session()
+
+    def publish(i):
+        topic = topics[i % len(topics)]
+        session.post(f"{ntfy.url}/{topic}", data=f"load message {i}".encode('utf-8'),
+                     headers={'Title': 'Load test', 'Tags': 'info'})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.publishers) as executor:
+        list(executor.map(publish, range(args.messages)))
+    publish_time = time.perf_counter() - start
+
+    deadline = time.time() + args.timeout
+    while len(telegram.received) < args.messages and time.time() < deadline:
+        time.sleep(0.05)
+    total_time = time.perf_counter() - start
+    stop_event.set()
+
+    delivered = len(telegram.received)
+    per_topic = {}
+    for entry in telegram.received:
+        text = entry['payload']['text']
+        topic = text.rsplit('Topic: ', 1)[-1].split('<', 1)[0]
+        per_topic[topic] = per_topic.get(topic, 0) + 1
+
+    print(f"Topics: {len(topics)} (+1 stalled)")
+    print(f"Published: {args.messages} in {publish_time:.2f}s")
+    print(f"Delivered: {delivered} in {total_time:.2f}s ({delivered / total_time:.0f} msg/s)")
+    print(f"Per-topic delivered: min {min(per_topic.values(), default=0)}, "
+          f"max {max(per_topic.values(), default=0)}, topics {len(per_topic)}")
+    print(f"Missing: {args.messages - delivered}")
+
+    ntfy.stop()
+    telegram.stop()
+    sys.exit(0 if delivered == args.messages else 1)
+
+
+if __name__ == '__main__':
+    main()
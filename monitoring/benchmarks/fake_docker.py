@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Fake Docker Engine API
+Minimal HTTP stand-in for the Docker socket used by the benchmarks
+
+Serves just enough of the Engine API (listing, inspect, stats, events) for the health
+checker, with a configurable per-request latency so round trips cost
+roughly what they cost against a busy daemon.
+"""
+
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+API_VERSION = '1.43'
+
+
+def make_containers(count: int, prefix: str = 'bench') -> List[Dict]:
+    """Build a fleet where most containers are long-running and a few restarted recently"""
+    now = datetime.now(timezone.utc)
+    containers = []
+    for i in range(count):
+        name = f"{prefix}-{i:03d}"
+        if i % 10 == 3:
+            uptime = timedelta(hours=2)
+            restart_count = 1
+        elif i % 25 == 7:
+            uptime = None
+            restart_count = 0
+        else:
+            uptime = timedelta(days=3)
+            restart_count = 0
+
+        started = now - (uptime or timedelta(days=5))
+        containers.append({
+            'id': f"{i:064x}",
+            'name': name,
+            'state': 'running' if uptime else 'exited',
+            'uptime': uptime,
+            'started_at': started.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            'restart_count': restart_count,
+            'pid': 1000 + i,
+        })
+    return containers
+
+
+def _human_duration(delta: timedelta) -> str:
+    """Subset of Docker's HumanDuration used in listing Status strings"""
+    seconds = int(delta.total_seconds())
+    if seconds < 60:
+        return f"{seconds} seconds"
+    minutes = seconds // 60
+    if minutes < 60:
+        return f"{minutes} minutes"
+    hours = round(seconds / 3600)
+    if hours < 48:
+        return f"{hours} hours"
+    return f"{hours // 24} days"
+
+
+class FakeDockerServer:
+    """Threaded HTTP server speaking a slice of the Docker Engine API"""
+
+    def __init__(self, containers: List[Dict], latency: float = 0.002, inspect_latency: float = 0.004,
+                 stats_latency: float = 0.02, precpu_delay: float = 1.0):
+        self.containers = containers
+        self.latency = latency
+        self.inspect_latency = inspect_latency
+        self.stats_latency = stats_latency
+        # dockerd waits for a second CPU sample unless one-shot stats are requested
+        self.precpu_delay = precpu_delay
+        self.request_counts = {'list': 0, 'inspect': 0, 'events': 0, 'stats': 0, 'other': 0}
+        self.events: List[Dict] = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"tcp://{host}:{port}"
+
+    def start(self) -> 'FakeDockerServer':
+        handler = self._make_handler()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            for key in self.request_counts:
+                self.request_counts[key] = 0
+
+    def _count(self, kind: str) -> None:
+        with self._lock:
+            self.request_counts[kind] += 1
+
+    def emit_event(self, name: str, action: str, ts: Optional[float] = None) -> Dict:
+        """Append a container event as the daemon would publish it"""
+        ts = time.time() if ts is None else ts
+        event = {
+            'Type': 'container',
+            'Action': action,
+            'status': action,
+            'Actor': {'ID': name, 'Attributes': {'name': name}},
+            'time': int(ts),
+            'timeNano': int(ts * 1e9),
+        }
+        with self._lock:
+            self.events.append(event)
+        return event
+
+    def _summary(self, container: Dict) -> Dict:
+        if container['uptime']:
+            status = f"Up {_human_duration(container['uptime'])}"
+            if container.get('health'):
+                status += f" ({container['health']})"
+        else:
+            status = "Exited (1) 2 days ago"
+        return {
+            'Id': container['id'],
+            'Names': [f"/{container['name']}"],
+            'Image': 'bench:latest',
+            'State': container['state'],
+            'Status': status,
+            'Labels': {},
+        }
+
+    def _inspect(self, container: Dict) -> Dict:
+        # Real inspect payloads are several KB; pad so JSON decoding costs something too
+        return {
+            'Id': container['id'],
+            'Name': f"/{container['name']}",
+            'RestartCount': container['restart_count'],
+            'State': {
+                'Status': container['state'],
+                'Running': container['state'] == 'running',
+                'Pid': container['pid'] if container['state'] == 'running' else 0,
+                'StartedAt': container['started_at'],
+            },
+            'Config': {
+                'Env': [f"BENCH_VAR_{i}=value-{i}" for i in range(40)],
+                'Labels': {f"bench.label.{i}": 'x' * 32 for i in range(20)},
+            },
+            'Mounts': [{'Source': f"/var/lib/docker/volumes/v{i}", 'Destination': f"/data{i}"} for i in range(8)],
+        }
+
+    def _stats(self, container: Dict) -> Dict:
+        """cgroup v2 style stats payload with counters that grow over time"""
+        index = int(container['id'], 16)
+        elapsed = time.monotonic()
+        return {
+            'read': datetime.now(timezone.utc).isoformat(),
+            'cpu_stats': {'cpu_usage': {'total_usage': int(elapsed * 1e9 * 0.05 * (index % 4 + 1))},
+                          'online_cpus': 4},
+            'memory_stats': {'usage': (64 + index % 8 * 32) * 1048576, 'limit': 1024 * 1048576,
+                             'stats': {'inactive_file': 8 * 1048576}},
+            'networks': {'eth0': {'rx_bytes': int(elapsed * 2048), 'tx_bytes': int(elapsed * 1024)}},
+            'blkio_stats': {'io_service_bytes_recursive': [
+                {'major': 8, 'minor': 0, 'op': 'read', 'value': int(elapsed * 4096)},
+                {'major': 8, 'minor': 0, 'op': 'write', 'value': int(elapsed * 8192)},
+            ]},
+        }
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream_events(self, since, until):
+                # The daemon always streams events chunked, one JSON object per chunk
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                sent = 0
+                try:
+                    while not fake._stopping.is_set():
+                        pending = list(fake.events)[sent:]
+                        sent += len(pending)
+                        for event in pending:
+                            if event['time'] < since or (until is not None and event['time'] > until):
+                                continue
+                            line = json.dumps(event).encode('utf-8') + b'\n'
+                            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                        self.wfile.flush()
+                        if until is not None:
+                            # Terminate the chunked body and keep the connection, as dockerd does
+                            self.wfile.write(b"0\r\n\r\n")
+                            return
+                        time.sleep(0.05)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                path = re.sub(r'^/v[\d.]+', '', parsed.path)
+
+                if path == '/containers/json':
+                    fake._count('list')
+                    time.sleep(fake.latency)
+                    query = parse_qs(parsed.query)
+                    patterns = []
+                    if 'filters' in query:
+                        filters = json.loads(query['filters'][0])
+                        patterns = [re.compile(p) for p in filters.get('name', [])]
+                    result = []
+                    for container in fake.containers:
+                        full_name = f"/{container['name']}"
+                        if patterns and not any(p.search(full_name) or p.search(container['name']) for p in patterns):
+                            continue
+                        result.append(fake._summary(container))
+                    self._send_json(result)
+                    return
+
+                if path == '/events':
+                    fake._count('events')
+                    query = parse_qs(parsed.query)
+                    since = float(query.get('since', ['0'])[0] or 0)
+                    until = query.get('until', [None])[0]
+                    self._stream_events(since, float(until) if until is not None else None)
+                    return
+
+                match = re.match(r'^/containers/([^/]+)/stats$', path)
+                if match:
+                    fake._count('stats')
+                    query = parse_qs(parsed.query)
+                    one_shot = query.get('one-shot', ['false'])[0] in ('1', 'true', 'True')
+                    time.sleep(fake.stats_latency + (0 if one_shot else fake.precpu_delay))
+                    key = match.group(1)
+                    for container in fake.containers:
+                        if key in (container['id'], container['name']):
+                            self._send_json(fake._stats(container))
+                            return
+                    self._send_json({'message': f"No such container: {key}"}, status=404)
+                    return
+
+                match = re.match(r'^/containers/([^/]+)/json$', path)
+                if match:
+                    fake._count('inspect')
+                    time.sleep(fake.inspect_latency)
+                    key = match.group(1)
+                    for container in fake.containers:
+                        if key in (container['id'], container['name']):
+                            self._send_json(fake._inspect(container))
+                            return
+                    self._send_json({'message': f"No such container: {key}"}, status=404)
+                    return
+
+                fake._count('other')
+                if path in ('/_ping', '/version'):
+                    self._send_json({'ApiVersion': API_VERSION, 'Version': '24.0.0'})
+                    return
+                self._send_json({'message': 'not implemented'}, status=404)
+
+        return Handler
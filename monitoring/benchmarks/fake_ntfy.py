@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Fake ntfy Server
+Local stand-in for ntfy's publish and JSON stream endpoints
+
+Supports POST/PUT publishing, /<topic>/json and /<t1,t2>/json streaming
+(chunked NDJSON with open/keepalive/message events), the since= parameter
+(message id, unix time or "all"), deliberately stalled topics for
+isolation tests, /v1/health, and configurable stream latency plus failed
+(HTTP 500) or rate-limited (HTTP 429) subscription attempts.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeNtfyServer:
+    """Threaded HTTP server speaking a slice of the ntfy API"""
+
+    def __init__(self, keepalive_interval: float = 45.0, stalled_topics: Iterable[str] = (),
+                 latency: float = 0.0, error_rate: float = 0.0, rate_limit_every: int = 0,
+                 retain: Optional[int] = None, seed: int = 42):
+        self.keepalive_interval = keepalive_interval
+        self.stalled_topics = set(stalled_topics)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_every = rate_limit_every
+        # Messages kept per topic for since= replay (None keeps all; bounded for soak runs)
+        self.retain = retain
+        self.trimmed: Dict[str, int] = {}
+        self.connects = 0
+        self.rejected = 0
+        self._random = random.Random(seed)
+        self.messages: Dict[str, List[Dict]] = {}
+        self.subscribers: Dict[str, int] = {}
+        self.published = 0
+        self._sequence = 0
+        self._cond = threading.Condition()
+        self._stopping = threading.Event()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeNtfyServer':
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._server.request_queue_size = 256
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._stopping.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def publish(self, topic: str, message: str, title: str = '', priority: int = 3,
+                tags: Optional[List[str]] = None) -> Dict:
+        """Store a message and wake up every stream subscribed to its topic"""
+        with self._cond:
+            self._sequence += 1
+            event = {
+                'id': f"m{self._sequence:011d}",
+                'time': int(time.time()),
+                'event': 'message',
+                'topic': topic,
+                'message': message,
+                'priority': priority,
+            }
+            if title:
+                event['title'] = title
+            if tags:
+                event['tags'] = tags
+            messages = self.messages.setdefault(topic, [])
+            messages.append(event)
+            if self.retain and len(messages) >= 2 * self.retain:
+                excess = len(messages) - self.retain
+                del messages[:excess]
+                self.trimmed[topic] = self.trimmed.get(topic, 0) + excess
+            self.published += 1
+            self._cond.notify_all()
+        return event
+
+    def wait_for_subscribers(self, topics: Iterable[str], timeout: float = 10.0) -> bool:
+        deadline = time.time() + timeout
+        with self._cond:
+            while not all(self.subscribers.get(t, 0) > 0 for t in topics):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _reject_connect(self) -> Optional[int]:
+        """HTTP status to fail the next subscription with, or None to accept it"""
+        with self._cond:
+            self.connects += 1
+            status = None
+            if self.rate_limit_every and self.connects % self.rate_limit_every == 0:
+                status = 429
+            elif self.error_rate and self._random.random() < self.error_rate:
+                status = 500
+            if status is not None:
+                self.rejected += 1
+            return status
+
+    def _backlog(self, topic: str, since: Optional[str]) -> List[Dict]:
+        messages = self.messages.get(topic, [])
+        if since is None:
+            return []
+        if since == 'all':
+            return list(messages)
+        if since.isdigit():
+            return [m for m in messages if m['time'] >= int(since)]
+        for index, message in enumerate(messages):
+            if message['id'] == since:
+                return messages[index + 1:]
+        return list(messages)
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _chunk(self, payload: Dict) -> None:
+                if fake.latency and payload.get('event') == 'message':
+                    time.sleep(fake.latency)
+                line = json.dumps(payload).encode('utf-8') + b'\n'
+                self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+
+            def _publish(self):
+                topic = urlparse(self.path).path.strip('/')
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length).decode('utf-8') if length else ''
+                tags = [t.strip() for t in self.headers.get('Tags', '').split(',') if t.strip()]
+                priority_header = self.headers.get('Priority', '3')
+                priority = int(priority_header) if priority_header.isdigit() else 3
+                event = fake.publish(topic, body, self.headers.get('Title', ''), priority, tags)
+
+                payload = json.dumps(event).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_POST = _publish
+            do_PUT = _publish
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == '/v1/health':
+                    body = b'{"healthy":true}'
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                parts = parsed.path.strip('/').split('/')
+                if len(parts) != 2 or parts[1] != 'json':
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                topics = parts[0].split(',')
+                since = parse_qs(parsed.query).get('since', [None])[0]
+
+                reject = fake._reject_connect()
+                if reject is not None:
+                    body = json.dumps({'code': reject, 'http': reject, 'error': 'rejected by fake server'}).encode('utf-8')
+                    self.send_response(reject)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+                with fake._cond:
+                    for topic in topics:
+                        fake.subscribers[topic] = fake.subscribers.get(topic, 0) + 1
+                    # Absolute positions, so trimming old messages never shifts a stream
+                    positions = {t: fake.trimmed.get(t, 0) + len(fake.messages.get(t, [])) for t in topics}
+                    backlog = [m for t in topics for m in fake._backlog(t, since)]
+                    fake._cond.notify_all()
+
+                try:
+                    self._chunk({'id': 'open', 'time': int(time.time()), 'event': 'open', 'topic': parts[0]})
+                    stalled = any(t in fake.stalled_topics for t in topics)
+
+                    for message in backlog:
+                        if not stalled:
+                            self._chunk(message)
+
+                    last_keepalive = time.time()
+                    while not fake._stopping.is_set():
+                        with fake._cond:
+                            fake._cond.wait(0.5)
+                            pending = []
+                            for topic in topics:
+                                messages = fake.messages.get(topic, [])
+                                base = fake.trimmed.get(topic, 0)
+                                pending.extend(messages[max(0, positions[topic] - base):])
+                                positions[topic] = base + len(messages)
+
+                        if stalled:
+                            continue
+                        for message in pending:
+                            self._chunk(message)
+                        if time.time() - last_keepalive >= fake.keepalive_interval:
+                            self._chunk({'id': 'keepalive', 'time': int(time.time()), 'event': 'keepalive'})
+                            last_keepalive = time.time()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with fake._cond:
+                        for topic in topics:
+                            fake.subscribers[topic] -= 1
+
+        return Handler
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Fake Telegram Bot API
+Local stand-in for sendMessage with configurable latency, errors and 429s
+
+Every accepted message is recorded with its arrival time so benchmarks can
+measure delivery throughput and publish-to-delivery delay.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+class FakeTelegramServer:
+    """Threaded HTTP server implementing POST /bot<token>/sendMessage"""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_every: int = 0, retry_after: int = 1, seed: int = 42):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.received: List[Dict] = []
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeTelegramServer':
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._server.request_queue_size = 256
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def drain(self) -> List[Dict]:
+        """Return and forget the messages received so far (keeps long runs bounded)"""
+        with self._lock:
+            received, self.received = self.received, []
+        return received
+
+    def _decide(self) -> str:
+        """Pick the outcome of the next request: ok, error or rate_limited"""
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit_every and self.requests % self.rate_limit_every == 0:
+                self.rate_limited += 1
+                return 'rate_limited'
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                return 'error'
+            return 'ok'
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict) -> None:
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+
+                if not self.path.endswith('/sendMessage'):
+                    self._send_json(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+                    return
+
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                outcome = fake._decide()
+                if outcome == 'rate_limited':
+                    self._send_json(429, {
+                        'ok': False,
+                        'error_code': 429,
+                        'description': f"Too Many Requests: retry after {fake.retry_after}",
+                        'parameters': {'retry_after': fake.retry_after},
+                    })
+                    return
+                if outcome == 'error':
+                    self._send_json(502, {'ok': False, 'error_code': 502, 'description': 'Bad Gateway'})
+                    return
+
+                with fake._lock:
+                    fake.received.append({'time': time.time(), 'payload': payload})
+                    message_id = len(fake.received)
+                self._send_json(200, {'ok': True, 'result': {'message_id': message_id}})
+
+        return Handler
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite
+End-to-end timings for the health checker and Telegram forwarder against the
+local Docker, ntfy and Telegram stand-ins, written as JSON for regression checks
+
+Scenarios:
+- check_cycle: every check family plus report formatting, as one daemon cycle
+- forwarder: publish -> ntfy stream -> delivery queue -> Telegram throughput,
+  with p50/p99 publish-to-delivery delay
+- soak: steady forwarder load plus check cycles, sampling process RSS to
+  catch memory growth over long runs
+
+Usage:
+    python3 run_benchmarks.py [--output results.json] [--baseline previous.json]
+    python3 run_benchmarks.py --soak-seconds 600 --telegram-error-rate 0.05 --telegram-rate-limit-every 200
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import docker
+import requests
+import yaml
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'health-check'))
+
+from fake_docker import API_VERSION, FakeDockerServer, make_containers  # noqa: E402
+from fake_ntfy import FakeNtfyServer  # noqa: E402
+from fake_telegram import FakeTelegramServer  # noqa: E402
+
+# Publish time embedded in every benchmark message, read back from the Telegram payload
+STAMP_PATTERN = re.compile(r'stamp=(\d+\.\d+)')
+
+# Metrics compared against a baseline, and whether higher values are better
+REGRESSION_METRICS = {
+    'check_cycle.warm_ms.p50': False,
+    'check_cycle.warm_ms.p95': False,
+    'forwarder.throughput_per_second': True,
+    'forwarder.delay_ms.p50': False,
+    'forwarder.delay_ms.p99': False,
+    'soak.rss_growth_kb_per_hour': False,
+}
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0-100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), int(round(q / 100.0 * len(ordered) + 0.5))))
+    return ordered[rank - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        'count': len(values),
+        'min': min(values, default=0.0),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': max(values, default=0.0),
+    }
+
+
+def rss_kb() -> int:
+    """Current resident set size (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def write_checker_config(path: str, containers: List[Dict], ntfy_url: str, data_dir: str) -> None:
+    """Health-check config pointed at the stand-ins (history and events index in data_dir)"""
+    with open(os.path.join(HERE, '..', 'health-check', 'config.yml')) as f:
+        config = yaml.safe_load(f)
+
+    entries = [
+        {'name': c['name'], 'display': c['name'], 'penalty_down': 10, 'penalty_restart': 5}
+        for c in containers
+    ]
+    config['containers'] = {'critical': entries[:3], 'standard': entries[3:]}
+    config['restart_detection']['events_path'] = os.path.join(data_dir, 'container_events.json')
+    config['history']['path'] = os.path.join(data_dir, 'history.db')
+    config['baselines']['path'] = os.path.join(data_dir, 'baselines.json')
+    config['notification']['state_path'] = os.path.join(data_dir, 'notify_state.json')
+    # No host cgroup tree here; use the pooled Docker stats path
+    config['container_resources']['source'] = 'api'
+    config['resources']['source'] = 'local'
+    # No Loki or NetBird stand-ins; those families would only report failures
+    config['log_analysis']['enabled'] = False
+    config['network_checks']['enabled'] = False
+    config['disk_growth']['enabled'] = False
+    config['remediation']['enabled'] = False
+    config['forwarder']['enabled'] = False
+    config['service_checks']['endpoints'] = [
+        {'name': f"Endpoint {i}", 'url': f"{ntfy_url}/v1/health", 'method': 'GET'} for i in range(4)
+    ]
+    with open(path, 'w') as f:
+        yaml.safe_dump(config, f)
+
+
+def run_cycle(checker, families) -> Dict[str, float]:
+    """One full check cycle; returns per-family and total wall time in ms"""
+    timings = {}
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for family in families:
+            family_start = time.perf_counter()
+            checker.run_check_family(family)
+            timings[family] = (time.perf_counter() - family_start) * 1000
+        checker.format_message()
+    timings['total'] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def bench_check_cycle(args, docker_server, ntfy, data_dir) -> Dict:
+    from health_checker import CHECK_FAMILIES, HealthChecker
+
+    config_path = os.path.join(data_dir, 'config.yml')
+    write_checker_config(config_path, docker_server.containers, ntfy.url, data_dir)
+    client = docker.DockerClient(base_url=docker_server.base_url, version=API_VERSION)
+    with contextlib.redirect_stdout(io.StringIO()):
+        checker = HealthChecker(config_path=config_path, docker_client=client)
+
+    sample_window = checker.config['resources'].get('sample_window', 1.0)
+    cold = run_cycle(checker, CHECK_FAMILIES)
+
+    warm = []
+    for _ in range(args.cycles):
+        # The daemon never runs a family faster than its sampling window, so samplers never sleep
+        time.sleep(sample_window)
+        warm.append(run_cycle(checker, CHECK_FAMILIES))
+
+    families = {family: summarize([w[family] for w in warm]) for family in CHECK_FAMILIES}
+    return {
+        'containers': len(docker_server.containers),
+        'endpoints': len(checker.config['service_checks']['endpoints']),
+        'cold_ms': cold['total'],
+        'warm_ms': summarize([w['total'] for w in warm]),
+        'family_ms_p50': {family: summary['p50'] for family, summary in families.items()},
+        'score': checker.score,
+        'checker': checker,
+    }
+
+
+def publish_messages(ntfy_url: str, topics: List[str], count: int, publishers: int, offset: int = 0) -> float:
+    """Publish count stamped messages round-robin over topics; returns elapsed seconds"""
+    session = requests.Session()
+
+    def publish(i):
+        topic = topics[i % len(topics)]
+        # Unique titles so the coalescer never folds benchmark messages together
+        session.post(f"{ntfy_url}/{topic}", data=f"bench message {i} stamp={time.time():.6f}".encode('utf-8'),
+                     headers={'Title': f"Bench {i}", 'Tags': 'info'})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=publishers) as executor:
+        list(executor.map(publish, range(offset, offset + count)))
+    return time.perf_counter() - start
+
+
+def delivery_delays(entries: List[Dict]) -> List[float]:
+    delays = []
+    for entry in entries:
+        match = STAMP_PATTERN.search(entry['payload'].get('text', ''))
+        if match:
+            delays.append((entry['time'] - float(match.group(1))) * 1000)
+    return delays
+
+
+def wait_for_deliveries(telegram, target: int, timeout: float) -> None:
+    deadline = time.time() + timeout
+    while len(telegram.received) < target and time.time() < deadline:
+        time.sleep(0.02)
+
+
+def bench_forwarder(args, forwarder, ntfy, telegram, topics) -> Dict:
+    already = len(telegram.received)
+    start = time.perf_counter()
+    publish_time = publish_messages(ntfy.url, topics, args.messages, args.publishers)
+    wait_for_deliveries(telegram, already + args.messages, args.timeout)
+    elapsed = time.perf_counter() - start
+
+    entries = telegram.received[already:]
+    delays = delivery_delays(entries)
+    metrics = forwarder.delivery_queue.metrics.snapshot()
+    return {
+        'topics': len(topics),
+        'published': args.messages,
+        'delivered': len(entries),
+        'publish_seconds': publish_time,
+        'elapsed_seconds': elapsed,
+        'throughput_per_second': len(entries) / elapsed if elapsed else 0.0,
+        'delay_ms': summarize(delays),
+        'retries': metrics['retries'],
+        'rate_limited': metrics['rate_limited'],
+        'telegram_errors': telegram.errors,
+        'telegram_429s': telegram.rate_limited,
+        'ntfy_rejected_connects': ntfy.rejected,
+    }
+
+
+def linear_slope(points: List[tuple]) -> float:
+    """Least-squares slope of (x, y) points"""
+    if len(points) < 2:
+        return 0.0
+    xs, ys = zip(*points)
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    if denominator == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator
+
+
+def bench_soak(args, checker, ntfy, telegram, topics) -> Dict:
+    """Steady load for soak_seconds; RSS is sampled once per second"""
+    from health_checker import CHECK_FAMILIES
+
+    # Delays are computed as messages arrive and the stand-ins keep only recent messages,
+    # so the RSS samples reflect the checker and forwarder rather than benchmark bookkeeping
+    telegram.drain()
+    delays: List[float] = []
+    delivered = 0
+    stop = threading.Event()
+    published = [0]
+
+    def load():
+        interval = 1.0 / args.soak_rate
+        session = requests.Session()
+        next_time = time.monotonic()
+        while not stop.is_set():
+            i = args.messages + published[0]
+            session.post(f"{ntfy.url}/{topics[i % len(topics)]}",
+                         data=f"soak message {i} stamp={time.time():.6f}".encode('utf-8'),
+                         headers={'Title': f"Soak {i}"})
+            published[0] += 1
+            next_time += interval
+            stop.wait(max(0.0, next_time - time.monotonic()))
+
+    loader = threading.Thread(target=load, daemon=True)
+    loader.start()
+
+    samples = []
+    cycles = 0
+    start = time.monotonic()
+    while time.monotonic() - start < args.soak_seconds:
+        tick = time.monotonic()
+        run_cycle(checker, CHECK_FAMILIES)
+        cycles += 1
+        entries = telegram.drain()
+        delivered += len(entries)
+        delays.extend(delivery_delays(entries))
+        samples.append((time.monotonic() - start, rss_kb()))
+        time.sleep(max(0.0, 1.0 - (time.monotonic() - tick)))
+    stop.set()
+    loader.join(timeout=5)
+    wait_for_deliveries(telegram, published[0] - delivered, args.timeout)
+    entries = telegram.drain()
+    delivered += len(entries)
+    delays.extend(delivery_delays(entries))
+
+    # The growth rate uses the second half only: the first half fills bounded caches
+    # (outbox seen ids, coalescer keys, connection pools, SQLite page cache)
+    steady = samples[len(samples) // 2:]
+    slope_per_second = linear_slope(steady)
+    return {
+        'seconds': args.soak_seconds,
+        'published': published[0],
+        'delivered': delivered,
+        'check_cycles': cycles,
+        'rss_kb': {
+            'start': steady[0][1] if steady else 0,
+            'end': steady[-1][1] if steady else 0,
+            'max': max((s[1] for s in samples), default=0),
+        },
+        'rss_growth_kb_per_hour': slope_per_second * 3600,
+        'delay_ms': summarize(delays),
+    }
+
+
+def lookup(results: Dict, dotted: str):
+    value = results
+    for part in dotted.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Metrics that got worse than the baseline by more than tolerance (fraction)"""
+    regressions = []
+    for metric, higher_is_better in REGRESSION_METRICS.items():
+        current, previous = lookup(results, metric), lookup(baseline, metric)
+        if not isinstance(current, (int, float)) or not isinstance(previous, (int, float)) or previous <= 0:
+            continue
+        change = (current - previous) / previous
+        worse = change < -tolerance if higher_is_better else change > tolerance
+        if worse:
+            regressions.append(f"{metric}: {previous:.2f} -> {current:.2f} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the monitoring benchmark suite against local stand-ins')
+    parser.add_argument('--output', default=os.path.join(HERE, 'results',
+                                                         f"bench-{datetime.now():%Y%m%d-%H%M%S}.json"))
+    parser.add_argument('--baseline', help='Earlier results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed regression (fraction)')
+    parser.add_argument('--containers', type=int, default=6)
+    parser.add_argument('--cycles', type=int, default=10)
+    parser.add_argument('--docker-latency', type=float, default=0.002)
+    parser.add_argument('--topics', type=int, default=4)
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--publishers', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=4, help='Forwarder delivery workers')
+    parser.add_argument('--telegram-rate', type=float, default=100000.0,
+                        help='Forwarder per-chat rate limit (lifted by default to measure capacity)')
+    parser.add_argument('--telegram-latency', type=float, default=0.02)
+    parser.add_argument('--telegram-error-rate', type=float, default=0.01)
+    parser.add_argument('--telegram-rate-limit-every', type=int, default=500)
+    parser.add_argument('--ntfy-latency', type=float, default=0.0)
+    parser.add_argument('--ntfy-error-rate', type=float, default=0.0)
+    parser.add_argument('--ntfy-rate-limit-every', type=int, default=0)
+    parser.add_argument('--no-outbox', action='store_true', help='Run the forwarder without its durable outbox')
+    parser.add_argument('--soak-seconds', type=int, default=60,
+                        help='Soak duration (use 600+ for a meaningful growth rate; 0 skips it)')
+    parser.add_argument('--soak-rate', type=float, default=50.0, help='Messages per second during the soak')
+    parser.add_argument('--timeout', type=float, default=120.0)
+    args = parser.parse_args()
+
+    topics = [f"bench-{i:02d}" for i in range(args.topics)]
+    docker_server = FakeDockerServer(make_containers(args.containers), latency=args.docker_latency,
+                                     inspect_latency=args.docker_latency * 2).start()
+    ntfy = FakeNtfyServer(latency=args.ntfy_latency, error_rate=args.ntfy_error_rate,
+                          rate_limit_every=args.ntfy_rate_limit_every, retain=1000).start()
+    telegram = FakeTelegramServer(latency=args.telegram_latency, error_rate=args.telegram_error_rate,
+                                  rate_limit_every=args.telegram_rate_limit_every).start()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        # The forwarder reads its configuration at import time
+        os.environ.update({
+            'NTFY_URL': ntfy.url,
+            'NTFY_TOPICS': ','.join(topics),
+            'TELEGRAM_API_URL': telegram.url,
+            'TELEGRAM_BOT_TOKEN': 'bench-token',
+            'TELEGRAM_CHAT_ID': '1',
+            'TELEGRAM_RATE_PER_SECOND': str(args.telegram_rate),
+            'TELEGRAM_BURST': str(max(1.0, min(args.telegram_rate, 1000.0))),
+            'DELIVERY_WORKERS': str(args.workers),
+            'DELIVERY_QUEUE_SIZE': str(max(10000, args.messages)),
+            'RECONNECT_MIN_DELAY': '0.1',
+            'OUTBOX_DIR': os.path.join(data_dir, 'outbox'),
+        })
+        sys.path.insert(0, os.path.join(HERE, '..', 'telegram-forwarder'))
+        import forwarder
+        # Retries are expected with injected errors; the counters below report them
+        forwarder.logger.setLevel('ERROR')
+
+        if not args.no_outbox:
+            forwarder.create_outbox()
+        forwarder.create_delivery_queue()
+        forwarder.create_coalescer()
+        stop_event = threading.Event()
+        forwarder.start_subscribers(topics, stop_event)
+        if not ntfy.wait_for_subscribers(topics, timeout=30):
+            print("Forwarder subscribers did not connect in time")
+            sys.exit(1)
+
+        print("Running check cycle benchmark...", flush=True)
+        check_cycle = bench_check_cycle(args, docker_server, ntfy, data_dir)
+        checker = check_cycle.pop('checker')
+
+        print("Running forwarder benchmark...", flush=True)
+        forwarder_results = bench_forwarder(args, forwarder, ntfy, telegram, topics)
+
+        soak = None
+        if args.soak_seconds > 0:
+            print(f"Running {args.soak_seconds}s soak...", flush=True)
+            soak = bench_soak(args, checker, ntfy, telegram, topics)
+
+        stop_event.set()
+        forwarder.coalescer.stop()
+        forwarder.delivery_queue.stop(drain_timeout=1)
+        if forwarder.outbox is not None:
+            forwarder.outbox.stop()
+        if checker.history is not None:
+            checker.history.close()
+
+    docker_server.stop()
+    ntfy.stop()
+    telegram.stop()
+
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': vars(args),
+        'check_cycle': check_cycle,
+        'forwarder': forwarder_results,
+        'soak': soak,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    warm = check_cycle['warm_ms']
+    print(f"Check cycle: cold {check_cycle['cold_ms']:.1f}ms, warm p50 {warm['p50']:.1f}ms p95 {warm['p95']:.1f}ms")
+    delay = forwarder_results['delay_ms']
+    print(f"Forwarder: {forwarder_results['delivered']}/{forwarder_results['published']} delivered, "
+          f"{forwarder_results['throughput_per_second']:.0f} msg/s, "
+          f"delay p50 {delay['p50']:.1f}ms p99 {delay['p99']:.1f}ms")
+    if soak:
+        print(f"Soak: RSS {soak['rss_kb']['start']} -> {soak['rss_kb']['end']} kB "
+              f"({soak['rss_growth_kb_per_hour']:+.0f} kB/h), {soak['delivered']}/{soak['published']} delivered")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Adaptive Baselines
+Streaming per-series baselines for scoring deviations instead of fixed levels
+
+Each series (a system metric or an endpoint's latency) keeps an overall
+exponentially weighted mean and variance plus one per time-of-day bucket,
+so memory per series is constant however long the checker runs. Weights
+decay with elapsed time rather than sample count, so a daemon sampling every
+10 seconds and a cron job running every 5 minutes learn at the same pace.
+
+A value is scored against the state *before* it is folded in, and values
+far outside the baseline are clipped when folded in, so one spike neither
+hides itself nor inflates the variance for hours.
+"""
+
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from state_file import LOAD_ERRORS, read_json, write_json
+
+LN2 = math.log(2)
+
+
+def ewma_update(mean: float, var: float, value: float, alpha: float):
+    """One step of an exponentially weighted mean and variance"""
+    delta = value - mean
+    increment = alpha * delta
+    return mean + increment, (1 - alpha) * (var + delta * increment)
+
+
+class Deviation:
+    """How a value compares with its baseline before the value was learned"""
+
+    __slots__ = ('value', 'expected', 'std', 'z', 'warmed', 'seasonal')
+
+    def __init__(self, value: float, expected: float, std: float, warmed: bool, seasonal: bool):
+        self.value = value
+        self.expected = expected
+        self.std = std
+        self.z = (value - expected) / std if std > 0 else 0.0
+        self.warmed = warmed
+        self.seasonal = seasonal
+
+    def as_dict(self) -> Dict:
+        return {'expected': self.expected, 'std': self.std, 'z': self.z,
+                'warmed': self.warmed, 'seasonal': self.seasonal}
+
+
+class Baseline:
+    """Overall and time-of-day EWMA mean/variance of one series"""
+
+    __slots__ = ('mean', 'var', 'count', 'updated', 'seasons')
+
+    def __init__(self, buckets: int):
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+        self.updated = 0.0
+        # [mean, var, count] per time-of-day bucket
+        self.seasons: List[List[float]] = [[0.0, 0.0, 0] for _ in range(buckets)]
+
+    def to_dict(self) -> Dict:
+        return {'mean': self.mean, 'var': self.var, 'count': self.count,
+                'updated': self.updated, 'seasons': self.seasons}
+
+    @classmethod
+    def from_dict(cls, state: Dict, buckets: int) -> 'Baseline':
+        baseline = cls(buckets)
+        baseline.mean = state['mean']
+        baseline.var = state['var']
+        baseline.count = state['count']
+        baseline.updated = state['updated']
+        # A changed bucket count invalidates the time-of-day state, not the overall one
+        if len(state.get('seasons', [])) == buckets:
+            baseline.seasons = [list(season) for season in state['seasons']]
+        return baseline
+
+
+class BaselineStore:
+    """Baselines keyed by series name, persisted to a JSON file"""
+
+    def __init__(self, path: Optional[str] = None, half_life: float = 3600, seasonal_half_life: float = 7,
+                 buckets: int = 24, warmup: int = 30, season_warmup: int = 10, clip_sigma: float = 4.0,
+                 save_interval: float = 60, retention: float = 30 * 86400):
+        """half_life is in seconds; seasonal_half_life in days of a bucket's own time of day"""
+        self.path = path
+        self.half_life = half_life
+        self.seasonal_half_life = seasonal_half_life
+        self.buckets = buckets
+        self.width = 86400 / buckets
+        self.warmup = warmup
+        self.season_warmup = season_warmup
+        self.clip_sigma = clip_sigma
+        self.save_interval = save_interval
+        self.retention = retention
+        self.series: Dict[str, Baseline] = {}
+        self._dirty = False
+        self._saved_at = 0.0
+        # Resource and endpoint checks may observe at the same time
+        self._lock = threading.Lock()
+
+    def bucket(self, ts: float) -> int:
+        """Time-of-day bucket of a timestamp, in local time like the report"""
+        moment = datetime.fromtimestamp(ts)
+        return int((moment.hour * 3600 + moment.minute * 60 + moment.second) // self.width) % self.buckets
+
+    def observe(self, name: str, value: float, min_std: float = 0.0, now: Optional[float] = None) -> Deviation:
+        """Compare value with the series' baseline, then learn it
+
+        The expected value comes from the time-of-day bucket once it has
+        season_warmup samples, else from the overall baseline. The standard
+        deviation is floored at min_std so a flat series is not hypersensitive.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._observe(name, value, min_std, now)
+
+    def _observe(self, name: str, value: float, min_std: float, now: float) -> Deviation:
+        baseline = self.series.get(name)
+        if baseline is None:
+            baseline = self.series[name] = Baseline(self.buckets)
+        season = baseline.seasons[self.bucket(now)]
+
+        seasonal = season[2] >= self.season_warmup
+        mean, var = (season[0], season[1]) if seasonal else (baseline.mean, baseline.var)
+        std = max(math.sqrt(max(var, 0.0)), min_std)
+        deviation = Deviation(value, mean if baseline.count else value, std,
+                              warmed=baseline.count >= self.warmup, seasonal=seasonal)
+
+        # Clip what is learned so a spike does not drag the baseline along with it
+        learned = value
+        if deviation.warmed:
+            learned = min(max(value, mean - self.clip_sigma * std), mean + self.clip_sigma * std)
+
+        if baseline.count == 0:
+            baseline.mean, baseline.var = learned, 0.0
+        else:
+            elapsed = max(0.0, now - baseline.updated)
+            # Cap the step so a long gap halves the old baseline's weight at most
+            alpha = 1 - math.exp(-LN2 * min(elapsed, self.half_life) / self.half_life)
+            # Plain average over the first samples, so the first one does not dominate
+            alpha = max(alpha, 1 / (baseline.count + 1))
+            baseline.mean, baseline.var = ewma_update(baseline.mean, baseline.var, learned, alpha)
+
+        if season[2] == 0:
+            season[0], season[1] = learned, 0.0
+        else:
+            # Only time spent inside this bucket counts towards its decay
+            elapsed = min(max(0.0, now - baseline.updated), self.width)
+            alpha = 1 - math.exp(-LN2 * elapsed / (self.seasonal_half_life * self.width))
+            alpha = max(alpha, 1 / (season[2] + 1))
+            season[0], season[1] = ewma_update(season[0], season[1], learned, alpha)
+        season[2] += 1
+
+        baseline.count += 1
+        baseline.updated = now
+        self._dirty = True
+        return deviation
+
+    def load(self) -> None:
+        """Load persisted baselines, ignoring a missing or unreadable file"""
+        try:
+            state = read_json(self.path)
+            if state is None:
+                return
+            self.series = {
+                name: Baseline.from_dict(series, self.buckets) for name, series in state.get('series', {}).items()
+            }
+        except LOAD_ERRORS as e:
+            print(f"Warning: Could not load baselines from {self.path}: {e}")
+
+    def save(self, force: bool = False) -> None:
+        """Persist atomically if anything changed, at most every save_interval seconds unless forced"""
+        now = time.time()
+        with self._lock:
+            if not self.path or not self._dirty or (not force and now - self._saved_at < self.save_interval):
+                return
+            self._save(now)
+
+    def _save(self, now: float) -> None:
+        # Series not seen for the retention period (removed endpoints, renamed metrics) are dropped
+        self.series = {name: b for name, b in self.series.items() if now - b.updated < self.retention}
+        state = {'buckets': self.buckets, 'series': {name: b.to_dict() for name, b in self.series.items()}}
+        write_json(self.path, state)
+        self._dirty = False
+        self._saved_at = now
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Check Plan
+Validates config.yml against a schema and compiles it into a plan
+
+Checks read typed, pre-sorted objects from the plan instead of merging and
+indexing nested config dicts on every run. PlanWatcher polls the file's
+mtime and swaps in a newly compiled plan with one reference assignment, so a
+check always sees one consistent plan; a config that fails validation is
+reported and the last good plan stays in place.
+"""
+
+import copy
+import os
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+NUMBER = (int, float)
+
+
+class ConfigError(Exception):
+    """config.yml does not match the schema or is inconsistent"""
+
+
+class Field:
+    """Schema leaf: a value of one of the given types, optionally from a fixed set"""
+
+    __slots__ = ('types', 'required', 'choices')
+
+    def __init__(self, types, required: bool = True, choices: Optional[Tuple] = None):
+        self.types = types if isinstance(types, tuple) else (types,)
+        self.required = required
+        self.choices = choices
+
+
+class Section:
+    """Schema node for a mapping (dict spec) or a list (one-item list spec)"""
+
+    __slots__ = ('spec', 'required')
+
+    def __init__(self, spec, required: bool = True):
+        self.spec = spec
+        self.required = required
+
+
+THRESHOLDS = {
+    'critical_threshold': Field(NUMBER),
+    'warning_threshold': Field(NUMBER),
+    'critical_penalty': Field(NUMBER),
+    'warning_penalty': Field(NUMBER),
+}
+
+# Per-container overrides may set any subset of the thresholds
+PARTIAL_THRESHOLDS = {key: Field(NUMBER, required=False) for key in THRESHOLDS}
+
+# Error rates (errors per minute) used for log_analysis.priorities.default when it is not configured
+DEFAULT_LOG_THRESHOLDS = {
+    'critical_threshold': 50,
+    'warning_threshold': 5,
+    'critical_penalty': 3,
+    'warning_penalty': 1,
+}
+
+CONTAINER = {
+    'name': Field(str),
+    'display': Field(str),
+    'penalty_down': Field(NUMBER),
+    'penalty_restart': Field(NUMBER),
+    'resources': Section({
+        'cpu': Section(PARTIAL_THRESHOLDS, required=False),
+        'memory': Section(PARTIAL_THRESHOLDS, required=False),
+    }, required=False),
+}
+
+ENDPOINT = {
+    'name': Field(str),
+    'url': Field(str),
+    'method': Field(str, required=False),
+}
+
+NETWORK_TARGET = {
+    'name': Field(str),
+    'type': Field(str, choices=('tcp', 'dns', 'icmp')),
+    'host': Field(str, required=False),
+    'port': Field(int, required=False),
+    'server': Field(str, required=False),
+    'query': Field(str, required=False),
+}
+
+SCORE_RANGE = {'min': Field(NUMBER), 'emoji': Field(str), 'label': Field(str)}
+
+SCHEMA = {
+    'containers': Section({
+        'critical': Section([CONTAINER]),
+        'standard': Section([CONTAINER]),
+    }),
+    'resources': Section({
+        'source': Field(str, required=False, choices=('netdata', 'local')),
+        'group': Field(str, required=False, choices=('average', 'max')),
+        'window': Field(NUMBER, required=False),
+        'sample_window': Field(NUMBER, required=False),
+        'cpu': Section(THRESHOLDS),
+        'memory': Section(THRESHOLDS),
+        'disk': Section({**THRESHOLDS, 'path': Field(str)}),
+    }),
+    'container_resources': Section({
+        'enabled': Field(bool),
+        'source': Field(str, required=False, choices=('cgroup', 'api')),
+        'cpu': Section(THRESHOLDS),
+        'memory': Section(THRESHOLDS),
+    }, required=False),
+    'service_checks': Section({
+        'enabled': Field(bool),
+        'timeout': Field(NUMBER),
+        'slow_response_penalty': Field(NUMBER),
+        'deadline': Field(NUMBER, required=False),
+        'max_concurrency': Field(int, required=False),
+        'endpoints': Section([ENDPOINT]),
+    }),
+    'restart_detection': Section({
+        'enabled': Field(bool),
+        'recent_window': Field(NUMBER),
+        'old_window': Field(NUMBER),
+        'recent_penalty': Field(NUMBER),
+        'old_penalty': Field(NUMBER),
+        'max_counted_restarts': Field(int, required=False),
+        'unhealthy_penalty': Field(NUMBER, required=False),
+        'unhealthy_recent_penalty': Field(NUMBER, required=False),
+        'source': Field(str, required=False, choices=('events', 'inspect')),
+    }),
+    'daemon': Section({
+        'intervals': Section({}, required=False),
+        'config_poll': Field(NUMBER, required=False),
+    }, required=False),
+    'log_analysis': Section({
+        'enabled': Field(bool),
+        'window': Field(NUMBER, required=False),
+        'max_penalty': Field(NUMBER, required=False),
+        'priorities': Section({'default': Section(THRESHOLDS)}, required=False),
+    }, required=False),
+    'network_checks': Section({
+        'enabled': Field(bool),
+        'count': Field(int, required=False),
+        'timeout': Field(NUMBER, required=False),
+        'targets': Section([NETWORK_TARGET], required=False),
+    }, required=False),
+    'disk_growth': Section({
+        'enabled': Field(bool),
+        'targets': Section([{
+            'name': Field(str),
+            'path': Field(str),
+            'include': Field(str, required=False),
+            'depth': Field(int, required=False, choices=(0, 1)),
+            'labels': Field(str, required=False, choices=('containers',)),
+        }], required=False),
+        'state_path': Field(str, required=False),
+        'window': Field(NUMBER, required=False),
+        'hot_window': Field(NUMBER, required=False),
+        'full_rescan': Field(NUMBER, required=False),
+        'growth_warning': Field(NUMBER, required=False),
+        'growth_critical': Field(NUMBER, required=False),
+        'growth_penalty': Field(NUMBER, required=False),
+        'growth_critical_penalty': Field(NUMBER, required=False),
+        'max_penalty': Field(NUMBER, required=False),
+        'mounts_path': Field(str, required=False),
+        'root': Field(str, required=False),
+        'inodes': Section(THRESHOLDS, required=False),
+    }, required=False),
+    'baselines': Section({
+        'enabled': Field(bool),
+        'path': Field(str, required=False),
+        'half_life': Field(NUMBER, required=False),
+        'seasonal_half_life': Field(NUMBER, required=False),
+        'buckets': Field(int, required=False),
+        'warmup': Field(int, required=False),
+        'season_warmup': Field(int, required=False),
+        'warning_sigma': Field(NUMBER, required=False),
+        'critical_sigma': Field(NUMBER, required=False),
+        'warning_penalty': Field(NUMBER, required=False),
+        'critical_penalty': Field(NUMBER, required=False),
+        'min_latency': Field(NUMBER, required=False),
+        'min_std': Section({
+            'percent': Field(NUMBER, required=False),
+            'latency': Field(NUMBER, required=False),
+        }, required=False),
+    }, required=False),
+    'forwarder': Section({
+        'enabled': Field(bool),
+        'url': Field(str, required=False),
+        'container': Field(str, required=False),
+        'display': Field(str, required=False),
+        'timeout': Field(NUMBER, required=False),
+        'penalty_unhealthy': Field(NUMBER, required=False),
+        'backlog_warning': Field(int, required=False),
+        'backlog_critical': Field(int, required=False),
+        'backlog_penalty': Field(NUMBER, required=False),
+        'backlog_critical_penalty': Field(NUMBER, required=False),
+    }, required=False),
+    'remediation': Section({
+        'enabled': Field(bool),
+        'dry_run': Field(bool, required=False),
+        'state_path': Field(str, required=False),
+        'max_concurrency': Field(int, required=False),
+        'cooldown': Field(NUMBER, required=False),
+        'verify_after': Field(NUMBER, required=False),
+        'wait': Field(NUMBER, required=False),
+        'services': Field(dict, required=False),
+        'breaker': Section({
+            'failures': Field(int, required=False),
+            'reset': Field(NUMBER, required=False),
+        }, required=False),
+        'actions': Section({
+            'restart_container': Section({
+                'enabled': Field(bool, required=False),
+                'stop_timeout': Field(int, required=False),
+            }, required=False),
+            'truncate_logs': Section({
+                'enabled': Field(bool, required=False),
+                'max_bytes': Field(int, required=False),
+                'root': Field(str, required=False),
+            }, required=False),
+        }, required=False),
+    }, required=False),
+    'checks': Section({
+        'budget': Field(NUMBER, required=False),
+        'timeout': Field(NUMBER, required=False),
+        'timeouts': Field(dict, required=False),
+        'failure_penalty': Field(NUMBER, required=False),
+        'plugins': Section([{
+            'name': Field(str),
+            'check': Field(str),
+            'label': Field(str, required=False),
+            'enabled': Field(bool, required=False),
+            'interval': Field(NUMBER, required=False),
+            'timeout': Field(NUMBER, required=False),
+        }], required=False),
+    }, required=False),
+    'tracing': Section({
+        'enabled': Field(bool),
+        'report_path': Field(str, required=False),
+        'notify': Field(bool, required=False),
+    }, required=False),
+    'score_ranges': Section({
+        name: Section(SCORE_RANGE) for name in ('excellent', 'good', 'fair', 'poor', 'critical')
+    }),
+    'notification': Section({
+        'enabled': Field(bool),
+        'ntfy_url': Field(str),
+        'ntfy_topic': Field(str),
+        'max_detail_items': Field(int),
+        'mode': Field(str, required=False, choices=('heartbeat', 'on_change')),
+        'state_path': Field(str, required=False),
+        'change_cooldown': Field(NUMBER, required=False),
+    }),
+}
+
+
+def _type_names(types) -> str:
+    return 'number' if types == NUMBER else ' or '.join(t.__name__ for t in types)
+
+
+def validate(value, spec=None, path: str = '', errors: Optional[List[str]] = None) -> List[str]:
+    """Errors ('path: problem') of value against spec; keys not in the schema are allowed"""
+    if spec is None:
+        spec = Section(SCHEMA)
+    if errors is None:
+        errors = []
+    where = path or 'config'
+
+    if isinstance(spec, Field):
+        # bool is an int subclass; reject it where a number is expected
+        if not isinstance(value, spec.types) or (isinstance(value, bool) and bool not in spec.types):
+            errors.append(f"{where}: expected {_type_names(spec.types)}, got {type(value).__name__}")
+        elif spec.choices is not None and value not in spec.choices:
+            errors.append(f"{where}: must be one of {', '.join(map(str, spec.choices))}, got {value!r}")
+        return errors
+
+    inner = spec.spec
+    if isinstance(inner, list):
+        if not isinstance(value, list):
+            errors.append(f"{where}: expected a list, got {type(value).__name__}")
+            return errors
+        for i, item in enumerate(value):
+            validate(item, Section(inner[0]), f"{path}[{i}]", errors)
+        return errors
+
+    if not isinstance(value, dict):
+        errors.append(f"{where}: expected a mapping, got {type(value).__name__}")
+        return errors
+    for key, child in inner.items():
+        child_path = f"{path}.{key}" if path else key
+        if key not in value or value[key] is None:
+            if child.required:
+                errors.append(f"{child_path}: missing")
+            continue
+        validate(value[key], child if isinstance(child, (Field, Section)) else Section(child), child_path, errors)
+    return errors
+
+
+class Thresholds:
+    """Warning/critical levels of one metric, checked from the most severe down"""
+
+    __slots__ = ('levels',)
+
+    def __init__(self, config: Dict, name: str = 'thresholds'):
+        if config['warning_threshold'] > config['critical_threshold']:
+            raise ConfigError(f"{name}: warning_threshold is above critical_threshold")
+        # Pre-sorted severity table: (threshold, severity, penalty), highest first
+        self.levels = (
+            (config['critical_threshold'], 'critical', config['critical_penalty']),
+            (config['warning_threshold'], 'medium', config['warning_penalty']),
+        )
+
+    def classify(self, value: float) -> Optional[Tuple[str, float]]:
+        """(severity, penalty) of the first level value reaches, or None"""
+        for threshold, severity, penalty in self.levels:
+            if value >= threshold:
+                return severity, penalty
+        return None
+
+
+class ContainerSpec:
+    """One monitored container with its thresholds resolved against the defaults"""
+
+    __slots__ = ('name', 'display', 'priority', 'penalty_down', 'penalty_restart', 'cpu', 'memory')
+
+    def __init__(self, entry: Dict, priority: str, defaults: Dict):
+        self.name = entry['name']
+        self.display = entry['display']
+        self.priority = priority
+        self.penalty_down = entry['penalty_down']
+        self.penalty_restart = entry['penalty_restart']
+        overrides = entry.get('resources') or {}
+        # Per-container thresholds override the container_resources defaults key by key
+        self.cpu = self.memory = None
+        for resource in ('cpu', 'memory'):
+            if resource in defaults:
+                merged = {**defaults[resource], **(overrides.get(resource) or {})}
+                setattr(self, resource, Thresholds(merged, f"{self.name}.resources.{resource}"))
+
+
+class Endpoint:
+    """A service probe target with its defaults applied"""
+
+    __slots__ = ('name', 'url', 'method')
+
+    def __init__(self, entry: Dict):
+        self.name = entry['name']
+        self.url = entry['url']
+        self.method = entry.get('method', 'GET').upper()
+        if not self.url.startswith(('http://', 'https://')):
+            raise ConfigError(f"endpoint {self.name}: url must start with http:// or https://")
+
+
+class CheckPlan:
+    """Precomputed view of one validated config
+
+    Attributes cannot be reassigned. config is a deep copy of the raw mapping,
+    for the settings that components read once when they are created; it is
+    a plain dict, so callers must not modify it.
+    """
+
+    __slots__ = ('config', 'containers', 'container_names', 'displays', 'resources', 'endpoints',
+                 'log_priorities', 'inodes', 'score_ranges', 'mtime')
+
+    def __init__(self, config: Dict, mtime: Optional[float] = None):
+        errors = validate(config)
+        if errors:
+            raise ConfigError('; '.join(errors))
+
+        container_defaults = config.get('container_resources') or {}
+        containers = tuple(
+            ContainerSpec(entry, priority, container_defaults)
+            for priority in ('critical', 'standard')
+            for entry in config['containers'][priority]
+        )
+        names = tuple(c.name for c in containers)
+        if len(set(names)) != len(names):
+            raise ConfigError("containers: a container is listed more than once")
+
+        restart = config['restart_detection']
+        if restart['recent_window'] > restart['old_window']:
+            raise ConfigError("restart_detection: recent_window is longer than old_window")
+
+        for plugin in (config.get('checks') or {}).get('plugins') or []:
+            if ':' not in plugin['check'].strip(':'):
+                raise ConfigError(f"checks.plugins {plugin['name']}: check must be module:function")
+
+        # Every rate classifies: priorities without their own levels use the default
+        priorities = {'default': DEFAULT_LOG_THRESHOLDS, **((config.get('log_analysis') or {}).get('priorities') or {})}
+        inodes = (config.get('disk_growth') or {}).get('inodes')
+        ranges = config['score_ranges']
+        values = {
+            'config': copy.deepcopy(config),
+            'containers': containers,
+            'container_names': names,
+            'displays': MappingProxyType({c.name: c.display for c in containers}),
+            'resources': MappingProxyType({
+                name: Thresholds(config['resources'][name], f"resources.{name}")
+                for name in ('cpu', 'memory', 'disk')
+            }),
+            'endpoints': tuple(Endpoint(entry) for entry in config['service_checks']['endpoints']),
+            'log_priorities': MappingProxyType({
+                name: Thresholds(levels, f"log_analysis.priorities.{name}") for name, levels in priorities.items()
+            }),
+            'inodes': Thresholds(inodes, "disk_growth.inodes") if inodes else None,
+            # Highest minimum first, so the first range a score reaches is its range
+            'score_ranges': tuple(sorted(
+                ((ranges[name]['min'], ranges[name]['emoji'], ranges[name]['label'], name) for name in ranges),
+                reverse=True
+            )),
+            'mtime': mtime,
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CheckPlan is immutable")
+
+    def range_for_score(self, score: float) -> Tuple[str, str, str]:
+        """(emoji, label, range name) of the score range a clamped score falls in"""
+        score = max(0, min(100, score))
+        for minimum, emoji, label, name in self.score_ranges:
+            if score >= minimum:
+                return emoji, label, name
+        _, emoji, label, name = self.score_ranges[-1]
+        return emoji, label, name
+
+
+def load_plan(path: str) -> CheckPlan:
+    """Read, validate and compile a config file (raises ConfigError or OSError)"""
+    mtime = os.stat(path).st_mtime
+    with open(path, 'r') as f:
+        try:
+            config = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            raise ConfigError(f"Invalid YAML: {e}")
+    if not isinstance(config, dict):
+        raise ConfigError("config: expected a mapping at the top level")
+    return CheckPlan(config, mtime)
+
+
+class PlanWatcher:
+    """Recompiles the plan when the config file's mtime changes, keeping the last good one"""
+
+    def __init__(self, path: str, plan: CheckPlan):
+        self.path = path
+        self.plan = plan
+        self._seen = plan.mtime
+
+    def poll(self) -> Optional[CheckPlan]:
+        """The new plan if the file changed and compiles, else None"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            print(f"Warning: Could not stat {self.path}: {e}")
+            return None
+        if mtime == self._seen:
+            return None
+
+        # Remember the attempt so a broken file is reported once, not on every poll
+        self._seen = mtime
+        try:
+            plan = load_plan(self.path)
+        except (ConfigError, OSError) as e:
+            print(f"Warning: Rejected {self.path}, keeping the last good config: {e}", flush=True)
+            return None
+        self.plan = plan
+        return plan
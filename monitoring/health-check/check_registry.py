@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Check Registry
+Check plugins, loaded when first run, run concurrently under a time budget
+
+A check is a callable taking the HealthChecker. Like the built-in checks
+(HealthChecker methods), it deducts from checker.score and appends to
+checker.issues and checker.details, which point at the family's own result
+while it runs, so checks running side by side never mix. Plugins are named
+"module:function" under checks.plugins and imported on their first enabled
+run, so a disabled check never imports its dependencies.
+
+run() starts each check on its own thread and waits until the check's
+timeout or the overall budget, whichever comes first. A check that raises or
+runs past its limit is reported through on_failure and scored like any other
+issue; the rest of the report is unaffected. A check still running past its
+limit is left to finish on its daemon thread (a late result still counts),
+and is not started again until it does.
+"""
+
+import importlib
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Callable, Dict, List, Optional
+
+
+class CheckState:
+    """Score, issues and details of one check family run (or of the composed report)"""
+
+    __slots__ = ('score', 'issues', 'details')
+
+    def __init__(self):
+        self.score = 100
+        self.issues: List[Dict] = []
+        self.details: Dict = {}
+
+
+class CheckSpec:
+    """One registered check: where it lives and what enables it
+
+    target is a HealthChecker method name (built-in) or "module:function"
+    (plugin). section names the config section whose 'enabled' flag turns
+    the check on; checks without one run whenever enabled is set.
+    """
+
+    __slots__ = ('name', 'label', 'target', 'section', 'enabled', 'interval', 'timeout')
+
+    def __init__(self, name: str, label: str, target: str, section: Optional[str] = None, enabled: bool = True,
+                 interval: float = 60, timeout: Optional[float] = None):
+        self.name = name
+        self.label = label
+        self.target = target
+        self.section = section
+        self.enabled = enabled
+        self.interval = interval
+        self.timeout = timeout
+
+    def is_enabled(self, config: Dict) -> bool:
+        if self.section is None:
+            return self.enabled
+        return bool((config.get(self.section) or {}).get('enabled', False))
+
+
+def failure_result(component: str, message: str, penalty: float, severity: str = 'critical') -> Dict:
+    """A family result recording that the family could not run"""
+    return {
+        'penalty': penalty,
+        'issues': [{'severity': severity, 'component': component, 'issue': message, 'penalty': penalty}],
+        'details': {},
+        'checked_at': time.time()
+    }
+
+
+def describe_error(error: BaseException) -> str:
+    """Short error text for a report (connection errors carry the full request URL)"""
+    text = str(error) or type(error).__name__
+    return text if len(text) <= 120 else text[:117] + '...'
+
+
+class CheckRegistry:
+    """Registered checks in run order, their loaded callables and their running threads"""
+
+    def __init__(self):
+        self.specs: Dict[str, CheckSpec] = {}
+        self._loaded: Dict[str, Callable] = {}
+        self._running: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def register(self, spec: CheckSpec) -> None:
+        if spec.name in self.specs:
+            raise ValueError(f"check {spec.name} is already registered")
+        self.specs[spec.name] = spec
+
+    def names(self) -> List[str]:
+        return list(self.specs)
+
+    def enabled(self, config: Dict) -> List[str]:
+        """Names of the checks the config enables, in registration order"""
+        return [name for name, spec in self.specs.items() if spec.is_enabled(config)]
+
+    def load(self, name: str, checker) -> Callable[[], None]:
+        """The check as a no-argument callable, importing a plugin's module on first use"""
+        spec = self.specs[name]
+        if ':' not in spec.target:
+            return getattr(checker, spec.target)
+
+        func = self._loaded.get(name)
+        if func is None:
+            module, attribute = spec.target.split(':', 1)
+            func = self._loaded[name] = getattr(importlib.import_module(module), attribute)
+        return lambda: func(checker)
+
+    def run(self, names: List[str], call: Callable[[str], None], on_failure: Callable[[str, str], None],
+            timeout_for: Callable[[str], float], budget: Optional[float] = None) -> Dict[str, str]:
+        """Run call(name) for every name at once, each limited to min(its timeout, budget)
+
+        Returns the outcome per name: 'ok', 'failed', 'timeout' or 'busy'
+        (still running from an earlier run).
+        """
+        start = time.monotonic()
+        outcomes = {}
+        pending = {}
+        for name in names:
+            with self._lock:
+                previous = self._running.get(name)
+                if previous is not None and not previous.done():
+                    busy = True
+                else:
+                    busy = False
+                    future = self._running[name] = self._start(name, call)
+            if busy:
+                outcomes[name] = 'busy'
+                on_failure(name, f"{name} check still running from an earlier run")
+                continue
+            limit = timeout_for(name)
+            if budget is not None:
+                limit = min(limit, budget)
+            pending[future] = (name, limit)
+
+        while pending:
+            remaining = min(start + limit - time.monotonic() for _, limit in pending.values())
+            wait(pending, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for future, (name, limit) in list(pending.items()):
+                if future.done():
+                    del pending[future]
+                    error = future.exception()
+                    if error is None:
+                        outcomes[name] = 'ok'
+                    else:
+                        outcomes[name] = 'failed'
+                        on_failure(name, f"{name} check failed: {describe_error(error)}")
+                elif now - start >= limit:
+                    del pending[future]
+                    outcomes[name] = 'timeout'
+                    on_failure(name, f"{name} check timed out (>{limit:g}s)")
+        return outcomes
+
+    @staticmethod
+    def _start(name: str, call: Callable[[str], None]) -> Future:
+        """Run call(name) on a daemon thread, so a hung check never blocks exit"""
+        future = Future()
+
+        def target():
+            future.set_running_or_notify_cancel()
+            try:
+                call(name)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+
+        threading.Thread(target=target, name=f"check-{name}", daemon=True).start()
+        return future
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+System Resource Collectors
+In-process CPU, memory and disk sampling from /proc and statvfs
+
+No subprocesses are spawned. CPU usage is computed from /proc/stat deltas
+over a sampling window, memory from /proc/meminfo (MemAvailable) and disk
+from os.statvfs.
+
+Netdata (local or remote) and node-exporter are read over HTTP by collectors
+with the same cpu()/memory()/disk() interface.
+"""
+
+import math
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+# /proc/stat cpu line fields, in kernel order
+CPU_FIELDS = ('user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', 'steal')
+
+
+def read_cpu_times(proc_path: str = '/proc') -> Dict[str, Tuple[int, ...]]:
+    """Read cumulative jiffies for the aggregate 'cpu' line and every 'cpuN' line"""
+    times = {}
+    with open(os.path.join(proc_path, 'stat'), 'r') as f:
+        for line in f:
+            if not line.startswith('cpu'):
+                break
+            parts = line.split()
+            # guest/guest_nice are already included in user/nice
+            values = tuple(int(v) for v in parts[1:1 + len(CPU_FIELDS)])
+            values += (0,) * (len(CPU_FIELDS) - len(values))
+            times[parts[0]] = values
+    return times
+
+
+def cpu_breakdown(before: Tuple[int, ...], after: Tuple[int, ...]) -> Dict[str, float]:
+    """Percentages of one CPU line between two samples"""
+    deltas = dict(zip(CPU_FIELDS, (max(0, a - b) for a, b in zip(after, before))))
+    total = sum(deltas.values())
+    if total == 0:
+        return {'percent': 0.0, 'iowait': 0.0, 'steal': 0.0, 'idle': 100.0}
+
+    idle = deltas['idle'] + deltas['iowait']
+    return {
+        'percent': (total - idle) / total * 100.0,
+        'iowait': deltas['iowait'] / total * 100.0,
+        'steal': deltas['steal'] / total * 100.0,
+        'idle': deltas['idle'] / total * 100.0,
+    }
+
+
+def read_meminfo(proc_path: str = '/proc') -> Dict[str, int]:
+    """Read /proc/meminfo into a dict of kB values"""
+    meminfo = {}
+    with open(os.path.join(proc_path, 'meminfo'), 'r') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            fields = rest.split()
+            if fields:
+                meminfo[key] = int(fields[0])
+    return meminfo
+
+
+class ResourceCollector:
+    """Samples host resources without forking external tools"""
+
+    def __init__(self, proc_path: str = '/proc', sample_window: float = 1.0):
+        self.proc_path = proc_path
+        self.sample_window = sample_window
+        self._last_cpu: Optional[Tuple[float, Dict[str, Tuple[int, ...]]]] = None
+
+    def cpu(self) -> Dict:
+        """CPU usage over the sampling window
+
+        When the previous sample is at least one window old (e.g. in a
+        long-running process) the delta since then is used without sleeping.
+        """
+        now = time.monotonic()
+        if self._last_cpu is None or now - self._last_cpu[0] < self.sample_window:
+            before = read_cpu_times(self.proc_path)
+            time.sleep(self.sample_window)
+            now = time.monotonic()
+        else:
+            before = self._last_cpu[1]
+
+        after = read_cpu_times(self.proc_path)
+        self._last_cpu = (now, after)
+
+        overall = cpu_breakdown(before['cpu'], after['cpu'])
+        per_core: List[float] = []
+        for name in sorted((n for n in after if n != 'cpu'), key=lambda n: int(n[3:])):
+            if name in before:
+                per_core.append(cpu_breakdown(before[name], after[name])['percent'])
+
+        return {
+            'percent': overall['percent'],
+            'iowait_percent': overall['iowait'],
+            'steal_percent': overall['steal'],
+            'per_core': per_core,
+        }
+
+    def memory(self) -> Dict:
+        """Memory usage based on MemAvailable, plus swap"""
+        meminfo = read_meminfo(self.proc_path)
+        total = meminfo.get('MemTotal', 0)
+        available = meminfo.get('MemAvailable', meminfo.get('MemFree', 0))
+        swap_total = meminfo.get('SwapTotal', 0)
+        swap_free = meminfo.get('SwapFree', 0)
+
+        return {
+            'percent': (total - available) / total * 100.0 if total else 0.0,
+            'total_kb': total,
+            'available_kb': available,
+            'swap_percent': (swap_total - swap_free) / swap_total * 100.0 if swap_total else 0.0,
+            'swap_total_kb': swap_total,
+        }
+
+    def disk(self, path: str) -> Dict:
+        """Filesystem usage for path, rounded the same way df reports Use%"""
+        st = os.statvfs(path)
+        used = (st.f_blocks - st.f_bfree) * st.f_frsize
+        available = st.f_bavail * st.f_frsize
+        # df counts only space available to unprivileged users towards the total
+        usable = used + available
+        return {
+            'percent': float(math.ceil(used * 100.0 / usable)) if usable else 0.0,
+            'total_bytes': st.f_blocks * st.f_frsize,
+            'used_bytes': used,
+            'available_bytes': available,
+        }
+
+
+def parse_prometheus_text(text: str, prefixes: Tuple[str, ...]) -> List[Tuple[str, Dict[str, str], float]]:
+    """Samples of the metrics starting with one of prefixes, as (name, labels, value)
+
+    Handles the label syntax node-exporter emits; lines of other metrics are
+    skipped before any parsing.
+    """
+    samples = []
+    for line in text.splitlines():
+        if not line.startswith(prefixes):
+            continue
+        head, _, value = line.rpartition(' ')
+        name, _, label_text = head.partition('{')
+        labels = {}
+        for pair in label_text.rstrip('}').split('",'):
+            key, _, label_value = pair.partition('="')
+            if key:
+                labels[key.strip(',')] = label_value.rstrip('"')
+        try:
+            samples.append((name, labels, float(value)))
+        except ValueError:
+            continue
+    return samples
+
+
+class NodeExporterCollector:
+    """Samples a remote host's resources from its node-exporter /metrics
+
+    Returns the same shapes as ResourceCollector, so checks do not care
+    whether a host is read from /proc or over HTTP.
+    """
+
+    PREFIXES = ('node_cpu_seconds_total', 'node_memory_', 'node_filesystem_')
+
+    def __init__(self, session, url: str, timeout: float = 5.0, sample_window: float = 1.0):
+        self.session = session
+        self.url = url
+        self.timeout = timeout
+        self.sample_window = sample_window
+        self._last_cpu: Optional[Tuple[float, Dict[str, Tuple[float, ...]]]] = None
+        self._scrape: Optional[Tuple[float, List]] = None
+
+    def _samples(self, max_age: float = 1.0) -> List[Tuple[str, Dict[str, str], float]]:
+        """One scrape shared by cpu(), memory() and disk() within max_age seconds"""
+        now = time.monotonic()
+        if self._scrape is None or now - self._scrape[0] >= max_age:
+            response = self.session.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            self._scrape = (now, parse_prometheus_text(response.text, self.PREFIXES))
+        return self._scrape[1]
+
+    def _cpu_times(self, samples) -> Dict[str, Tuple[float, ...]]:
+        """Seconds per mode for each CPU and the 'cpu' aggregate, in CPU_FIELDS order"""
+        per_cpu: Dict[str, Dict[str, float]] = {}
+        for name, labels, value in samples:
+            if name == 'node_cpu_seconds_total':
+                per_cpu.setdefault(f"cpu{labels.get('cpu', '0')}", {})[labels.get('mode')] = value
+
+        times = {cpu: tuple(modes.get(field, 0.0) for field in CPU_FIELDS) for cpu, modes in per_cpu.items()}
+        if times:
+            times['cpu'] = tuple(sum(values) for values in zip(*times.values()))
+        return times
+
+    def cpu(self) -> Dict:
+        """CPU usage between two scrapes, reusing the previous one when old enough"""
+        now = time.monotonic()
+        if self._last_cpu is None or now - self._last_cpu[0] < self.sample_window:
+            before = self._cpu_times(self._samples(max_age=0))
+            time.sleep(self.sample_window)
+            now = time.monotonic()
+        else:
+            before = self._last_cpu[1]
+
+        after = self._cpu_times(self._samples(max_age=0))
+        self._last_cpu = (now, after)
+        if 'cpu' not in after or 'cpu' not in before:
+            raise ValueError("No node_cpu_seconds_total samples")
+
+        overall = cpu_breakdown(before['cpu'], after['cpu'])
+        cores = sorted((n for n in after if n != 'cpu' and n in before), key=lambda n: int(n[3:]))
+        return {
+            'percent': overall['percent'],
+            'iowait_percent': overall['iowait'],
+            'steal_percent': overall['steal'],
+            'per_core': [cpu_breakdown(before[n], after[n])['percent'] for n in cores],
+        }
+
+    def memory(self) -> Dict:
+        """Memory usage based on MemAvailable, plus swap"""
+        values = {name: value for name, _, value in self._samples() if name.startswith('node_memory_')}
+        total = values.get('node_memory_MemTotal_bytes', 0) / 1024
+        available = values.get('node_memory_MemAvailable_bytes', values.get('node_memory_MemFree_bytes', 0)) / 1024
+        swap_total = values.get('node_memory_SwapTotal_bytes', 0) / 1024
+        swap_free = values.get('node_memory_SwapFree_bytes', 0) / 1024
+        if not total:
+            raise ValueError("No node_memory_MemTotal_bytes sample")
+
+        return {
+            'percent': (total - available) / total * 100.0,
+            'total_kb': int(total),
+            'available_kb': int(available),
+            'swap_percent': (swap_total - swap_free) / swap_total * 100.0 if swap_total else 0.0,
+            'swap_total_kb': int(swap_total),
+        }
+
+    def disk(self, path: str) -> Dict:
+        """Filesystem usage for the mountpoint path, rounded the same way df reports Use%"""
+        values = {name: value for name, labels, value in self._samples()
+                  if name.startswith('node_filesystem_') and labels.get('mountpoint') == path}
+        if 'node_filesystem_size_bytes' not in values:
+            raise ValueError(f"No node_filesystem samples for mountpoint {path}")
+
+        size = values['node_filesystem_size_bytes']
+        used = size - values.get('node_filesystem_free_bytes', 0)
+        available = values.get('node_filesystem_avail_bytes', 0)
+        usable = used + available
+        return {
+            'percent': float(math.ceil(used * 100.0 / usable)) if usable else 0.0,
+            'total_bytes': int(size),
+            'used_bytes': int(used),
+            'available_bytes': int(available),
+        }
+
+
+class NetdataCollector:
+    """Reads resources from Netdata's /api/v1/data, aggregated over a window
+
+    Netdata already keeps per-second CPU, memory and disk data, so nothing
+    is sampled here: each chart is one request returning up to max_points
+    points over the last window seconds. Totals are computed per point and
+    then combined with group ('average' for sustained load, 'max' for the
+    worst point), so a brief spike does not decide a threshold on its own.
+    """
+
+    GROUPS = {'average': lambda values: sum(values) / len(values), 'max': max}
+
+    def __init__(self, session, url: str, timeout: float = 5.0, window: int = 300, group: str = 'average',
+                 max_points: int = 60):
+        if group not in self.GROUPS:
+            raise ValueError(f"Unknown Netdata group: {group} (expected average or max)")
+        self.session = session
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.window = max(1, int(window))
+        self.group = group
+        self.max_points = max_points
+
+    def series(self, chart: str, window: Optional[int] = None, points: Optional[int] = None) -> List[Dict[str, float]]:
+        """Dimension values per point of a chart over the last window seconds, oldest first"""
+        window = window or self.window
+        response = self.session.get(
+            f"{self.url}/api/v1/data",
+            params={
+                'chart': chart,
+                'after': -window,
+                'points': points or min(window, self.max_points),
+                'group': 'average',
+                'format': 'json',
+            },
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        rows = data.get('data')
+        if not rows:
+            raise ValueError(f"No data for Netdata chart {chart}")
+        labels = data['labels'][1:]
+        # Netdata returns newest first; a null is a gap in collection
+        return [{label: value or 0.0 for label, value in zip(labels, row[1:])} for row in reversed(rows)]
+
+    def aggregate(self, values: List[float], group: Optional[str] = None) -> float:
+        """Combine per-point values with group (default: the configured one)"""
+        return self.GROUPS[group or self.group](values)
+
+    @staticmethod
+    def _used_percent(dims: Dict[str, float]) -> float:
+        total = sum(dims.values())
+        return dims.get('used', 0.0) / total * 100.0 if total else 0.0
+
+    def cpu_series(self, window: Optional[int] = None, points: Optional[int] = None) -> List[Dict[str, float]]:
+        """Busy, iowait and steal percent per point (system.cpu has no idle dimension)"""
+        return [
+            {'percent': sum(dims.values()), 'iowait': dims.get('iowait', 0.0), 'steal': dims.get('steal', 0.0)}
+            for dims in self.series('system.cpu', window, points)
+        ]
+
+    def memory_series(self, window: Optional[int] = None, points: Optional[int] = None) -> List[float]:
+        """Memory percent per point from system.ram (used excludes cache and buffers)"""
+        return [self._used_percent(dims) for dims in self.series('system.ram', window, points)]
+
+    def cpu(self) -> Dict:
+        """CPU usage over the window"""
+        points = self.cpu_series()
+        return {
+            'percent': self.aggregate([p['percent'] for p in points]),
+            'iowait_percent': self.aggregate([p['iowait'] for p in points]),
+            'steal_percent': self.aggregate([p['steal'] for p in points]),
+            'per_core': [],
+        }
+
+    def memory(self) -> Dict:
+        """Memory and swap usage over the window (system.ram, mem.swap in MiB)"""
+        ram = self.series('system.ram')
+        latest = ram[-1]
+        total = sum(latest.values())
+        try:
+            swap = self.series('mem.swap')
+        except ValueError:
+            swap = []  # no swap configured
+
+        return {
+            'percent': self.aggregate([self._used_percent(dims) for dims in ram]),
+            'total_kb': int(total * 1024),
+            'available_kb': int((total - latest.get('used', 0.0)) * 1024),
+            'swap_percent': self.aggregate([self._used_percent(dims) for dims in swap]) if swap else 0.0,
+            'swap_total_kb': int(sum(swap[-1].values()) * 1024) if swap else 0,
+        }
+
+    def disk(self, path: str) -> Dict:
+        """Filesystem usage from disk_space.<mountpoint> (GiB), df-style Use%"""
+        rows = self.series('disk_space.' + path.replace('/', '_'))  # '/' -> disk_space._
+        latest = rows[-1]
+
+        def percent(dims: Dict[str, float]) -> float:
+            usable = dims.get('used', 0.0) + dims.get('avail', 0.0)
+            return math.ceil(dims.get('used', 0.0) * 100.0 / usable) if usable else 0.0
+
+        usable = latest.get('used', 0.0) + latest.get('avail', 0.0)
+        gib = 1024 ** 3
+        return {
+            'percent': float(self.aggregate([percent(dims) for dims in rows])),
+            'total_bytes': int((usable + latest.get('reserved for root', 0.0)) * gib),
+            'used_bytes': int(latest.get('used', 0.0) * gib),
+            'available_bytes': int(latest.get('avail', 0.0) * gib),
+        }
+
+    def summary(self, window: int, points: int = 144) -> Dict[str, Dict[str, float]]:
+        """Average and max of CPU and memory percent over window (e.g. the 12h report)"""
+        cpu = [p['percent'] for p in self.cpu_series(window, points)]
+        memory = self.memory_series(window, points)
+        return {
+            'cpu': {'average': self.aggregate(cpu, 'average'), 'max': max(cpu)},
+            'memory': {'average': self.aggregate(memory, 'average'), 'max': max(memory)},
+        }
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Docker Container Snapshot
+Captures the state of all configured containers once per health-check run
+
+One filtered listing call replaces the per-container inspect round trips.
+Full inspect payloads are only fetched (concurrently) for containers whose
+restart history actually matters for scoring.
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+import tracing
+
+# Docker renders uptime with its HumanDuration helper, e.g. "Up 3 hours (healthy)"
+_UP_PATTERN = re.compile(
+    r'^Up (?:(Less than a second|About a minute|About an hour)|(\d+) (second|minute|hour|day|week|month|year)s?)'
+)
+
+# The listing appends the healthcheck state, e.g. "Up 2 hours (unhealthy)" or "(health: starting)"
+_HEALTH_PATTERN = re.compile(r'\((?:health: )?(healthy|unhealthy|starting)\)$')
+
+_UNIT_SECONDS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+    'week': 7 * 86400,
+    'month': 30 * 86400,
+    'year': 365 * 86400,
+}
+
+
+def uptime_lower_bound(status: str) -> Optional[float]:
+    """Return a conservative lower bound of uptime in seconds from a listing Status string
+
+    Returns None when the container is not up or the string cannot be parsed,
+    which callers should treat as "unknown".
+    """
+    match = _UP_PATTERN.match(status or '')
+    if not match:
+        return None
+    if match.group(1):
+        return 0.0
+    # Docker rounds to the nearest unit, so step one unit back to stay safe
+    count = int(match.group(2))
+    return float(max(0, count - 1) * _UNIT_SECONDS[match.group(3)])
+
+
+class ContainerSnapshot:
+    """Point-in-time view of configured containers shared by every check in a run"""
+
+    def __init__(self, summaries: Dict[str, dict], inspected: Dict[str, dict]):
+        self.summaries = summaries
+        self.inspected = inspected
+
+    @classmethod
+    def capture(cls, api, names: Iterable[str], inspect_below_uptime: Optional[float] = None,
+                max_workers: int = 8) -> 'ContainerSnapshot':
+        """Take a snapshot with one listing call plus concurrent inspects where needed
+
+        api: low-level docker APIClient (docker_client.api)
+        inspect_below_uptime: inspect containers whose uptime may be below this
+            many seconds (or is unknown). None disables inspection entirely.
+        """
+        wanted = set(names)
+        if not wanted:
+            return cls({}, {})
+
+        # Name filters are regular expressions matched against "/name" or "name"
+        name_filters = [f"^/?{re.escape(name)}$" for name in sorted(wanted)]
+        with tracing.span('docker.list', containers=len(wanted)):
+            listing = api.containers(all=True, filters={'name': name_filters})
+
+        summaries = {}
+        for summary in listing:
+            for raw_name in summary.get('Names') or []:
+                name = raw_name.lstrip('/')
+                if name in wanted:
+                    summaries[name] = summary
+                    break
+
+        snapshot = cls(summaries, {})
+        if inspect_below_uptime is not None:
+            snapshot.inspect_recent(api, inspect_below_uptime, max_workers)
+        return snapshot
+
+    def inspect_recent(self, api, below_uptime: float, max_workers: int = 8) -> None:
+        """Fetch inspect payloads of containers whose uptime may be below below_uptime
+
+        Unknown uptimes count as below. Containers inspected earlier are not
+        fetched again, so checks sharing a snapshot can each ask for what they need.
+        """
+        to_inspect = []
+        for name, summary in self.summaries.items():
+            if name in self.inspected:
+                continue
+            uptime = uptime_lower_bound(summary.get('Status', ''))
+            if uptime is None or uptime < below_uptime:
+                to_inspect.append(name)
+
+        if not to_inspect:
+            return
+        summaries = self.summaries
+        parent = tracing.current()
+
+        def inspect(name):
+            try:
+                with tracing.span('docker.inspect', parent=parent, container=name):
+                    return name, api.inspect_container(summaries[name]['Id'])
+            except Exception as e:
+                print(f"Warning: Could not inspect container {name}: {e}")
+                return name, None
+
+        workers = max(1, min(max_workers, len(to_inspect)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for name, attrs in executor.map(inspect, to_inspect):
+                if attrs is not None:
+                    self.inspected[name] = attrs
+
+    def get(self, name: str) -> Optional[dict]:
+        """Listing entry for a container, or None if it does not exist"""
+        return self.summaries.get(name)
+
+    def status(self, name: str) -> Optional[str]:
+        """Container state as reported by the listing (running, exited, ...)"""
+        summary = self.summaries.get(name)
+        return summary.get('State') if summary else None
+
+    def health(self, name: str) -> Optional[str]:
+        """Docker healthcheck state from the listing (healthy, unhealthy, starting), None without one"""
+        summary = self.summaries.get(name)
+        match = _HEALTH_PATTERN.search(summary.get('Status', '')) if summary else None
+        return match.group(1) if match else None
+
+    def inspect_payload(self, name: str) -> Optional[dict]:
+        """Full inspect payload if it was fetched for this snapshot"""
+        return self.inspected.get(name)
+
+
+class SharedSnapshot:
+    """The container snapshot of one run, taken by the first check that asks for it
+
+    Checks running concurrently in the run get the same listing; inspect
+    payloads one of them needs are added to it instead of listing again.
+    """
+
+    def __init__(self, api, names: Iterable[str], max_workers: int = 8):
+        self.api = api
+        self.names = list(names)
+        self.max_workers = max_workers
+        self._snapshot: Optional[ContainerSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get(self, inspect_below_uptime: Optional[float] = None) -> ContainerSnapshot:
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = ContainerSnapshot.capture(
+                    self.api, self.names, inspect_below_uptime=inspect_below_uptime, max_workers=self.max_workers
+                )
+            elif inspect_below_uptime is not None:
+                self._snapshot.inspect_recent(self.api, inspect_below_uptime, self.max_workers)
+            return self._snapshot
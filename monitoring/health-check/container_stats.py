@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Per-Container Resource Stats
+CPU, memory, network and block I/O for each configured container
+
+Two sources produce the same raw counters:
+- cgroup: reads cgroup v2 files under cgroup_root directly (microseconds
+  per container); the only Docker API call is one inspect per container
+  start, for the host pid whose /proc/<pid>/net/dev holds its network counters
+- api: Docker one-shot stats calls fanned out over a thread pool
+
+Rates (CPU %, bytes/s) come from deltas between consecutive samples kept in
+the collector, the same way ResourceCollector computes host CPU, so neither
+source pays Docker's built-in one-second precpu sampling per call.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+import tracing
+from collectors import read_meminfo
+
+# Where Docker places a container's cgroup v2 directory (systemd and cgroupfs drivers)
+CGROUP_LAYOUTS = ('system.slice/docker-{id}.scope', 'docker/{id}')
+
+# Raw counters that are turned into per-second rates
+RATE_COUNTERS = ('rx_bytes', 'tx_bytes', 'read_bytes', 'write_bytes')
+
+
+def read_key_values(path: str) -> Dict[str, int]:
+    """Read a flat-keyed cgroup file such as cpu.stat or memory.stat"""
+    values = {}
+    with open(path, 'r') as f:
+        for line in f:
+            key, _, value = line.partition(' ')
+            try:
+                values[key] = int(value)
+            except ValueError:
+                pass
+    return values
+
+
+def read_net_dev(path: str) -> Dict[str, int]:
+    """Sum rx/tx bytes over all non-loopback interfaces in a /proc/<pid>/net/dev file"""
+    rx = tx = 0
+    with open(path, 'r') as f:
+        for line in f.readlines()[2:]:
+            interface, _, fields = line.partition(':')
+            if interface.strip() == 'lo':
+                continue
+            fields = fields.split()
+            rx += int(fields[0])
+            tx += int(fields[8])
+    return {'rx_bytes': rx, 'tx_bytes': tx}
+
+
+def pid_in_container(proc_path: str, pid: str, container_id: str) -> bool:
+    """Whether a host pid still belongs to a container, judged by its /proc/<pid>/cgroup path"""
+    try:
+        with open(os.path.join(proc_path, pid, 'cgroup'), 'r') as f:
+            return container_id in f.read()
+    except OSError:
+        return False
+
+
+def cgroup_sample(cgroup_dir: str, host_memory: int) -> Dict:
+    """Raw counters for one container from its cgroup v2 directory (network counters are read separately)"""
+    cpu = read_key_values(os.path.join(cgroup_dir, 'cpu.stat'))
+    memory_stat = read_key_values(os.path.join(cgroup_dir, 'memory.stat'))
+    with open(os.path.join(cgroup_dir, 'memory.current'), 'r') as f:
+        memory_current = int(f.read())
+    with open(os.path.join(cgroup_dir, 'memory.max'), 'r') as f:
+        raw_limit = f.read().strip()
+
+    read_bytes = write_bytes = 0
+    with open(os.path.join(cgroup_dir, 'io.stat'), 'r') as f:
+        for line in f:
+            for field in line.split()[1:]:
+                key, _, value = field.partition('=')
+                if key == 'rbytes':
+                    read_bytes += int(value)
+                elif key == 'wbytes':
+                    write_bytes += int(value)
+
+    return {
+        'cpu_usec': cpu.get('usage_usec', 0),
+        # Same as `docker stats`: page cache that can be reclaimed is not counted
+        'memory_usage': memory_current - memory_stat.get('inactive_file', 0),
+        'memory_limit': host_memory if raw_limit == 'max' else int(raw_limit),
+        'read_bytes': read_bytes,
+        'write_bytes': write_bytes,
+    }
+
+
+def api_sample(stats: Dict) -> Dict:
+    """Raw counters for one container from a Docker stats payload"""
+    memory = stats.get('memory_stats', {})
+    memory_detail = memory.get('stats', {})
+    # cgroup v2 reports inactive_file, v1 total_inactive_file
+    inactive = memory_detail.get('inactive_file', memory_detail.get('total_inactive_file', 0))
+
+    sample = {
+        'cpu_usec': stats.get('cpu_stats', {}).get('cpu_usage', {}).get('total_usage', 0) // 1000,
+        'memory_usage': memory.get('usage', 0) - inactive,
+        'memory_limit': memory.get('limit', 0),
+        'read_bytes': 0,
+        'write_bytes': 0,
+    }
+
+    for entry in (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []:
+        op = entry.get('op', '').lower()
+        if op == 'read':
+            sample['read_bytes'] += entry.get('value', 0)
+        elif op == 'write':
+            sample['write_bytes'] += entry.get('value', 0)
+
+    networks = stats.get('networks')
+    if networks:
+        sample['rx_bytes'] = sum(n.get('rx_bytes', 0) for n in networks.values())
+        sample['tx_bytes'] = sum(n.get('tx_bytes', 0) for n in networks.values())
+    return sample
+
+
+class ContainerStatsCollector:
+    """Samples per-container resource usage from cgroup files or the Docker stats API"""
+
+    def __init__(self, source: str = 'cgroup', cgroup_root: str = '/sys/fs/cgroup',
+                 proc_path: str = '/proc', sample_window: float = 1.0, max_workers: int = 8):
+        if source not in ('cgroup', 'api'):
+            raise ValueError(f"Unknown container stats source: {source}")
+        self.source = source
+        self.cgroup_root = cgroup_root
+        self.proc_path = proc_path
+        self.sample_window = sample_window
+        self.max_workers = max_workers
+        self._cgroup_dirs: Dict[str, str] = {}
+        # Host pid of each container's init process, from inspect (container id -> pid)
+        self._pids: Dict[str, str] = {}
+        self._last: Dict[str, Dict] = {}
+        # Containers whose network counters could not be read, warned about once
+        self._net_warned = set()
+
+    def cgroup_dir(self, container_id: str) -> Optional[str]:
+        """Locate (and remember) the cgroup v2 directory of a container"""
+        cached = self._cgroup_dirs.get(container_id)
+        if cached is not None:
+            return cached
+        for layout in CGROUP_LAYOUTS:
+            path = os.path.join(self.cgroup_root, layout.format(id=container_id))
+            if os.path.isdir(path):
+                self._cgroup_dirs[container_id] = path
+                return path
+        return None
+
+    def host_pid(self, api, name: str, container_id: str) -> Optional[str]:
+        """Host pid of a container's init process, re-inspected once it no longer belongs to the container
+
+        cgroup.procs lists 0 for pids outside the checker's pid namespace, so
+        the pid comes from Docker instead, which keeps the checker out of the
+        host pid namespace. None while the container has no process.
+        """
+        pid = self._pids.get(container_id)
+        if pid is not None and pid_in_container(self.proc_path, pid, container_id):
+            return pid
+        with tracing.span('docker.inspect', container=name):
+            pid = str(api.inspect_container(container_id)['State']['Pid'])
+        if pid == '0':
+            self._pids.pop(container_id, None)
+            return None
+        self._pids[container_id] = pid
+        return pid
+
+    def net_counters(self, api, name: str, container_id: str) -> Dict[str, int]:
+        """rx/tx bytes of a container's network namespace, through its init pid; {} if unreadable"""
+        try:
+            pid = self.host_pid(api, name, container_id)
+            if pid is None:
+                raise OSError("container has no running process")
+            counters = read_net_dev(os.path.join(self.proc_path, pid, 'net', 'dev'))
+        except Exception as e:
+            if name not in self._net_warned:
+                self._net_warned.add(name)
+                print(f"Warning: Could not read network counters for {name}: {e}")
+            return {}
+        self._net_warned.discard(name)
+        return counters
+
+    def sample(self, api, containers: Dict[str, str]) -> Dict[str, Dict]:
+        """Raw counters for each running container; containers maps name -> container id"""
+        if self.source == 'api':
+            parent = tracing.current()
+
+            def fetch(item):
+                name, container_id = item
+                try:
+                    with tracing.span('docker.stats', parent=parent, container=name):
+                        return name, api_sample(api.stats(container_id, stream=False, one_shot=True))
+                except Exception as e:
+                    print(f"Warning: Could not get stats for {name}: {e}")
+                    return name, None
+
+            workers = max(1, min(self.max_workers, len(containers)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = dict(executor.map(fetch, containers.items()))
+        else:
+            host_memory = read_meminfo(self.proc_path).get('MemTotal', 0) * 1024
+            results = {}
+            for name, container_id in containers.items():
+                cgroup_dir = self.cgroup_dir(container_id)
+                if cgroup_dir is None:
+                    print(f"Warning: No cgroup v2 directory for {name} under {self.cgroup_root}")
+                    continue
+                try:
+                    with tracing.span('cgroup.read', container=name):
+                        results[name] = cgroup_sample(cgroup_dir, host_memory)
+                        results[name].update(self.net_counters(api, name, container_id))
+                except (OSError, ValueError) as e:
+                    self._cgroup_dirs.pop(container_id, None)
+                    print(f"Warning: Could not read cgroup stats for {name}: {e}")
+
+        now = time.monotonic()
+        samples = {}
+        for name, sample in results.items():
+            if sample is not None:
+                sample['time'] = now
+                sample['id'] = containers[name]
+                samples[name] = sample
+        return samples
+
+    def collect(self, api, containers: Dict[str, str]) -> Dict[str, Dict]:
+        """Usage per container over the sampling window
+
+        Like ResourceCollector.cpu, the previous sample is reused when it is at
+        least one window old, so a long-running daemon never sleeps here.
+        """
+        now = time.monotonic()
+        stale = [name for name, container_id in containers.items()
+                 if name not in self._last or self._last[name]['id'] != container_id
+                 or now - self._last[name]['time'] < self.sample_window]
+        if stale:
+            self._last.update(self.sample(api, {name: containers[name] for name in stale}))
+            with tracing.span('sleep', seconds=self.sample_window):
+                time.sleep(self.sample_window)
+
+        current = self.sample(api, containers)
+        usage = {}
+        for name, after in current.items():
+            before = self._last.get(name)
+            if before is None or before['id'] != after['id']:
+                continue
+            elapsed = after['time'] - before['time']
+            if elapsed <= 0:
+                continue
+
+            stats = {
+                # Percent of one CPU, as `docker stats` reports it (can exceed 100 on multi-core hosts)
+                'cpu_percent': max(0, after['cpu_usec'] - before['cpu_usec']) / (elapsed * 1e6) * 100.0,
+                'memory_bytes': after['memory_usage'],
+                'memory_limit_bytes': after['memory_limit'],
+                'memory_percent': (after['memory_usage'] / after['memory_limit'] * 100.0
+                                   if after['memory_limit'] else 0.0),
+            }
+            for counter in RATE_COUNTERS:
+                if counter in after and counter in before:
+                    stats[counter] = after[counter]
+                    stats[f"{counter}_per_second"] = max(0, after[counter] - before[counter]) / elapsed
+            usage[name] = stats
+
+        # Forget containers that disappeared so the sample table stays bounded
+        self._last = current
+        return usage
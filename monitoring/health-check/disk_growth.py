@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Disk Growth Index
+Incremental size index of Docker log, volume and other directories, plus inode usage
+
+Each scanned directory keeps its mtime, the sizes of its files and its
+subdirectories. A directory whose mtime is unchanged had no entries added,
+removed or renamed, so it is not listed again; only its recently modified
+("hot") files are re-stat'ed, since a growing file does not touch its
+directory's mtime. Files that have not changed for hot_window are trusted
+until the next full rescan. An unchanged tree therefore costs one stat per
+directory plus one per hot file, instead of the inode walk `du` does.
+
+Sizes are allocated bytes (st_blocks, like du), per item: each child
+directory of a target (a container's log directory, a volume) or the target
+itself. Growth rates come from per-item size samples persisted between runs.
+"""
+
+import fnmatch
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from state_file import LOAD_ERRORS, read_json, write_json
+
+# Filesystems without meaningful inode counts or that do not hold data
+PSEUDO_FILESYSTEMS = {
+    'proc', 'sysfs', 'devpts', 'devtmpfs', 'cgroup', 'cgroup2', 'securityfs', 'debugfs', 'tracefs',
+    'pstore', 'bpf', 'mqueue', 'hugetlbfs', 'configfs', 'fusectl', 'autofs', 'binfmt_misc', 'rpc_pipefs',
+    'nsfs', 'squashfs', 'efivarfs', 'selinuxfs', 'ramfs',
+}
+
+
+class DirNode:
+    """Cached state of one directory: its mtime, file sizes and subdirectories"""
+
+    __slots__ = ('mtime_ns', 'files', 'hot', 'children', 'file_bytes', 'total')
+
+    def __init__(self):
+        self.mtime_ns = None
+        # name -> (allocated bytes, mtime_ns)
+        self.files: Dict[str, Tuple[int, int]] = {}
+        self.hot = set()
+        self.children: Dict[str, 'DirNode'] = {}
+        self.file_bytes = 0
+        self.total = 0
+
+
+class ScanStats:
+    """Syscall counts of one scan, to show what the cache saved"""
+
+    __slots__ = ('stats', 'listings', 'dirs', 'files')
+
+    def __init__(self):
+        self.stats = 0
+        self.listings = 0
+        self.dirs = 0
+        self.files = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {'stats': self.stats, 'listings': self.listings, 'dirs': self.dirs, 'files': self.files}
+
+
+class DirIndex:
+    """Incremental recursive size of one directory tree (one filesystem, symlinks not followed)"""
+
+    def __init__(self, path: str, include: Optional[str] = None, hot_window: float = 86400):
+        self.path = path
+        self.include = include
+        self.hot_window = hot_window
+        self.root: Optional[DirNode] = None
+        self._device = None
+
+    def scan(self, stats: ScanStats, full: bool = False) -> Optional[DirNode]:
+        """Bring the index up to date; None when the path does not exist"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self.root = None
+            return None
+        stats.stats += 1
+        self._device = st.st_dev
+        if self.root is None:
+            self.root = DirNode()
+            full = True
+        self._scan_dir(self.path, st, self.root, stats, full, time.time_ns() - int(self.hot_window * 1e9))
+        return self.root
+
+    def _scan_dir(self, path: str, st: os.stat_result, node: DirNode, stats: ScanStats, full: bool,
+                  hot_since: int) -> None:
+        stats.dirs += 1
+        if full or node.mtime_ns != st.st_mtime_ns:
+            self._list_dir(path, node, stats, hot_since)
+            node.mtime_ns = st.st_mtime_ns
+        else:
+            # Entries are unchanged; only files written to recently can have grown
+            for name in list(node.hot):
+                try:
+                    file_st = os.stat(os.path.join(path, name), follow_symlinks=False)
+                except OSError:
+                    continue
+                stats.stats += 1
+                size, _ = node.files[name]
+                node.files[name] = (file_st.st_blocks * 512, file_st.st_mtime_ns)
+                node.file_bytes += file_st.st_blocks * 512 - size
+                if file_st.st_mtime_ns < hot_since:
+                    node.hot.discard(name)
+
+        total = node.file_bytes
+        for name, child in list(node.children.items()):
+            child_path = os.path.join(path, name)
+            try:
+                child_st = os.stat(child_path, follow_symlinks=False)
+            except OSError:
+                del node.children[name]
+                continue
+            stats.stats += 1
+            # Stay on one filesystem, like du -x
+            if child_st.st_dev != self._device:
+                del node.children[name]
+                continue
+            self._scan_dir(child_path, child_st, child, stats, full, hot_since)
+            total += child.total
+        node.total = total
+
+    def _list_dir(self, path: str, node: DirNode, stats: ScanStats, hot_since: int) -> None:
+        """Re-read a directory's entries, keeping the cached subtrees of subdirectories that remain"""
+        files, hot, children = {}, set(), {}
+        try:
+            with os.scandir(path) as entries:
+                stats.listings += 1
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            children[entry.name] = node.children.get(entry.name) or DirNode()
+                            continue
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        if self.include and not fnmatch.fnmatch(entry.name, self.include):
+                            continue
+                        file_st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    stats.stats += 1
+                    stats.files += 1
+                    files[entry.name] = (file_st.st_blocks * 512, file_st.st_mtime_ns)
+                    if file_st.st_mtime_ns >= hot_since:
+                        hot.add(entry.name)
+        except OSError as e:
+            print(f"Warning: Could not list {path}: {e}")
+            return
+
+        node.files, node.hot, node.children = files, hot, children
+        node.file_bytes = sum(size for size, _ in files.values())
+
+
+def inode_usage(mounts_path: str = '/proc/mounts', root: str = '') -> Dict[str, Dict]:
+    """Inode use per mounted filesystem: {'used', 'total', 'percent'}, keyed by mount point
+
+    root is prepended to mount points when the host filesystem is mounted
+    into this container (e.g. /host). Filesystems without inode limits
+    (f_files == 0, e.g. btrfs) are skipped.
+    """
+    usage = {}
+    seen = set()
+    with open(mounts_path, 'r') as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 3 or fields[2] in PSEUDO_FILESYSTEMS:
+                continue
+            # Octal escapes in /proc/mounts: spaces in mount points are \040
+            mount_point = fields[1].encode().decode('unicode_escape')
+            try:
+                st = os.statvfs(root + mount_point if root else mount_point)
+            except OSError:
+                continue
+            # Bind mounts of one filesystem show up once per mount point
+            key = (fields[0], st.f_files, st.f_blocks)
+            if st.f_files == 0 or key in seen:
+                continue
+            seen.add(key)
+            used = st.f_files - st.f_ffree
+            usage[mount_point] = {'used': used, 'total': st.f_files, 'percent': used / st.f_files * 100.0}
+    return usage
+
+
+class DiskGrowthTracker:
+    """Item sizes of every configured target and their growth rates"""
+
+    def __init__(self, targets: List[Dict], state_path: Optional[str] = None, window: float = 3600,
+                 hot_window: float = 86400, full_rescan: float = 21600):
+        self.targets = targets
+        self.state_path = state_path
+        self.window = window
+        self.full_rescan = full_rescan
+        self.indexes = {
+            target['name']: DirIndex(target['path'], include=target.get('include'), hot_window=hot_window)
+            for target in targets
+        }
+        # (target, item) -> deque of (timestamp, bytes), trimmed to the window
+        self.samples: Dict[Tuple[str, str], deque] = {}
+        self._full_at = 0.0
+
+    def scan(self, labels: Optional[Dict[str, str]] = None, now: Optional[float] = None) -> Dict:
+        """Scan every target and return sizes and growth per item
+
+        labels renames items (container ids to container names). Result:
+        {'items': [{'target', 'item', 'bytes', 'bytes_per_hour'}], 'targets':
+        {name: bytes}, 'scan': syscall counts and seconds}.
+        """
+        now = time.time() if now is None else now
+        labels = labels or {}
+        full = now - self._full_at >= self.full_rescan
+        stats = ScanStats()
+        started = time.perf_counter()
+
+        items, totals = [], {}
+        for target in self.targets:
+            root = self.indexes[target['name']].scan(stats, full=full)
+            if root is None:
+                continue
+            totals[target['name']] = root.total
+            if target.get('depth', 1) == 0:
+                sizes = {target['name']: root.total}
+            else:
+                sizes = {labels.get(name, name): child.total for name, child in root.children.items()}
+            for item, size in sizes.items():
+                items.append({
+                    'target': target['name'],
+                    'item': item,
+                    'bytes': size,
+                    'bytes_per_hour': self._record((target['name'], item), size, now),
+                })
+
+        if full:
+            self._full_at = now
+        # Forget items that disappeared (removed containers and volumes)
+        present = {(item['target'], item['item']) for item in items}
+        self.samples = {key: samples for key, samples in self.samples.items() if key in present}
+
+        scan = stats.as_dict()
+        scan['seconds'] = time.perf_counter() - started
+        scan['full'] = full
+        return {'items': items, 'targets': totals, 'scan': scan}
+
+    def _record(self, key: Tuple[str, str], size: int, now: float) -> Optional[float]:
+        """Store a size sample; growth in bytes per hour over the window (None until two samples)"""
+        samples = self.samples.setdefault(key, deque())
+        samples.append((now, size))
+        # Keep one sample at or before the window start so the rate spans the whole window
+        while len(samples) > 2 and samples[1][0] <= now - self.window:
+            samples.popleft()
+        first_ts, first_size = samples[0]
+        if now - first_ts <= 0:
+            return None
+        return (size - first_size) / (now - first_ts) * 3600
+
+    def load(self) -> None:
+        """Load persisted size samples, ignoring a missing or unreadable file"""
+        try:
+            state = read_json(self.state_path)
+            if state is None:
+                return
+            self.samples = {
+                (entry['target'], entry['item']): deque(tuple(sample) for sample in entry['samples'])
+                for entry in state.get('items', [])
+            }
+        except LOAD_ERRORS as e:
+            print(f"Warning: Could not load disk growth state from {self.state_path}: {e}")
+
+    def save(self) -> None:
+        """Persist the size samples atomically (the directory index is rebuilt after a restart)"""
+        if not self.state_path:
+            return
+        state = {'items': [
+            {'target': target, 'item': item, 'samples': list(samples)}
+            for (target, item), samples in self.samples.items()
+        ]}
+        write_json(self.state_path, state)
+
+
+def format_bytes(value: float) -> str:
+    """Human-readable binary size, e.g. 1.5 GiB"""
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(value) < 1024:
+            return f"{value:.0f} {unit}" if unit == 'B' else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Docker Container Event Index
+Records container lifecycle events from the Docker events API
+
+A subscriber feeds die/start/oom/health_status events into an incremental
+in-memory index keyed by container name. The index is persisted to a small
+JSON file so restart history survives process restarts, and counting
+restarts in a window only scans the index (no Docker API calls).
+
+Docker only reports health on transitions, so the last health state of each
+container (and when it began) is kept outside the age-bounded history.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional, Tuple
+
+from state_file import LOAD_ERRORS, read_json, write_json
+
+EVENT_FILTERS = {
+    'type': 'container',
+    'event': ['die', 'start', 'oom', 'health_status'],
+}
+
+
+class ContainerEventIndex:
+    """Per-container event history bounded by age and count"""
+
+    def __init__(self, path: Optional[str] = None, horizon: float = 86400,
+                 max_events_per_container: int = 1000, names: Optional[Iterable[str]] = None):
+        self.path = path
+        self.horizon = horizon
+        self.max_events = max_events_per_container
+        self.names = set(names) if names is not None else None
+        self.last_event_nano = 0
+        self._events: Dict[str, deque] = {}
+        self._last_action: Dict[str, str] = {}
+        # name -> (state, since) of the latest health transition; never pruned
+        self._health: Dict[str, Tuple[str, float]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """Load persisted history, ignoring a missing or unreadable file"""
+        try:
+            state = read_json(self.path)
+            if state is None:
+                return
+            events = {
+                name: deque((tuple(e) for e in entries), maxlen=self.max_events)
+                for name, entries in state.get('containers', {}).items()
+            }
+        except LOAD_ERRORS as e:
+            print(f"Warning: Could not load container events from {self.path}: {e}")
+            return
+
+        with self._lock:
+            self.last_event_nano = state.get('last_event_nano', 0)
+            self._last_action = state.get('last_action', {})
+            self._health = {name: tuple(health) for name, health in state.get('health', {}).items()}
+            self._events.update(events)
+            self._prune(time.time())
+
+    def save(self) -> None:
+        """Persist the index atomically if anything changed since the last save"""
+        if not self.path or not self._dirty:
+            return
+
+        with self._lock:
+            self._prune(time.time())
+            state = {
+                'last_event_nano': self.last_event_nano,
+                'last_action': self._last_action,
+                'health': self._health,
+                'containers': {name: list(events) for name, events in self._events.items() if events},
+            }
+            self._dirty = False
+
+        write_json(self.path, state)
+
+    def add(self, event: Dict) -> None:
+        """Record one decoded Docker event"""
+        actor = event.get('Actor', {})
+        name = actor.get('Attributes', {}).get('name')
+        action = event.get('Action') or event.get('status') or ''
+        time_nano = event.get('timeNano') or int(event.get('time', 0) * 1e9)
+
+        if not name or (self.names is not None and name not in self.names):
+            return
+
+        with self._lock:
+            # Streams may replay events we already have after a reconnect
+            if time_nano <= self.last_event_nano:
+                return
+            self.last_event_nano = time_nano
+
+            ts = time_nano / 1e9
+            if action.startswith('health_status'):
+                # "health_status: unhealthy" -> unhealthy (also healthy, starting)
+                action = action.split(':', 1)[-1].strip() if ':' in action else 'health_status'
+                if self._health.get(name, (None,))[0] != action:
+                    self._health[name] = (action, ts)
+
+            events = self._events.setdefault(name, deque(maxlen=self.max_events))
+            # A start that follows a die is a restart; the first start after create is not
+            if action == 'start' and self._last_action.get(name) == 'die':
+                events.append((ts, 'restart'))
+            events.append((ts, action))
+            if action in ('die', 'start'):
+                self._last_action[name] = action
+            self._dirty = True
+
+    def count(self, name: str, action: str, since: float) -> int:
+        """Number of events of a kind for a container since a timestamp"""
+        with self._lock:
+            return sum(1 for ts, a in self._events.get(name, ()) if a == action and ts >= since)
+
+    def health(self, name: str) -> Optional[Tuple[str, float]]:
+        """(state, since) of the container's latest health transition, or None if none was seen"""
+        with self._lock:
+            return self._health.get(name)
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.horizon
+        for events in self._events.values():
+            while events and events[0][0] < cutoff:
+                events.popleft()
+
+
+class DockerEventSubscriber:
+    """Feeds a ContainerEventIndex from the Docker events API"""
+
+    def __init__(self, docker_client, index: ContainerEventIndex, reconnect_delay: float = 5.0):
+        self.docker_client = docker_client
+        self.index = index
+        self.reconnect_delay = reconnect_delay
+        self._stream = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _since(self) -> int:
+        if self.index.last_event_nano:
+            # Whole seconds only; duplicates within that second are dropped by the index
+            return int(self.index.last_event_nano // 1_000_000_000)
+        return int(time.time() - self.index.horizon)
+
+    def catch_up(self) -> None:
+        """Read every event up to now and return (for one-shot runs)"""
+        stream = self.docker_client.api.events(
+            since=self._since(),
+            until=int(time.time()),
+            filters=EVENT_FILTERS,
+            decode=True
+        )
+        for event in stream:
+            self.index.add(event)
+
+    def start(self) -> None:
+        """Follow the event stream on a background thread, reconnecting on errors"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._follow, name='docker-events', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._stream is not None:
+            try:
+                self._stream.close()
+            except Exception:
+                pass
+
+    def _follow(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._stream = self.docker_client.api.events(
+                    since=self._since(),
+                    filters=EVENT_FILTERS,
+                    decode=True
+                )
+                for event in self._stream:
+                    self.index.add(event)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                print(f"Warning: Docker event stream error: {e}", flush=True)
+            self._stop.wait(self.reconnect_delay)
@@ -1,11 +1,10 @@
 #!/bin/sh
 # Health Check Entrypoint
-# Runs health check every 12 hours
+# Runs the health checker as a long-lived daemon: containers every 30s,
+# resources every 10s, endpoints every 60s and the heartbeat report every
+# 12 hours (see daemon.intervals in config.yml)
+#
+# CONFIG_PATH selects the config file (default: the copy baked into the image)
 
-while true; do
-    echo "$(date): Running infrastructure health check..."
-    python3 /app/health_checker.py
-
-    echo "$(date): Health check complete. Sleeping for 12 hours..."
-    sleep 43200  # 12 hours in seconds
-done
+echo "$(date): Starting infrastructure health check daemon..."
+exec python3 /app/health_checker.py --daemon --config "${CONFIG_PATH:-/app/config.yml}"
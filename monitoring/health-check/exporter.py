@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Metrics Exporter
+Serves the health score, penalties, resource usage and endpoint latency
+in the Prometheus text format (and OpenMetrics when requested)
+
+The exposition body is rendered once per check run and kept as bytes, so a
+scrape only copies the cached snapshot: it never runs a check and costs
+microseconds no matter how often Prometheus (or Netdata) polls.
+"""
+
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional
+
+# Endpoint latency histogram bucket bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Detection-to-recovery histogram bucket bounds in seconds (remediated incidents)
+RECOVERY_BUCKETS = (15, 30, 60, 120, 300, 600, 1800, 3600)
+
+# Resource details exported as gauges: (details key, metric name, help)
+RESOURCE_GAUGES = [
+    ('cpu_percent', 'healthcheck_cpu_percent', 'CPU usage in percent'),
+    ('cpu_iowait_percent', 'healthcheck_cpu_iowait_percent', 'CPU time waiting on I/O in percent'),
+    ('cpu_steal_percent', 'healthcheck_cpu_steal_percent', 'CPU time stolen by the hypervisor in percent'),
+    ('memory_percent', 'healthcheck_memory_percent', 'Memory usage in percent'),
+    ('swap_percent', 'healthcheck_swap_percent', 'Swap usage in percent'),
+    ('disk_percent', 'healthcheck_disk_percent', 'Disk usage in percent'),
+]
+
+# Per-container stats exported as gauges labelled by container: (stats key, metric name, help)
+CONTAINER_GAUGES = [
+    ('cpu_percent', 'healthcheck_container_cpu_percent', 'Container CPU usage in percent of one CPU'),
+    ('memory_bytes', 'healthcheck_container_memory_bytes', 'Container memory usage excluding inactive page cache'),
+    ('memory_percent', 'healthcheck_container_memory_percent', 'Container memory usage in percent of its limit'),
+    ('rx_bytes_per_second', 'healthcheck_container_network_receive_bytes_per_second', 'Container network receive rate'),
+    ('tx_bytes_per_second', 'healthcheck_container_network_transmit_bytes_per_second', 'Container network transmit rate'),
+    ('read_bytes_per_second', 'healthcheck_container_block_read_bytes_per_second', 'Container block device read rate'),
+    ('write_bytes_per_second', 'healthcheck_container_block_write_bytes_per_second', 'Container block device write rate'),
+]
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels.items()) + '}'
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Histogram:
+    """Cumulative latency histogram for one label set"""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def lines(self, name: str, labels: Dict[str, str]) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{format_labels({**labels, 'le': format_value(bound)})} {cumulative}")
+        lines.append(f"{name}_bucket{format_labels({**labels, 'le': '+Inf'})} {self.count}")
+        lines.append(f"{name}_count{format_labels(labels)} {self.count}")
+        lines.append(f"{name}_sum{format_labels(labels)} {format_value(self.sum)}")
+        return lines
+
+
+class MetricsExporter:
+    """Embedded HTTP server for GET /metrics backed by a cached snapshot"""
+
+    def __init__(self, host: str = '0.0.0.0', port: int = 9105):
+        self.host = host
+        self.port = port
+        self.endpoint_latency: Dict[str, Histogram] = {}
+        self.recovery: Dict[str, Histogram] = {}
+        self.scrapes = 0
+        self._body = b''
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def body(self) -> bytes:
+        return self._body
+
+    def observe_endpoint(self, endpoint: str, seconds: float) -> None:
+        """Record one endpoint response time in the latency histogram"""
+        with self._lock:
+            histogram = self.endpoint_latency.get(endpoint)
+            if histogram is None:
+                histogram = self.endpoint_latency[endpoint] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_recovery(self, action: str, seconds: float) -> None:
+        """Record the detection-to-recovery time of one remediated incident"""
+        with self._lock:
+            histogram = self.recovery.get(action)
+            if histogram is None:
+                histogram = self.recovery[action] = Histogram(RECOVERY_BUCKETS)
+            histogram.observe(seconds)
+
+    def update(self, score: float, family_results: Dict[str, Dict], hosts: Optional[Dict[str, float]] = None,
+               remediation: Optional[Dict] = None) -> None:
+        """Render a new snapshot from the latest result of each check family
+
+        hosts maps fleet host names to their scores when remote hosts are checked;
+        remediation is the remediation engine's summary when it is enabled.
+        """
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+        details = {}
+        for result in family_results.values():
+            details.update(result['details'])
+
+        metric('healthcheck_score', 'gauge', 'Infrastructure health score (0-100)',
+               [({}, max(0, min(100, score)))])
+        if hosts:
+            metric('healthcheck_host_score', 'gauge', 'Health score of each fleet host (0-100)',
+                   [({'host': host}, host_score) for host, host_score in hosts.items()])
+        metric('healthcheck_family_penalty', 'gauge', 'Points deducted by each check family',
+               [({'family': family}, result['penalty']) for family, result in family_results.items()])
+        metric('healthcheck_family_last_run_timestamp_seconds', 'gauge',
+               'Unix time each check family last completed',
+               [({'family': family}, result['checked_at']) for family, result in family_results.items()])
+
+        # Several issues can share component and severity (e.g. down and restarted), so sum them
+        issue_penalties: Dict[tuple, float] = {}
+        for family, result in family_results.items():
+            for issue in result['issues']:
+                key = (family, issue['component'], issue['severity'])
+                issue_penalties[key] = issue_penalties.get(key, 0) + issue['penalty']
+        metric('healthcheck_issue_penalty', 'gauge', 'Points deducted per component and severity',
+               [({'family': family, 'component': component, 'severity': severity}, penalty)
+                for (family, component, severity), penalty in issue_penalties.items()])
+
+        for key, name, help_text in RESOURCE_GAUGES:
+            if isinstance(details.get(key), (int, float)):
+                metric(name, 'gauge', help_text, [({}, details[key])])
+
+        container_stats = details.get('container_stats', {})
+        for key, name, help_text in CONTAINER_GAUGES:
+            samples = [({'container': container}, stats[key])
+                       for container, stats in container_stats.items() if key in stats]
+            if samples:
+                metric(name, 'gauge', help_text, samples)
+
+        log_rates = details.get('log_error_rates', {})
+        if log_rates:
+            metric('healthcheck_log_errors_per_minute', 'gauge', 'Error log lines per minute over the Loki window',
+                   [({'container': container, 'priority': rate['priority']}, rate['per_minute'])
+                    for container, rate in log_rates.items()])
+
+        probes = details.get('network_probes', {})
+        if probes:
+            metric('healthcheck_network_loss_percent', 'gauge', 'Probes lost per network target in percent',
+                   [({'target': name, 'type': result['type']}, result['loss_percent'])
+                    for name, result in probes.items() if result['status'] not in ('unsupported', 'skipped')])
+            metric('healthcheck_network_rtt_seconds', 'gauge', 'Network probe round-trip time percentiles',
+                   [({'target': name, 'type': result['type'], 'quantile': quantile}, result[key])
+                    for name, result in probes.items()
+                    for quantile, key in (('0.5', 'rtt_p50'), ('0.95', 'rtt_p95'))
+                    if result[key] is not None])
+
+        growth = details.get('disk_growth')
+        if growth:
+            metric('healthcheck_disk_item_bytes', 'gauge', 'Allocated bytes per container log, volume or directory',
+                   [({'target': item['target'], 'item': item['item']}, item['bytes']) for item in growth['items']])
+            metric('healthcheck_disk_growth_bytes_per_hour', 'gauge', 'Growth rate per item over the growth window',
+                   [({'target': item['target'], 'item': item['item']}, item['bytes_per_hour'])
+                    for item in growth['items'] if item['bytes_per_hour'] is not None])
+        inodes = details.get('inodes', {})
+        if inodes:
+            metric('healthcheck_inode_used_percent', 'gauge', 'Inodes in use per filesystem in percent',
+                   [({'mount': mount}, usage['percent']) for mount, usage in inodes.items()])
+
+        timings = details.get('endpoint_timings', {})
+        metric('healthcheck_endpoint_response_seconds', 'gauge',
+               'Latest endpoint probe timing by phase (connect, ttfb, total)',
+               [({'endpoint': endpoint, 'phase': phase}, value)
+                for endpoint, phases in timings.items()
+                for phase, value in phases.items() if value is not None])
+
+        if remediation is not None:
+            metric('healthcheck_remediation_actions', 'gauge', 'Remediation actions by outcome since the checker started',
+                   [({'action': action, 'outcome': outcome}, count)
+                    for (action, outcome), count in remediation['counts'].items()])
+            metric('healthcheck_remediation_breaker_open', 'gauge',
+                   'Whether an action is paused by its circuit breaker (0.5 while half-open)',
+                   [({'action': action}, {'closed': 0, 'half_open': 0.5, 'open': 1}[state])
+                    for action, state in remediation['breakers'].items()])
+
+        with self._lock:
+            lines.append("# HELP healthcheck_endpoint_latency_seconds Endpoint response time")
+            lines.append("# TYPE healthcheck_endpoint_latency_seconds histogram")
+            for endpoint, histogram in self.endpoint_latency.items():
+                lines.extend(histogram.lines('healthcheck_endpoint_latency_seconds', {'endpoint': endpoint}))
+            if self.recovery:
+                lines.append("# HELP healthcheck_remediation_recovery_seconds Time from detection to recovery "
+                             "of remediated incidents")
+                lines.append("# TYPE healthcheck_remediation_recovery_seconds histogram")
+                for action, histogram in self.recovery.items():
+                    lines.extend(histogram.lines('healthcheck_remediation_recovery_seconds', {'action': action}))
+
+        # Swapping one reference is atomic, so scrapes never see a half-built body
+        self._body = ('\n'.join(lines) + '\n').encode('utf-8')
+
+    def start(self) -> None:
+        """Serve /metrics on a background thread"""
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='metrics-exporter', daemon=True).start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _make_handler(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+
+                exporter.scrapes += 1
+                body = exporter.body
+                if 'application/openmetrics-text' in self.headers.get('Accept', ''):
+                    body += b'# EOF\n'
+                    content_type = OPENMETRICS_CONTENT_TYPE
+                else:
+                    content_type = PROMETHEUS_CONTENT_TYPE
+
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Fleet Checks
+Checks the Docker hosts listed under fleet.hosts from the local HealthChecker
+
+Each remote host gets its own HealthChecker built from the main config plus
+the host's Docker endpoint, containers and optional metrics URL. Hosts run
+in parallel with a per-host timeout while the local checks run, so a cycle
+lasts about as long as the slowest host, and a host that is down or slow
+only costs its own score.
+"""
+
+import concurrent.futures
+import copy
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import docker
+
+import tracing
+from check_registry import describe_error, failure_result
+from collectors import NetdataCollector, NodeExporterCollector
+from http_probe import create_session
+
+
+def host_config(base: Dict, host: Dict) -> Dict:
+    """The main config with one remote host's overrides applied"""
+    config = copy.deepcopy(base)
+    containers = host.get('containers', {})
+    config['containers'] = {
+        'critical': containers.get('critical', []),
+        'standard': containers.get('standard', []),
+    }
+    for section in ('fleet', 'history', 'exporter', 'log_analysis', 'network_checks', 'tracing', 'disk_growth',
+                    'remediation', 'forwarder'):
+        config[section] = {'enabled': False}
+
+    # There is no cgroup tree for a remote host here; its Docker API serves the stats
+    config.setdefault('container_resources', {})['source'] = 'api'
+    # The host's own metrics_url replaces the local Netdata (see host_collector)
+    config['resources']['source'] = 'local'
+    for resource, overrides in host.get('resources', {}).items():
+        config['resources'][resource] = {**config['resources'].get(resource, {}), **overrides}
+
+    endpoints = host.get('endpoints', [])
+    config['service_checks']['endpoints'] = endpoints
+    config['service_checks']['enabled'] = bool(endpoints) and base['service_checks'].get('enabled', True)
+
+    events_path = config['restart_detection'].get('events_path')
+    if events_path:
+        root, ext = os.path.splitext(events_path)
+        config['restart_detection']['events_path'] = f"{root}-{host['name']}{ext}"
+    return config
+
+
+def host_docker_client(host: Dict, timeout: float) -> docker.DockerClient:
+    """Docker client for a host's endpoint (tcp:// with optional TLS, or ssh://)"""
+    tls = host.get('tls')
+    tls_config = None
+    if tls:
+        client_cert = (tls['client_cert'], tls['client_key']) if tls.get('client_cert') else None
+        tls_config = docker.tls.TLSConfig(client_cert=client_cert, ca_cert=tls.get('ca_cert'),
+                                          verify=tls.get('verify', True))
+
+    return docker.DockerClient(
+        base_url=host['docker_url'],
+        tls=tls_config or False,
+        timeout=max(1, int(timeout)),
+        version=host.get('api_version', 'auto'),
+        use_ssh_client=host.get('use_ssh_client', False)
+    )
+
+
+def host_collector(host: Dict, timeout: float, resources_config: Dict):
+    """Resource collector for a host's metrics_url, or None when it has none"""
+    url = host.get('metrics_url')
+    if not url:
+        return None
+    session = create_session(2)
+    if host.get('metrics_type', 'node_exporter') == 'netdata':
+        return NetdataCollector(session, url, timeout=timeout, window=resources_config.get('window', 300),
+                                group=resources_config.get('group', 'average'))
+    return NodeExporterCollector(session, url, timeout=timeout,
+                                 sample_window=resources_config.get('sample_window', 1.0))
+
+
+class RemoteHost:
+    """One remote Docker host and the latest result of each of its check families"""
+
+    def __init__(self, spec: Dict, config: Dict, factory: Callable, timeout: float):
+        self.name = spec['name']
+        self.spec = spec
+        self.config = config
+        self.factory = factory
+        self.timeout = timeout
+        self.checker = None
+        # Family -> when it was submitted; families of one host run one at a time
+        self.running: Dict[str, float] = {}
+        self.family_results: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+
+        # Only families describing one host; log and network checks stay on the local checker
+        self.families = ['containers']
+        if config.get('container_resources', {}).get('enabled', False):
+            self.families.append('container_resources')
+        if spec.get('metrics_url'):
+            self.families.append('resources')
+        if config['service_checks']['enabled']:
+            self.families.append('endpoints')
+
+    def claim(self, family: str) -> Optional[str]:
+        """Queue family on the host; returns a family stuck past the timeout (or family itself) instead"""
+        with self._lock:
+            now = time.monotonic()
+            for running, submitted in self.running.items():
+                if running == family or now - submitted > self.timeout:
+                    return running
+            self.running[family] = now
+            return None
+
+    def run(self, family: str, failure_penalty: float, parent=None) -> None:
+        """Run one family on this host's checker and keep its result (pool thread)"""
+        try:
+            # Local families run concurrently; one host's checker takes them in turn
+            with self._run_lock, tracing.span('fleet.host', parent=parent, host=self.name):
+                if self.checker is None:
+                    # Built lazily so an unreachable host fails here, in its own thread
+                    collector = host_collector(self.spec, self.timeout, self.config['resources'])
+                    self.checker = self.factory(self.config, host_docker_client(self.spec, self.timeout),
+                                                collector, self.name)
+                self.checker.run_check_family(family)
+            result = self.checker.family_results[family]
+        except Exception as e:
+            result = failure_result(self.name, f"{family} check failed: {describe_error(e)}", failure_penalty)
+
+        with self._lock:
+            self.family_results[family] = result
+            self.running.pop(family, None)
+
+    def fail(self, family: str, message: str, penalty: float) -> None:
+        """Replace the family's result with a failure (a late real result overwrites it)"""
+        with self._lock:
+            self.family_results[family] = failure_result(self.name, message, penalty)
+
+    def summary(self) -> Dict:
+        """Score and issues from the latest result of each family"""
+        with self._lock:
+            results = list(self.family_results.values())
+        return {
+            'name': self.name,
+            'score': max(0, min(100, 100 - sum(result['penalty'] for result in results))),
+            'issues': [issue for result in results for issue in result['issues']],
+            'checked': bool(results),
+        }
+
+
+class Fleet:
+    """Runs check families on every remote host in parallel with the local checks"""
+
+    def __init__(self, config: Dict, factory: Callable):
+        fleet_config = config['fleet']
+        self.local_name = fleet_config.get('local_name') or socket.gethostname()
+        self.failure_penalty = fleet_config.get('failure_penalty', 30)
+        timeout = fleet_config.get('timeout', 20)
+        self.hosts = [
+            RemoteHost(spec, host_config(config, spec), factory, spec.get('timeout', timeout))
+            for spec in fleet_config.get('hosts', [])
+        ]
+        # Enough workers for every family of every host, so a host's queued families never hold up another host
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, fleet_config.get('max_workers', sum(len(host.families) for host in self.hosts))),
+            thread_name_prefix='fleet'
+        )
+
+    def submit(self, family: str) -> Dict[RemoteHost, tuple]:
+        """Start family on every host that runs it; pass the result to collect()"""
+        pending = {}
+        parent = tracing.current()
+        for host in self.hosts:
+            if family not in host.families:
+                continue
+            # A host still busy past its timeout gets no second check in parallel
+            busy = host.claim(family)
+            if busy is not None:
+                host.fail(family, f"Still running the {busy} check (>{host.timeout}s)", self.failure_penalty)
+                continue
+            future = self._executor.submit(host.run, family, self.failure_penalty, parent)
+            pending[host] = (future, time.monotonic())
+        return pending
+
+    def collect(self, family: str, pending: Dict[RemoteHost, tuple]) -> None:
+        """Wait for each host until its own timeout; hosts past it are scored as failed"""
+        for host, (future, started) in pending.items():
+            remaining = host.timeout - (time.monotonic() - started)
+            try:
+                future.result(timeout=max(0.0, remaining))
+            except concurrent.futures.TimeoutError:
+                host.fail(family, f"{family} check timed out (>{host.timeout}s)", self.failure_penalty)
+
+    def summaries(self) -> List[Dict]:
+        """Score and issues per remote host"""
+        return [host.summary() for host in self.hosts]
+
+    def stop(self) -> None:
+        """Stop handing out work; checks already running end on their own timeouts"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
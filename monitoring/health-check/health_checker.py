@@ -9,64 +9,660 @@ Created: 2025-11-24
 """
 
 import docker
-import yaml
+import json
 import requests
+import socket
 import time
+import os
 import sys
-import subprocess
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from baselines import BaselineStore, Deviation
+from check_registry import CheckRegistry, CheckSpec, CheckState, describe_error, failure_result
+from check_plan import CheckPlan, ContainerSpec, PlanWatcher, load_plan
+from collectors import NetdataCollector, ResourceCollector
+from container_snapshot import ContainerSnapshot, SharedSnapshot
+from docker_events import ContainerEventIndex, DockerEventSubscriber
+from exporter import MetricsExporter
+from fleet import Fleet
+from http_probe import create_session, probe_endpoints
+from metrics_store import MetricsStore
+from notify_state import NotificationState, current_issues, fingerprint
+from scheduler import Scheduler
+from state_file import write_json
+import tracing
+
+# Built-in check families in report order: (log label, method name, config section enabling it)
+CHECK_FAMILIES = {
+    'containers': ("Checking containers...", 'check_containers', None),
+    'container_resources': ("Checking container resources...", 'check_container_resources', 'container_resources'),
+    'resources': ("Checking system resources...", 'check_system_resources', None),
+    'endpoints': ("Checking service responses...", 'check_service_responses', 'service_checks'),
+    'logs': ("Checking log error rates...", 'check_log_errors', 'log_analysis'),
+    'network': ("Checking network reachability...", 'check_network', 'network_checks'),
+    'disk_growth': ("Checking disk growth...", 'check_disk_growth', 'disk_growth'),
+    'forwarder': ("Checking the Telegram forwarder...", 'check_forwarder', 'forwarder'),
+}
+
+# Daemon intervals in seconds (overridable via daemon.intervals in config.yml)
+DEFAULT_INTERVALS = {
+    'containers': 30,
+    'container_resources': 30,
+    'resources': 10,
+    'endpoints': 60,
+    'logs': 60,
+    'network': 60,
+    'disk_growth': 300,
+    'forwarder': 60,
+    'heartbeat': 43200,
+}
+
+# Config sections read only at startup (see HealthChecker.reload_config)
+RESTART_SECTIONS = ('daemon', 'exporter', 'history', 'fleet', 'docker')
+
+# Issue ordering and markers in reports
+SEVERITY_ORDER = {'critical': 0, 'medium': 1, 'minor': 2}
+SEVERITY_EMOJI = {'critical': '🔴', 'medium': '🟡', 'minor': '⚪'}
+REMEDIATION_EMOJI = {'ok': '🔄', 'recovered': '✅', 'failed': '❌', 'ineffective': '⚠️', 'noop': '➖', 'dry_run': '🧪'}
+
+# Metrics summarized in the heartbeat report: (history metric, display label)
+HISTORY_REPORT_METRICS = [
+    ('score', 'Score'),
+    ('cpu_percent', 'CPU'),
+    ('cpu_iowait_percent', 'IOwait'),
+    ('cpu_steal_percent', 'Steal'),
+    ('memory_percent', 'Memory'),
+    ('swap_percent', 'Swap'),
+    ('disk_percent', 'Disk'),
+]
 
 class HealthChecker:
-    def __init__(self, config_path: str = "config.yml"):
-        """Initialize health checker with configuration"""
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
-
-        self.docker_client = docker.from_env()
+    def __init__(self, config_path: str = "config.yml", docker_client=None, config: Optional[Dict] = None,
+                 collector=None, host_name: Optional[str] = None, trace: bool = False):
+        """Initialize health checker with configuration
+
+        config, collector and host_name are set for the checkers of remote
+        fleet hosts; by default the config file and the local /proc are used.
+        trace records timing spans even when tracing is disabled in the config.
+        Raises ConfigError when the config does not validate.
+        """
+        # score, issues and details are the running family's on a check thread (see _state)
+        self._local = threading.local()
+        self._report = CheckState()
+        # Serializes merging family results into the report, history and exporter
+        self._lock = threading.Lock()
+        if config is None:
+            self.plan = load_plan(config_path)
+            self.plan_watcher = PlanWatcher(config_path, self.plan)
+        else:
+            self.plan = CheckPlan(config)
+            self.plan_watcher = None
+        self.host_name = host_name
+        self.checks = self._open_checks()
+        self.trace_forced = trace
+        self.traces = {}
+        # Tracing is process-wide; fleet host checkers run under the local checker's spans
+        if host_name is None:
+            self._configure_tracing()
+
+        self.docker_client = docker_client or docker.from_env()
+        self.collector = collector or ResourceCollector(
+            proc_path=self.config['resources'].get('proc_path', '/proc'),
+            sample_window=self.config['resources'].get('sample_window', 1.0)
+        )
+        self.container_stats = self._open_container_stats()
+        self.http_session = create_session(self.config['service_checks'].get('max_concurrency', 8))
+        self.netdata = self._open_netdata()
+        self._netdata_down = False
         self.score = 100
         self.issues = []
         self.details = {}
+        self.log_rates = self._open_log_analysis()
+        self.family_results = {}
+        self.exporter = None
+        self.history = self._open_history()
+        self.baselines = self._open_baselines()
+        self.disk_growth = self._open_disk_growth()
+        self._open_container_events()
+        self.fleet = self._open_fleet()
+        self.notify_state = self._open_notify_state()
+        self.remediation = self._open_remediation()
+
+    @property
+    def plan(self) -> CheckPlan:
+        """The plan the running check started with on a check thread, else the current one"""
+        return getattr(self._local, 'plan', None) or self._plan
+
+    @plan.setter
+    def plan(self, plan: CheckPlan) -> None:
+        self._plan = plan
+
+    @property
+    def config(self):
+        """Raw config of the plan in use (see plan)
+
+        The plan's private deep copy of the validated mapping: a plain dict that
+        must be treated as read-only, since changes to it are not validated and
+        are lost at the next reload.
+        """
+        return self.plan.config
+
+    def _state(self) -> CheckState:
+        """The running family's result on a check thread, else the composed report"""
+        return getattr(self._local, 'state', None) or self._report
+
+    @property
+    def score(self):
+        return self._state().score
+
+    @score.setter
+    def score(self, value):
+        self._state().score = value
+
+    @property
+    def issues(self):
+        return self._state().issues
+
+    @issues.setter
+    def issues(self, value):
+        self._state().issues = value
+
+    @property
+    def details(self):
+        return self._state().details
+
+    @details.setter
+    def details(self, value):
+        self._state().details = value
+
+    def reload_config(self) -> bool:
+        """Swap in the config file if it changed and compiles; the last good plan stays otherwise
+
+        Thresholds, penalties, containers, endpoints and scoring apply from the
+        next check. Components built from a changed section (Netdata, Loki,
+        container stats) are rebuilt; daemon intervals, exporter, history,
+        fleet and the restart event source apply after a restart, as do new
+        check plugins in the daemon's schedule.
+        """
+        if self.plan_watcher is None:
+            return False
+        previous = self.plan
+        plan = self.plan_watcher.poll()
+        if plan is None:
+            return False
+
+        # One atomic reference swap. Checks run on their own registry threads, so a
+        # reload can land mid-check; each check pins the plan it started with
+        # (run_check_family) and never sees a mix of old and new settings. The
+        # components rebuilt below replace references too, so a running check
+        # keeps using the old instance until it finishes.
+        self.plan = plan
+
+        def changed(section):
+            return previous.config.get(section) != plan.config.get(section)
+
+        if changed('resources'):
+            self.netdata = self._open_netdata()
+            self._netdata_down = False
+            if isinstance(self.collector, ResourceCollector):
+                self.collector = ResourceCollector(
+                    proc_path=plan.config['resources'].get('proc_path', '/proc'),
+                    sample_window=plan.config['resources'].get('sample_window', 1.0)
+                )
+        if changed('log_analysis'):
+            self.log_rates = self._open_log_analysis()
+        if changed('container_resources'):
+            self.container_stats = self._open_container_stats()
+        if changed('baselines'):
+            self._close_baselines()
+            self.baselines = self._open_baselines()
+        if changed('disk_growth'):
+            self.disk_growth = self._open_disk_growth()
+        if changed('checks'):
+            self.checks = self._open_checks()
+        if changed('remediation'):
+            self._close_remediation()
+            self.remediation = self._open_remediation()
+        # A family disabled by this change no longer runs; drop its last result from the report
+        enabled = set(self.checks.enabled(plan.config))
+        with self._lock:
+            for family in [family for family in self.family_results if family not in enabled]:
+                del self.family_results[family]
+            self._compose_results()
+        if changed('tracing') and self.host_name is None:
+            self._configure_tracing()
+        if self.event_index is not None:
+            self.event_index.names = set(plan.container_names)
+
+        print(f"Reloaded {self.plan_watcher.path}", flush=True)
+        pending = [section for section in RESTART_SECTIONS if changed(section)]
+        if pending:
+            print(f"Note: changes to {', '.join(pending)} apply after a restart", flush=True)
+        return True
+
+    def _open_checks(self) -> CheckRegistry:
+        """Register the built-in checks and the configured plugins (imported when they first run)"""
+        registry = CheckRegistry()
+        for family, (label, method, section) in CHECK_FAMILIES.items():
+            registry.register(CheckSpec(family, label, method, section=section, interval=DEFAULT_INTERVALS[family]))
+
+        for plugin in self.config.get('checks', {}).get('plugins', []):
+            try:
+                registry.register(CheckSpec(
+                    plugin['name'],
+                    plugin.get('label', f"Checking {plugin['name']}..."),
+                    plugin['check'],
+                    enabled=plugin.get('enabled', True),
+                    interval=plugin.get('interval', 60),
+                    timeout=plugin.get('timeout')
+                ))
+            except ValueError as e:
+                print(f"Warning: Skipping check plugin: {e}")
+        return registry
+
+    def _check_timeout(self, family: str) -> float:
+        """Seconds a family may run: checks.timeouts, the plugin's own timeout, then checks.timeout"""
+        checks_config = self.config.get('checks', {})
+        timeout = checks_config.get('timeouts', {}).get(family, self.checks.specs[family].timeout)
+        return timeout if timeout is not None else checks_config.get('timeout', 60)
+
+    def _configure_tracing(self) -> None:
+        """Turn span recording on when tracing is enabled in the config or forced with --trace"""
+        tracing.enable(self.trace_forced or self.config.get('tracing', {}).get('enabled', False))
+
+    def _open_netdata(self):
+        """Set up windowed resource reads from Netdata if it is the configured source"""
+        resources_config = self.config['resources']
+        if resources_config.get('source', 'local') != 'netdata':
+            return None
+
+        return NetdataCollector(
+            self.http_session,
+            resources_config.get('netdata_url', 'http://oci-netdata:19999'),
+            timeout=resources_config.get('netdata_timeout', 3),
+            window=resources_config.get('window', 300),
+            group=resources_config.get('group', 'average')
+        )
+
+    def _open_container_stats(self):
+        """Set up per-container stats, falling back to the Docker API without cgroup v2"""
+        stats_config = self.config.get('container_resources', {})
+        if not stats_config.get('enabled', False):
+            return None
+
+        from container_stats import ContainerStatsCollector
+
+        source = stats_config.get('source', 'cgroup')
+        cgroup_root = stats_config.get('cgroup_root', '/sys/fs/cgroup')
+        if source == 'cgroup' and not os.path.exists(os.path.join(cgroup_root, 'cgroup.controllers')):
+            print(f"Warning: No cgroup v2 hierarchy at {cgroup_root}, using Docker stats API")
+            source = 'api'
+
+        return ContainerStatsCollector(
+            source=source,
+            cgroup_root=cgroup_root,
+            proc_path=stats_config.get('proc_path', '/proc'),
+            sample_window=stats_config.get('sample_window', 1.0),
+            max_workers=stats_config.get('max_workers', 8)
+        )
+
+    def _open_log_analysis(self):
+        """Set up the batched Loki error-rate query if log analysis is enabled"""
+        log_config = self.config.get('log_analysis', {})
+        if not log_config.get('enabled', False):
+            return None
+
+        from log_analysis import LokiErrorRates
+
+        return LokiErrorRates(
+            self.http_session,
+            log_config.get('loki_url', 'http://oci-loki:3100'),
+            selector=log_config.get('selector', '{job="docker"}'),
+            pattern=log_config.get('pattern', '(?i)(error|panic|fatal)'),
+            window=log_config.get('window', 300),
+            ttl=log_config.get('cache_ttl', 60),
+            timeout=log_config.get('timeout', 5)
+        )
+
+    def _open_history(self):
+        """Open the metrics history store if enabled (history is optional)"""
+        history_config = self.config.get('history', {})
+        if not history_config.get('enabled', False):
+            return None
+
+        try:
+            return MetricsStore(
+                history_config.get('path', 'data/history.db'),
+                retention=history_config.get('retention', 7 * 86400),
+                raw_retention=history_config.get('raw_retention', 86400),
+                rollup_interval=history_config.get('rollup_interval', 300)
+            )
+        except Exception as e:
+            print(f"Warning: Could not open metrics history: {e}")
+            return None
+
+    def _open_baselines(self):
+        """Load the adaptive baselines if enabled (local checker only)"""
+        baseline_config = self.config.get('baselines', {})
+        if not baseline_config.get('enabled', False) or self.host_name is not None:
+            return None
+
+        store = BaselineStore(
+            baseline_config.get('path'),
+            half_life=baseline_config.get('half_life', 3600),
+            seasonal_half_life=baseline_config.get('seasonal_half_life', 7),
+            buckets=baseline_config.get('buckets', 24),
+            warmup=baseline_config.get('warmup', 30),
+            season_warmup=baseline_config.get('season_warmup', 10),
+            save_interval=baseline_config.get('save_interval', 60)
+        )
+        store.load()
+        return store
+
+    def _close_baselines(self) -> None:
+        """Persist what the baselines learned since the last save"""
+        if self.baselines is None:
+            return
+        try:
+            self.baselines.save(force=True)
+        except OSError as e:
+            print(f"Warning: Could not save baselines: {e}")
+
+    def _observe_baseline(self, name: str, value: float, kind: str) -> Optional[Deviation]:
+        """Score value against its baseline and learn it; None with baselines disabled"""
+        if self.baselines is None:
+            return None
+        min_std = self.config['baselines'].get('min_std', {}).get(kind, 0.0)
+        deviation = self.baselines.observe(name, value, min_std=min_std)
+        try:
+            self.baselines.save()
+        except OSError as e:
+            print(f"Warning: Could not save baselines: {e}")
+        return deviation
+
+    def _score_deviation(self, component: str, deviation: Deviation, issue: str) -> None:
+        """Penalize a value that sits well above its (warmed-up) baseline"""
+        if not deviation.warmed:
+            return
+        baseline_config = self.config['baselines']
+        if deviation.z >= baseline_config.get('critical_sigma', 5):
+            severity, penalty = 'medium', baseline_config.get('critical_penalty', 5)
+        elif deviation.z >= baseline_config.get('warning_sigma', 3):
+            severity, penalty = 'minor', baseline_config.get('warning_penalty', 2)
+        else:
+            return
+
+        self.score -= penalty
+        self.issues.append({
+            'severity': severity,
+            'component': component,
+            'issue': issue,
+            'penalty': penalty
+        })
+
+    def _open_disk_growth(self):
+        """Set up the disk growth index if enabled; sizes learned so far are reloaded from its state"""
+        growth_config = self.config.get('disk_growth', {})
+        if not growth_config.get('enabled', False):
+            return None
+
+        from disk_growth import DiskGrowthTracker
+
+        tracker = DiskGrowthTracker(
+            growth_config.get('targets', []),
+            state_path=growth_config.get('state_path'),
+            window=growth_config.get('window', 3600),
+            hot_window=growth_config.get('hot_window', 86400),
+            full_rescan=growth_config.get('full_rescan', 21600)
+        )
+        tracker.load()
+        return tracker
+
+    def _open_remediation(self):
+        """Set up the auto-remediation engine if enabled (local checker only)"""
+        remediation_config = self.config.get('remediation', {})
+        if not remediation_config.get('enabled', False) or self.host_name is not None:
+            return None
+
+        from remediation import RemediationEngine, restart_container, truncate_logs
+
+        api = self.docker_client.api
+        action_config = remediation_config.get('actions', {})
+        actions = {}
+        restart_config = action_config.get('restart_container', {})
+        if restart_config.get('enabled', True):
+            stop_timeout = restart_config.get('stop_timeout', 10)
+            actions['restart_container'] = lambda name: restart_container(api, name, stop_timeout)
+        truncate_config = action_config.get('truncate_logs', {})
+        if truncate_config.get('enabled', True):
+            max_bytes = truncate_config.get('max_bytes', 1 << 30)
+            root = truncate_config.get('root', '')
+            actions['truncate_logs'] = lambda target: truncate_logs(
+                api, None if target == '*' else [target], max_bytes, root
+            )
+
+        breaker_config = remediation_config.get('breaker', {})
+        engine = RemediationEngine(
+            actions,
+            state_path=remediation_config.get('state_path'),
+            dry_run=remediation_config.get('dry_run', False),
+            max_concurrency=remediation_config.get('max_concurrency', 2),
+            cooldown=remediation_config.get('cooldown', 900),
+            verify_after=remediation_config.get('verify_after', 180),
+            breaker_failures=breaker_config.get('failures', 3),
+            breaker_reset=breaker_config.get('reset', 3600)
+        )
+        engine.load()
+        return engine
+
+    def _close_remediation(self) -> None:
+        """Stop taking actions and persist what is known about them"""
+        if self.remediation is None:
+            return
+        self.remediation.stop()
+        self._report_remediation()
+
+    def _open_fleet(self):
+        """Set up the remote hosts checked alongside this one, if any"""
+        fleet_config = self.config.get('fleet', {})
+        if not fleet_config.get('enabled', False) or not fleet_config.get('hosts'):
+            return None
+
+        def remote_checker(config, docker_client, collector, name):
+            return HealthChecker(config=config, docker_client=docker_client, collector=collector, host_name=name)
+
+        return Fleet(self.config, remote_checker)
+
+    def start_exporter(self) -> None:
+        """Serve /metrics from the latest results if enabled (daemon mode only)"""
+        exporter_config = self.config.get('exporter', {})
+        if not exporter_config.get('enabled', False):
+            return
+
+        exporter = MetricsExporter(exporter_config.get('host', '0.0.0.0'), exporter_config.get('port', 9105))
+        try:
+            exporter.start()
+        except OSError as e:
+            print(f"Warning: Could not start metrics exporter: {e}")
+            return
+        self.exporter = exporter
+        self._update_exporter()
+        print(f"Metrics exporter listening on {exporter.host}:{exporter.port}/metrics", flush=True)
 
     def check_containers(self) -> None:
         """Check container health status"""
-        all_containers = {**{c['name']: ('critical', c) for c in self.config['containers']['critical']},
-                         **{c['name']: ('standard', c) for c in self.config['containers']['standard']}}
+        plan = self.plan
+        restart_enabled = self.config['restart_detection']['enabled']
+        with tracing.span('docker.events'):
+            use_events = restart_enabled and self._sync_container_events()
+        snapshot = self._capture_containers(plan.container_names, inspect=restart_enabled and not use_events)
 
-        for container_name, (priority, container_config) in all_containers.items():
-            try:
-                container = self.docker_client.containers.get(container_name)
-
-                # Check if container is running
-                if container.status != 'running':
-                    penalty = container_config['penalty_down']
-                    self.score -= penalty
-                    self.issues.append({
-                        'severity': 'critical',
-                        'component': container_config['display'],
-                        'issue': f"Container not running (status: {container.status})",
-                        'penalty': penalty
-                    })
-
-                # Check for recent restarts
-                if self.config['restart_detection']['enabled']:
-                    self._check_container_restarts(container, container_config)
-
-            except docker.errors.NotFound:
-                penalty = container_config['penalty_down']
+        for container in plan.containers:
+            status = snapshot.status(container.name)
+
+            if status is None:
+                penalty = container.penalty_down
                 self.score -= penalty
                 self.issues.append({
                     'severity': 'critical',
-                    'component': container_config['display'],
+                    'component': container.display,
                     'issue': "Container not found",
                     'penalty': penalty
                 })
+                continue
+
+            # Check if container is running
+            if status != 'running':
+                penalty = container.penalty_down
+                self.score -= penalty
+                self.issues.append({
+                    'severity': 'critical',
+                    'component': container.display,
+                    'issue': f"Container not running (status: {status})",
+                    'penalty': penalty,
+                    # kind and target let the remediation stage act on the issue
+                    'kind': 'container_down',
+                    'target': container.name
+                })
+
+            # Check for recent restarts (from the event index, or inspect when
+            # uptime may fall in a window)
+            if use_events:
+                self._check_container_restart_events(container)
+            elif restart_enabled:
+                attrs = snapshot.inspect_payload(container.name)
+                if attrs is not None:
+                    self._check_container_restarts(attrs, container)
+
+            if status == 'running' and restart_enabled:
+                self._check_container_health(container, snapshot.health(container.name), use_events)
+
+        if use_events:
+            try:
+                with tracing.span('events.save'):
+                    self.event_index.save()
+            except OSError as e:
+                print(f"Warning: Could not save container events: {e}")
+
+    def _capture_containers(self, names, inspect: bool = True) -> ContainerSnapshot:
+        """Return the container snapshot shared by all checks in this run
+
+        The first container check of a run lists the containers; the others
+        reuse that listing. Outside run_checks (fleet hosts) each call lists.
+        """
+        shared = getattr(self._local, 'containers', None) or self._shared_snapshot(names)
+        # Containers up longer than the old window cannot score a restart penalty
+        return shared.get(self.config['restart_detection']['old_window'] if inspect else None)
+
+    def _shared_snapshot(self, names) -> SharedSnapshot:
+        return SharedSnapshot(
+            self.docker_client.api,
+            names,
+            max_workers=self.config.get('docker', {}).get('max_workers', 8)
+        )
+
+    def _open_container_events(self) -> None:
+        """Set up the Docker event index when restarts are detected from events"""
+        self.event_index = None
+        self.event_subscriber = None
+
+        restart_config = self.config['restart_detection']
+        if not restart_config['enabled'] or restart_config.get('source', 'events') != 'events':
+            return
+
+        self.event_index = ContainerEventIndex(
+            path=restart_config.get('events_path'),
+            horizon=restart_config['old_window'],
+            names=self.plan.container_names
+        )
+        self.event_index.load()
+        self.event_subscriber = DockerEventSubscriber(self.docker_client, self.event_index)
+
+    def _sync_container_events(self) -> bool:
+        """Bring the event index up to date; False falls back to inspect-based detection"""
+        if self.event_subscriber is None:
+            return False
+        if self.event_subscriber.running:
+            return True
+        try:
+            self.event_subscriber.catch_up()
+            return True
+        except Exception as e:
+            print(f"Warning: Could not read Docker events, falling back to inspect: {e}")
+            return False
+
+    def _check_container_restart_events(self, container: ContainerSpec) -> None:
+        """Score restarts from real restart/OOM event counts in the index"""
+        restart_config = self.config['restart_detection']
+        now = time.time()
+        max_counted = restart_config.get('max_counted_restarts', 3)
+
+        recent = self.event_index.count(container.name, 'restart', now - restart_config['recent_window'])
+        total = self.event_index.count(container.name, 'restart', now - restart_config['old_window'])
+        ooms = self.event_index.count(container.name, 'oom', now - restart_config['old_window'])
+        oom_note = f", {ooms} OOM kill(s)" if ooms else ""
+
+        if recent:
+            penalty = restart_config['recent_penalty'] * min(recent, max_counted)
+            self.score -= penalty
+            self.issues.append({
+                'severity': 'medium',
+                'component': container.display,
+                'issue': f"Restarted {recent}x in last {restart_config['recent_window'] // 3600}h{oom_note}",
+                'penalty': penalty
+            })
+        elif total:
+            penalty = restart_config['old_penalty'] * min(total, max_counted)
+            self.score -= penalty
+            self.issues.append({
+                'severity': 'minor',
+                'component': container.display,
+                'issue': f"Restarted {total}x in last {restart_config['old_window'] // 3600}h{oom_note}",
+                'penalty': penalty
+            })
 
-    def _check_container_restarts(self, container, container_config) -> None:
+    def _check_container_health(self, container: ContainerSpec, health: Optional[str], use_events: bool) -> None:
+        """Score a failing Docker healthcheck, and unhealthy spells since recovered (from events)
+
+        health is the current state from the listing; the event index adds how
+        long the container has been unhealthy and how often it was recently.
+        """
+        restart_config = self.config['restart_detection']
+        now = time.time()
+        if health == 'unhealthy':
+            transition = self.event_index.health(container.name) if use_events else None
+            duration = ""
+            if transition is not None and transition[0] == 'unhealthy':
+                minutes = int(now - transition[1]) // 60
+                duration = f" for {minutes // 60}h" if minutes >= 60 else f" for {minutes} min"
+            penalty = restart_config.get('unhealthy_penalty', 5)
+            self.score -= penalty
+            self.issues.append({
+                'severity': 'medium',
+                'component': container.display,
+                'issue': f"Failing its healthcheck{duration}",
+                'penalty': penalty
+            })
+        elif use_events:
+            spells = self.event_index.count(container.name, 'unhealthy', now - restart_config['recent_window'])
+            if spells:
+                max_counted = restart_config.get('max_counted_restarts', 3)
+                penalty = restart_config.get('unhealthy_recent_penalty', 1) * min(spells, max_counted)
+                self.score -= penalty
+                self.issues.append({
+                    'severity': 'minor',
+                    'component': container.display,
+                    'issue': f"Unhealthy {spells}x in last {restart_config['recent_window'] // 3600}h (recovered)",
+                    'penalty': penalty
+                })
+
+    def _check_container_restarts(self, attrs: Dict, container: ContainerSpec) -> None:
         """Check for container restarts in configured time windows"""
         try:
             # Get container start time
-            started_at = container.attrs['State']['StartedAt']
+            started_at = attrs['State']['StartedAt']
             # Parse ISO 8601 format
             started_time = datetime.fromisoformat(started_at.replace('Z', '+00:00'))
             now = datetime.now(started_time.tzinfo)
@@ -78,7 +674,7 @@ class HealthChecker:
             old_window = self.config['restart_detection']['old_window']
 
             # Check restart count from container stats
-            restart_count = container.attrs['RestartCount']
+            restart_count = attrs['RestartCount']
 
             # If container was restarted recently (uptime < window), it counts as a restart
             if uptime_seconds < recent_window and restart_count > 0:
@@ -86,7 +682,7 @@ class HealthChecker:
                 self.score -= penalty
                 self.issues.append({
                     'severity': 'medium',
-                    'component': container_config['display'],
+                    'component': container.display,
                     'issue': f"Restarted recently ({int(uptime_seconds/3600)}h ago)",
                     'penalty': penalty
                 })
@@ -95,193 +691,471 @@ class HealthChecker:
                 self.score -= penalty
                 self.issues.append({
                     'severity': 'minor',
-                    'component': container_config['display'],
+                    'component': container.display,
                     'issue': f"Restarted in last 24h ({int(uptime_seconds/3600)}h ago)",
                     'penalty': penalty
                 })
         except Exception as e:
-            print(f"Warning: Could not check restart for {container_config['display']}: {e}")
+            print(f"Warning: Could not check restart for {container.display}: {e}")
 
-    def _get_cpu_percent(self) -> float:
-        """Get CPU usage percentage using shell commands"""
-        try:
-            # Use top to get CPU usage
-            result = subprocess.run(['top', '-bn1'], capture_output=True, text=True, timeout=5)
-            for line in result.stdout.split('\n'):
-                if 'Cpu(s)' in line or '%Cpu' in line:
-                    # Extract idle percentage and calculate usage
-                    parts = line.split()
-                    for i, part in enumerate(parts):
-                        if 'id' in part or 'idle' in part:
-                            try:
-                                idle = float(parts[i-1].rstrip(','))
-                                return 100.0 - idle
-                            except (ValueError, IndexError):
-                                pass
-            return 0.0
-        except Exception:
-            return 0.0
-
-    def _get_memory_percent(self) -> float:
-        """Get memory usage percentage using shell commands"""
-        try:
-            result = subprocess.run(['free'], capture_output=True, text=True, timeout=5)
-            lines = result.stdout.split('\n')
-            for line in lines:
-                if line.startswith('Mem:'):
-                    parts = line.split()
-                    total = float(parts[1])
-                    used = float(parts[2])
-                    return (used / total) * 100.0
-            return 0.0
-        except Exception:
-            return 0.0
-
-    def _get_disk_percent(self, path: str) -> float:
-        """Get disk usage percentage using shell commands"""
-        try:
-            result = subprocess.run(['df', path], capture_output=True, text=True, timeout=5)
-            lines = result.stdout.split('\n')
-            if len(lines) > 1:
-                parts = lines[1].split()
-                percent_str = parts[4].rstrip('%')
-                return float(percent_str)
-            return 0.0
-        except Exception:
-            return 0.0
+    def check_container_resources(self) -> None:
+        """Check CPU and memory of each running container against its thresholds"""
+        if self.container_stats is None:
+            return
+
+        plan = self.plan
+        snapshot = self._capture_containers(plan.container_names, inspect=False)
+        running = {
+            c.name: snapshot.get(c.name)['Id'] for c in plan.containers
+            if snapshot.status(c.name) == 'running'
+        }
+
+        usage = self.container_stats.collect(self.docker_client.api, running)
+        self.details['container_stats'] = usage
+
+        checks = [
+            ('cpu', 'cpu_percent', 'CPU usage', "of one CPU"),
+            ('memory', 'memory_percent', 'memory usage', "of limit"),
+        ]
+        prefixes = {'critical': 'High', 'medium': 'Elevated'}
+        for container in plan.containers:
+            stats = usage.get(container.name)
+            if stats is None:
+                continue
+
+            for resource, key, label, unit in checks:
+                # Per-container overrides are already merged into the plan's thresholds
+                value = stats[key]
+                level = getattr(container, resource).classify(value)
+                if level is None:
+                    continue
+
+                severity, penalty = level
+                self.score -= penalty
+                self.issues.append({
+                    'severity': severity,
+                    'component': container.display,
+                    'issue': f"{prefixes[severity]} {label} ({value:.1f}% {unit})",
+                    'penalty': penalty
+                })
+
+    def _collect_resources(self) -> Dict:
+        """Read CPU, memory and disk from Netdata over the window, else sample in-process
+
+        Local samples fall back to 0 on read errors.
+        """
+        if self.netdata is not None:
+            readers = {
+                'cpu': self.netdata.cpu,
+                'memory': self.netdata.memory,
+                'disk': lambda: self.netdata.disk(self.config['resources']['disk']['path']),
+            }
+            try:
+                collected = {}
+                for name, reader in readers.items():
+                    with tracing.span(f'netdata.{name}'):
+                        collected[name] = reader()
+            except (requests.RequestException, ValueError, KeyError) as e:
+                if not self._netdata_down:
+                    print(f"Warning: Netdata unavailable, sampling resources locally: {e}")
+                self._netdata_down = True
+            else:
+                if self._netdata_down:
+                    print("Netdata available again, using windowed resource data")
+                self._netdata_down = False
+                self.details['resources_source'] = 'netdata'
+                return collected
+
+        self.details['resources_source'] = 'local'
+        collected = {}
+        samplers = {
+            'cpu': self.collector.cpu,
+            'memory': self.collector.memory,
+            'disk': lambda: self.collector.disk(self.config['resources']['disk']['path']),
+        }
+        for name, sampler in samplers.items():
+            try:
+                with tracing.span(f'collect.{name}'):
+                    collected[name] = sampler()
+            except Exception as e:
+                print(f"Warning: Could not collect {name} usage: {e}")
+                collected[name] = {'percent': 0.0}
+        return collected
 
     def check_system_resources(self) -> None:
         """Check system resource usage"""
-        # CPU check
-        cpu_percent = self._get_cpu_percent()
-        cpu_config = self.config['resources']['cpu']
-
-        if cpu_percent >= cpu_config['critical_threshold']:
-            penalty = cpu_config['critical_penalty']
-            self.score -= penalty
-            self.issues.append({
-                'severity': 'critical',
-                'component': 'System CPU',
-                'issue': f"High CPU usage ({cpu_percent:.1f}%)",
-                'penalty': penalty
-            })
-        elif cpu_percent >= cpu_config['warning_threshold']:
-            penalty = cpu_config['warning_penalty']
+        resources = self._collect_resources()
+        thresholds = self.plan.resources
+
+        # (resource, component, issue wording at critical and at warning level)
+        checks = [
+            ('cpu', 'System CPU', "High CPU usage", "Elevated CPU usage"),
+            ('memory', 'System Memory', "High memory usage", "Elevated memory usage"),
+            ('disk', 'System Disk', "High disk usage", "Warning disk usage"),
+        ]
+        baselines = {}
+        for resource, component, critical_text, warning_text in checks:
+            percent = resources[resource]['percent']
+            self.details[f"{resource}_percent"] = percent
+
+            level = thresholds[resource].classify(percent)
+            # Disk only grows, so it keeps its static levels; CPU and memory also get a baseline
+            deviation = None
+            if resource != 'disk':
+                deviation = self._observe_baseline(f"system.{resource}", percent, 'percent')
+            if deviation is not None:
+                baselines[resource] = deviation.as_dict()
+
+            # The critical level is a hard limit. Once the baseline has warmed up, the
+            # warning level gives way to it, so a box that always runs at 75% memory is
+            # not penalized for it, and a jump from 10% to 55% CPU is.
+            if deviation is not None and deviation.warmed and (level is None or level[0] != 'critical'):
+                when = " at this hour" if deviation.seasonal else ""
+                self._score_deviation(
+                    component, deviation,
+                    f"Unusual {'CPU' if resource == 'cpu' else resource} usage ({percent:.1f}%, "
+                    f"usually {deviation.expected:.1f}% ± {deviation.std:.1f}{when})"
+                )
+                continue
+            if level is None:
+                continue
+            severity, penalty = level
             self.score -= penalty
-            self.issues.append({
-                'severity': 'medium',
-                'component': 'System CPU',
-                'issue': f"Elevated CPU usage ({cpu_percent:.1f}%)",
+            issue = {
+                'severity': severity,
+                'component': component,
+                'issue': f"{critical_text if severity == 'critical' else warning_text} ({percent:.1f}%)",
                 'penalty': penalty
-            })
+            }
+            if resource == 'disk':
+                issue.update(kind='disk_pressure', target=self.config['resources']['disk']['path'])
+            self.issues.append(issue)
+
+        if baselines:
+            self.details['baselines'] = baselines
+        self.details['cpu_iowait_percent'] = resources['cpu'].get('iowait_percent', 0.0)
+        self.details['cpu_steal_percent'] = resources['cpu'].get('steal_percent', 0.0)
+        self.details['cpu_per_core'] = resources['cpu'].get('per_core', [])
+        self.details['swap_percent'] = resources['memory'].get('swap_percent', 0.0)
+
+    def check_service_responses(self) -> None:
+        """Check if services respond within acceptable time"""
+        service_config = self.config['service_checks']
+        if not service_config['enabled']:
+            return
+
+        timeout = service_config['timeout']
+        penalty = service_config['slow_response_penalty']
+
+        results = probe_endpoints(
+            self.http_session,
+            self.plan.endpoints,
+            timeout=timeout + 1,  # Give slight buffer
+            deadline=service_config.get('deadline', timeout + 2),
+            max_concurrency=service_config.get('max_concurrency', 8)
+        )
+
+        endpoint_timings = self.details.setdefault('endpoint_timings', {})
+        for result in results:
+            name = result['name']
+            endpoint_timings[name] = {
+                'connect': result['connect'],
+                'ttfb': result['ttfb'],
+                'total': result['total']
+            }
+
+            if result['status'] == 'timeout':
+                self.score -= penalty * 2  # Double penalty for timeout
+                self.issues.append({
+                    'severity': 'medium',
+                    'component': name,
+                    'issue': f"Response timeout (>{timeout}s)",
+                    'penalty': penalty * 2,
+                    'kind': 'endpoint_timeout',
+                    'target': name
+                })
+                continue
+
+            if result['status'] == 'error':
+                # Service might be down (already caught by container check)
+                self.details[f"{name}_response_time"] = None
+                continue
+
+            response_time = result['total']
+            deviation = self._observe_baseline(f"endpoint.{name}", response_time, 'latency')
+            if deviation is not None:
+                self.details.setdefault('endpoint_baselines', {})[name] = deviation.as_dict()
+
+            if response_time > timeout:
+                self.score -= penalty
+                self.issues.append({
+                    'severity': 'minor',
+                    'component': name,
+                    'issue': f"Slow response ({response_time:.2f}s)",
+                    'penalty': penalty
+                })
+            elif deviation is not None and response_time >= self.config['baselines'].get('min_latency', 0.1):
+                # Below the timeout, slowness is judged against the endpoint's own baseline
+                self._score_deviation(
+                    name, deviation,
+                    f"Slower than usual ({response_time:.3f}s, usually {deviation.expected:.3f}s)"
+                )
 
-        self.details['cpu_percent'] = cpu_percent
+            # Store response time for details
+            self.details[f"{name}_response_time"] = response_time
+            if self.exporter is not None:
+                self.exporter.observe_endpoint(name, response_time)
 
-        # Memory check
-        memory_percent = self._get_memory_percent()
-        memory_config = self.config['resources']['memory']
+    def check_log_errors(self) -> None:
+        """Check error log rates per container against per-priority thresholds"""
+        if self.log_rates is None:
+            return
 
-        if memory_percent >= memory_config['critical_threshold']:
-            penalty = memory_config['critical_penalty']
+        log_config = self.config['log_analysis']
+        try:
+            queries = self.log_rates.queries
+            with tracing.span('loki.query') as span:
+                rates = self.log_rates.fetch()
+                span.set(cached=self.log_rates.queries == queries)
+        except (requests.RequestException, ValueError) as e:
+            # Loki being down is already scored by the container and endpoint checks
+            print(f"Warning: Could not query Loki error rates: {e}")
+            return
+
+        self.details['log_error_rates'] = rates
+
+        displays = self.plan.displays
+        priorities = self.plan.log_priorities
+        window_minutes = log_config.get('window', 300) // 60
+        remaining = log_config.get('max_penalty', 20)
+
+        findings = []
+        for container, rate in rates.items():
+            thresholds = priorities.get(rate['priority']) or priorities['default']
+            level = thresholds.classify(rate['per_minute'])
+            if level is not None:
+                findings.append((level, container, rate['per_minute']))
+
+        # Most severe, then noisiest first, so the penalty cap keeps the most relevant issues
+        findings.sort(key=lambda finding: (SEVERITY_ORDER[finding[0][0]], -finding[2]))
+        for (severity, penalty), container, per_minute in findings:
+            if remaining <= 0:
+                # The cap is used up; every rate is still in details['log_error_rates']
+                break
+            penalty = min(penalty, remaining)
+            remaining -= penalty
             self.score -= penalty
             self.issues.append({
-                'severity': 'critical',
-                'component': 'System Memory',
-                'issue': f"High memory usage ({memory_percent:.1f}%)",
+                'severity': severity,
+                'component': displays.get(container, container),
+                'issue': f"{per_minute:.1f} errors/min in logs (last {window_minutes} min)",
                 'penalty': penalty
             })
-        elif memory_percent >= memory_config['warning_threshold']:
-            penalty = memory_config['warning_penalty']
+
+    def check_network(self) -> None:
+        """Check reachability, packet loss and RTT of the configured network targets"""
+        network_config = self.config.get('network_checks', {})
+        if not network_config.get('enabled', False):
+            return
+
+        from network_probe import probe_targets
+
+        targets = network_config.get('targets', [])
+        results = probe_targets(
+            targets,
+            count=network_config.get('count', 3),
+            timeout=network_config.get('timeout', 1.0),
+            deadline=network_config.get('deadline'),
+            interval=network_config.get('interval', 0.05),
+            max_concurrency=network_config.get('max_concurrency')
+        )
+        self.details['network_probes'] = {result['name']: result for result in results}
+
+        loss_warning = network_config.get('loss_warning_percent', 30)
+        remaining = network_config.get('max_penalty', 20)
+        findings = []
+        for target, result in zip(targets, results):
+            name = result['name']
+            if result['status'] in ('unsupported', 'skipped'):
+                print(f"Warning: Skipping {name}: {result['error']}")
+                continue
+
+            rtt_warning = target.get('rtt_warning_ms', network_config.get('rtt_warning_ms'))
+            if result['status'] == 'down':
+                severity, penalty = 'critical', target.get('penalty_down', network_config.get('penalty_down', 5))
+                issue = f"Unreachable ({result['sent']}/{result['sent']} {result['type']} probes lost: {result['error']})"
+            elif result['loss_percent'] >= loss_warning:
+                severity, penalty = 'medium', target.get('penalty_loss', network_config.get('penalty_loss', 2))
+                issue = (f"Packet loss {result['loss_percent']:.0f}% "
+                         f"({result['sent'] - result['received']}/{result['sent']} probes lost)")
+            elif rtt_warning is not None and result['rtt_p95'] * 1000 > rtt_warning:
+                severity, penalty = 'minor', target.get('slow_penalty', network_config.get('slow_penalty', 1))
+                issue = f"Slow {result['type']} RTT (p95 {result['rtt_p95'] * 1000:.1f}ms > {rtt_warning}ms)"
+            else:
+                continue
+            findings.append((severity, penalty, name, issue))
+
+        # Most severe first, so the penalty cap keeps the most relevant issues
+        findings.sort(key=lambda finding: SEVERITY_ORDER[finding[0]])
+        for severity, penalty, name, issue in findings:
+            if remaining <= 0:
+                # The cap is used up; every result is still in details['network_probes']
+                break
+            penalty = min(penalty, remaining)
+            remaining -= penalty
             self.score -= penalty
             self.issues.append({
-                'severity': 'medium',
-                'component': 'System Memory',
-                'issue': f"Elevated memory usage ({memory_percent:.1f}%)",
+                'severity': severity,
+                'component': name,
+                'issue': issue,
                 'penalty': penalty
             })
 
-        self.details['memory_percent'] = memory_percent
+    def check_disk_growth(self) -> None:
+        """Check how fast container logs, volumes and configured directories grow, and inode usage"""
+        if self.disk_growth is None:
+            return
+
+        from disk_growth import format_bytes, inode_usage
+
+        growth_config = self.config['disk_growth']
+        labels = {}
+        if any(target.get('labels') == 'containers' for target in growth_config.get('targets', [])):
+            # Container log directories are named by container id
+            try:
+                with tracing.span('docker.list'):
+                    containers = self.docker_client.api.containers(all=True)
+                labels = {c['Id']: c['Names'][0].lstrip('/') for c in containers if c.get('Names')}
+            except Exception as e:
+                print(f"Warning: Could not list containers for disk growth labels: {e}")
 
-        # Disk check
-        disk_percent = self._get_disk_percent(self.config['resources']['disk']['path'])
-        disk_config = self.config['resources']['disk']
+        with tracing.span('disk.scan') as span:
+            growth = self.disk_growth.scan(labels)
+            span.set(stats=growth['scan']['stats'], listings=growth['scan']['listings'])
+        try:
+            self.disk_growth.save()
+        except OSError as e:
+            print(f"Warning: Could not save disk growth state: {e}")
+
+        items = sorted(growth['items'], key=lambda item: -(item['bytes_per_hour'] or 0))
+        self.details['disk_growth'] = {'items': items, 'targets': growth['targets'], 'scan': growth['scan']}
+
+        warning = growth_config.get('growth_warning')
+        critical = growth_config.get('growth_critical')
+        remaining = growth_config.get('max_penalty', 10)
+        log_targets = {
+            target['name'] for target in growth_config.get('targets', []) if target.get('labels') == 'containers'
+        }
+        # Items are sorted fastest first, so the penalty cap keeps the most relevant issues
+        for item in items:
+            rate = item['bytes_per_hour'] or 0
+            if critical is not None and rate >= critical:
+                severity, penalty = 'medium', growth_config.get('growth_critical_penalty', 3)
+            elif warning is not None and rate >= warning:
+                severity, penalty = 'minor', growth_config.get('growth_penalty', 1)
+            else:
+                break
+            if remaining <= 0:
+                # The cap is used up; every item is still in details['disk_growth']
+                break
 
-        if disk_percent >= disk_config['critical_threshold']:
-            penalty = disk_config['critical_penalty']
+            penalty = min(penalty, remaining)
+            remaining -= penalty
             self.score -= penalty
-            self.issues.append({
-                'severity': 'critical',
-                'component': 'System Disk',
-                'issue': f"High disk usage ({disk_percent:.1f}%)",
+            issue = {
+                'severity': severity,
+                'component': f"{item['target']}/{item['item']}",
+                'issue': f"Growing {format_bytes(rate)}/h ({format_bytes(item['bytes'])})",
                 'penalty': penalty
-            })
-        elif disk_percent >= disk_config['warning_threshold']:
-            penalty = disk_config['warning_penalty']
+            }
+            if item['target'] in log_targets:
+                issue.update(kind='log_growth', target=item['item'])
+            self.issues.append(issue)
+
+        try:
+            with tracing.span('disk.inodes'):
+                inodes = inode_usage(growth_config.get('mounts_path', '/proc/mounts'), growth_config.get('root', ''))
+        except OSError as e:
+            print(f"Warning: Could not read inode usage: {e}")
+            return
+        self.details['inodes'] = inodes
+
+        if self.plan.inodes is None:
+            return
+        for mount_point, usage in inodes.items():
+            level = self.plan.inodes.classify(usage['percent'])
+            if level is None:
+                continue
+            severity, penalty = level
             self.score -= penalty
             self.issues.append({
-                'severity': 'medium',
-                'component': 'System Disk',
-                'issue': f"Warning disk usage ({disk_percent:.1f}%)",
+                'severity': severity,
+                'component': f"Inodes {mount_point}",
+                'issue': f"{'High' if severity == 'critical' else 'Warning'} inode usage ({usage['percent']:.1f}%)",
                 'penalty': penalty
             })
 
-        self.details['disk_percent'] = disk_percent
-
-    def check_service_responses(self) -> None:
-        """Check if services respond within acceptable time"""
-        if not self.config['service_checks']['enabled']:
+    def check_forwarder(self) -> None:
+        """Check the Telegram forwarder's own /healthz: ntfy streams, delivery workers and backlog"""
+        forwarder_config = self.config.get('forwarder', {})
+        if not forwarder_config.get('enabled', False):
             return
 
-        timeout = self.config['service_checks']['timeout']
-        penalty = self.config['service_checks']['slow_response_penalty']
-
-        for endpoint in self.config['service_checks']['endpoints']:
-            try:
-                start_time = time.time()
-                response = requests.get(
-                    endpoint['url'],
-                    timeout=timeout + 1  # Give slight buffer
-                )
-                response_time = time.time() - start_time
-
-                if response_time > timeout:
-                    self.score -= penalty
-                    self.issues.append({
-                        'severity': 'minor',
-                        'component': endpoint['name'],
-                        'issue': f"Slow response ({response_time:.2f}s)",
-                        'penalty': penalty
-                    })
-
-                # Store response time for details
-                self.details[f"{endpoint['name']}_response_time"] = response_time
+        component = forwarder_config.get('display', 'Telegram Forwarder')
+        container = forwarder_config.get('container', 'oci-telegram-forwarder')
+        url = f"{forwarder_config.get('url', 'http://oci-telegram-forwarder:9106').rstrip('/')}/healthz"
+        penalty = forwarder_config.get('penalty_unhealthy', 5)
+        try:
+            with tracing.span('forwarder.healthz'):
+                response = self.http_session.get(url, timeout=forwarder_config.get('timeout', 5))
+                # 503 still carries the status body
+                status = response.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"Warning: Could not read forwarder status from {url}: {describe_error(e)}")
+            status = {'status': 'unreachable', 'problems': [f"status endpoint unreachable ({type(e).__name__})"]}
+
+        self.details['forwarder'] = status
+        topics = status.get('topics', {})
+        backlog = max(status.get('backlog', {}).values(), default=0)
+        if topics:
+            ages = [topic['keepalive_age'] for topic in topics.values() if topic['keepalive_age'] is not None]
+            self.details['forwarder_keepalive_age'] = max(ages, default=None)
+            self.details['forwarder_reconnects'] = sum(topic['reconnects'] for topic in topics.values())
+            self.details['forwarder_backlog'] = backlog
+
+        if status.get('status') != 'ok':
+            self.score -= penalty
+            self.issues.append({
+                'severity': 'medium',
+                'component': component,
+                'issue': f"Unhealthy: {'; '.join(status.get('problems', [])) or status.get('status')}",
+                'penalty': penalty,
+                'kind': 'forwarder_unhealthy',
+                'target': container
+            })
 
-            except requests.exceptions.Timeout:
-                self.score -= penalty * 2  # Double penalty for timeout
-                self.issues.append({
-                    'severity': 'medium',
-                    'component': endpoint['name'],
-                    'issue': f"Response timeout (>{timeout}s)",
-                    'penalty': penalty * 2
-                })
-            except Exception as e:
-                # Service might be down (already caught by container check)
-                self.details[f"{endpoint['name']}_response_time"] = None
+        # A deep backlog usually means Telegram is slow or down; restarting the forwarder would not help
+        if backlog >= forwarder_config.get('backlog_critical', 100):
+            severity, backlog_penalty = 'medium', forwarder_config.get('backlog_critical_penalty', 3)
+        elif backlog >= forwarder_config.get('backlog_warning', 20):
+            severity, backlog_penalty = 'minor', forwarder_config.get('backlog_penalty', 1)
+        else:
+            return
+        self.score -= backlog_penalty
+        self.issues.append({
+            'severity': severity,
+            'component': component,
+            'issue': f"{backlog} alert(s) waiting for Telegram delivery",
+            'penalty': backlog_penalty
+        })
 
     def get_score_range(self) -> Tuple[str, str, str]:
         """Get score range info (emoji, label, range_name)"""
-        score = max(0, min(100, self.score))  # Clamp to 0-100
-
-        ranges = self.config['score_ranges']
-        for range_name in ['excellent', 'good', 'fair', 'poor', 'critical']:
-            if score >= ranges[range_name]['min']:
-                return (
-                    ranges[range_name]['emoji'],
-                    ranges[range_name]['label'],
-                    range_name
-                )
+        return self._range_for_score(self.score)
 
-        return ranges['critical']['emoji'], ranges['critical']['label'], 'critical'
+    def _range_for_score(self, score: float) -> Tuple[str, str, str]:
+        """Get score range info (emoji, label, range_name) for any score"""
+        return self.plan.range_for_score(score)
 
     def format_message(self) -> str:
         """Format health score message for Telegram"""
@@ -293,24 +1167,36 @@ class HealthChecker:
         # Build message
         message = f"<b>{emoji} Infrastructure Health Report</b>\n\n"
         message += f"<b>Health Score:</b> {score}/100 ({label})\n"
-        message += f"<b>Period:</b> Last 12 hours\n"
+        message += f"<b>Period:</b> Last {self._report_window() // 3600} hours\n"
         message += f"<b>Time:</b> {timestamp}\n\n"
 
         # System overview
-        message += "<b>📊 System Overview</b>\n"
-        message += f"CPU: {self.details.get('cpu_percent', 0):.1f}%\n"
+        if self.details.get('resources_source') == 'netdata':
+            window = self.netdata.window
+            period = f"{window // 60} min" if window >= 60 else f"{window}s"
+            message += f"<b>📊 System Overview</b> ({period} {self.netdata.group})\n"
+        else:
+            message += "<b>📊 System Overview</b>\n"
+        message += (f"CPU: {self.details.get('cpu_percent', 0):.1f}% "
+                    f"(iowait {self.details.get('cpu_iowait_percent', 0):.1f}%, "
+                    f"steal {self.details.get('cpu_steal_percent', 0):.1f}%)\n")
         message += f"Memory: {self.details.get('memory_percent', 0):.1f}%\n"
+        message += f"Swap: {self.details.get('swap_percent', 0):.1f}%\n"
         message += f"Disk: {self.details.get('disk_percent', 0):.1f}%\n"
 
+        message += self._format_container_stats()
+        message += self._format_fleet()
+        message += self._format_history()
+        message += self._format_netdata_summary()
+
         # Issues section (if any)
         if self.issues:
             message += f"\n<b>⚠️ Issues Detected ({len(self.issues)})</b>\n"
 
             # Sort by severity
-            severity_order = {'critical': 0, 'medium': 1, 'minor': 2}
             sorted_issues = sorted(
                 self.issues,
-                key=lambda x: (severity_order.get(x['severity'], 3), -x['penalty'])
+                key=lambda x: (SEVERITY_ORDER.get(x['severity'], 3), -x['penalty'])
             )
 
             # Limit to max items
@@ -318,12 +1204,7 @@ class HealthChecker:
             display_issues = sorted_issues[:max_items]
 
             for issue in display_issues:
-                severity_emoji = {
-                    'critical': '🔴',
-                    'medium': '🟡',
-                    'minor': '⚪'
-                }.get(issue['severity'], '⚪')
-
+                severity_emoji = SEVERITY_EMOJI.get(issue['severity'], '⚪')
                 message += f"{severity_emoji} {issue['component']}: {issue['issue']} (-{issue['penalty']}pts)\n"
 
             if len(sorted_issues) > max_items:
@@ -341,13 +1222,226 @@ class HealthChecker:
                 service_name = key.replace('_response_time', '')
                 message += f"{service_name}: {response_time:.3f}s\n"
 
+        message += self._format_network()
+        message += self._format_disk_growth()
+        message += self._format_remediation()
+        if self.config.get('tracing', {}).get('notify', False):
+            message += self.format_timings()
+
         return message
 
-    def send_notification(self, message: str) -> None:
-        """Send notification to Telegram via ntfy"""
+    def _format_container_stats(self) -> str:
+        """Format the busiest containers by CPU with their memory use"""
+        usage = self.details.get('container_stats')
+        if not usage:
+            return ""
+
+        displays = self.plan.displays
+        top = sorted(usage.items(), key=lambda item: -item[1]['cpu_percent'])[:3]
+
+        section = "\n<b>🐳 Top Containers</b>\n"
+        for name, stats in top:
+            section += (f"{displays.get(name, name)}: CPU {stats['cpu_percent']:.1f}%, "
+                        f"Mem {stats['memory_bytes'] / 1048576:.0f} MiB ({stats['memory_percent']:.1f}%)\n")
+        return section
+
+    def _format_remediation(self) -> str:
+        """Format the remediation actions and recoveries of the report window, and paused actions"""
+        if self.remediation is None:
+            return ""
+
+        since = time.time() - self._report_window()
+        records = [record for record in self.remediation.records if record['at'] >= since][-5:]
+        paused = [name for name, state in self.remediation.summary()['breakers'].items() if state == 'open']
+        if not records and not paused:
+            return ""
+
+        section = "\n<b>🔧 Remediation</b>\n"
+        for record in records:
+            section += f"{REMEDIATION_EMOJI.get(record['outcome'], '•')} {self._describe_remediation(record)}\n"
+        for name in paused:
+            section += f"⛔ {name} paused after repeated failures\n"
+        return section
+
+    @staticmethod
+    def _describe_remediation(record: Dict) -> str:
+        """One line for a remediation event"""
+        action = f"{record['action']} {record['action_target']}"
+        outcome = record['outcome']
+        if outcome == 'recovered':
+            return (f"{record['target']} recovered {record['recovery_seconds']:.0f}s after detection "
+                    f"({action} after {record['action_seconds']:.0f}s)")
+        if outcome == 'dry_run':
+            return f"Would run {action} for {record['kind']} {record['target']} (dry run)"
+        if outcome == 'ineffective':
+            return f"{action} did not clear {record['kind']} {record['target']}"
+        if outcome == 'noop':
+            return f"{action}: nothing to do"
+        return f"{action}: {record.get('detail')}"
+
+    def _format_network(self) -> str:
+        """Format RTT and loss per network target"""
+        probes = self.details.get('network_probes')
+        if not probes:
+            return ""
+
+        section = "\n<b>🌐 Network</b>\n"
+        for name, result in probes.items():
+            if result['status'] in ('unsupported', 'skipped'):
+                continue
+            if result['rtt_p50'] is None:
+                section += f"{name}: unreachable\n"
+                continue
+            section += (f"{name}: {result['rtt_p50'] * 1000:.1f}ms p50 / {result['rtt_p95'] * 1000:.1f}ms p95, "
+                        f"loss {result['loss_percent']:.0f}%\n")
+        return section
+
+    def _format_disk_growth(self) -> str:
+        """Format the fastest growing items and the fullest filesystems by inodes"""
+        growth = self.details.get('disk_growth')
+        if not growth:
+            return ""
+
+        from disk_growth import format_bytes
+
+        section = "\n<b>💾 Disk Growth</b>\n"
+        growing = [item for item in growth['items'] if (item['bytes_per_hour'] or 0) > 0][:3]
+        for item in growing:
+            section += (f"{item['target']}/{item['item']}: {format_bytes(item['bytes'])} "
+                        f"(+{format_bytes(item['bytes_per_hour'])}/h)\n")
+        if not growing:
+            section += "Nothing growing\n"
+
+        inodes = sorted(self.details.get('inodes', {}).items(), key=lambda item: -item[1]['percent'])[:3]
+        if inodes:
+            section += "Inodes: " + ", ".join(f"{mount} {usage['percent']:.0f}%" for mount, usage in inodes) + "\n"
+        return section
+
+    def _format_fleet(self) -> str:
+        """Format the fleet rollup, each host's score and the top issues of remote hosts"""
+        if self.fleet is None:
+            return ""
+
+        local = {'name': self.fleet.local_name, 'score': max(0, min(100, self.score)),
+                 'issues': [], 'checked': True}
+        hosts = [local] + self.fleet.summaries()
+        checked = [host for host in hosts if host['checked']]
+        worst = min(checked, key=lambda host: host['score'])
+        average = sum(host['score'] for host in checked) / len(checked)
+
+        section = f"\n<b>🖥 Fleet ({len(hosts)} hosts)</b>\n"
+        section += f"Worst: {worst['score']}/100 ({worst['name']}), average {average:.0f}/100\n"
+        for host in hosts:
+            if not host['checked']:
+                section += f"⏳ {host['name']}: not checked yet\n"
+                continue
+            emoji, label, _ = self._range_for_score(host['score'])
+            suffix = " (this host)" if host is local else ""
+            section += f"{emoji} {host['name']}: {host['score']}/100 ({label}){suffix}\n"
+            # This host's issues are listed in the issues section below
+            top = sorted(host['issues'], key=lambda x: (SEVERITY_ORDER.get(x['severity'], 3), -x['penalty']))[:3]
+            for issue in top:
+                section += f"   • {issue['component']}: {issue['issue']} (-{issue['penalty']}pts)\n"
+        return section
+
+    def format_timings(self) -> str:
+        """Format how long each check family took and its slowest steps"""
+        families = [(family, self.traces[family]) for family in self.checks.names() if family in self.traces]
+        if not families:
+            return ""
+
+        section = "\n<b>🕒 Check Timings</b>\n"
+        for family, trace in families:
+            spans = {entry['id']: entry for entry in trace['spans']}
+            steps = []
+            for entry in tracing.slowest(trace):
+                subject = self._span_subject(entry)
+                label = f"{entry['name']} {subject}" if subject else entry['name']
+                # Steps of a fleet host carry the host from their fleet.host ancestor
+                parent = spans.get(entry['parent'])
+                while parent is not None and parent['name'] != 'fleet.host':
+                    parent = spans.get(parent['parent'])
+                if parent is not None:
+                    label = f"[{parent['attrs']['host']}] {label}"
+                steps.append(f"{label} {entry['duration_ms']:.0f}ms")
+            section += f"{family}: {trace['duration_ms']:.0f}ms"
+            section += f" ({', '.join(steps)})\n" if steps else "\n"
+        return section
+
+    @staticmethod
+    def _span_subject(entry: Dict) -> Optional[str]:
+        """What a span was about (container, endpoint, target or host), if anything"""
+        attrs = entry['attrs']
+        for key in ('container', 'endpoint', 'target', 'host'):
+            if attrs.get(key):
+                return attrs[key]
+        return None
+
+    def _report_window(self) -> int:
+        """Seconds covered by the report (history.report_window, default 12h)"""
+        return int(self.config.get('history', {}).get('report_window', 43200))
+
+    def _format_history(self) -> str:
+        """Format min/avg/p95/max per metric and time per score range for the report window"""
+        if self.history is None:
+            return ""
+
+        since = time.time() - self._report_window()
+        try:
+            stats = [(label, self.history.summarize(metric, since)) for metric, label in HISTORY_REPORT_METRICS]
+            durations = self.history.time_in_buckets(
+                'score', since,
+                classify=lambda score: self._range_for_score(score)[2],
+                max_gap=self.config['history'].get('max_gap', 300)
+            )
+        except Exception as e:
+            print(f"Warning: Could not summarize metrics history: {e}")
+            return ""
+
+        stats = [(label, summary) for label, summary in stats if summary]
+        if not stats:
+            return ""
+
+        section = "\n<b>📈 Period Stats (min/avg/p95/max)</b>\n"
+        for label, summary in stats:
+            unit = '' if label == 'Score' else '%'
+            section += (f"{label}: {summary['min']:.1f} / {summary['avg']:.1f} / "
+                        f"{summary['p95']:.1f} / {summary['max']:.1f}{unit}\n")
+
+        if durations:
+            ranges = self.config['score_ranges']
+            section += "\n<b>⏱ Time in Score Range</b>\n"
+            for range_name in ['excellent', 'good', 'fair', 'poor', 'critical']:
+                seconds = durations.get(range_name, 0)
+                if seconds > 0:
+                    hours, minutes = divmod(int(seconds) // 60, 60)
+                    section += f"{ranges[range_name]['emoji']} {ranges[range_name]['label']}: {hours}h {minutes:02d}m\n"
+
+        return section
+
+    def _format_netdata_summary(self) -> str:
+        """Format average and max CPU and memory over the report window from Netdata"""
+        if self.netdata is None or self._netdata_down:
+            return ""
+
+        window = self._report_window()
+        try:
+            summary = self.netdata.summary(window)
+        except (requests.RequestException, ValueError, KeyError) as e:
+            print(f"Warning: Could not read Netdata report summary: {e}")
+            return ""
+
+        section = f"\n<b>📉 Netdata {window // 3600}h (avg / max)</b>\n"
+        section += f"CPU: {summary['cpu']['average']:.1f}% / {summary['cpu']['max']:.1f}%\n"
+        section += f"Memory: {summary['memory']['average']:.1f}% / {summary['memory']['max']:.1f}%\n"
+        return section
+
+    def send_notification(self, message: str, title: Optional[str] = None, priority: str = 'default',
+                          tags: str = 'health,heartbeat') -> bool:
+        """Send notification to Telegram via ntfy; True when ntfy accepted it"""
         if not self.config['notification']['enabled']:
             print("Notifications disabled, skipping send")
-            return
+            return False
 
         try:
             ntfy_url = self.config['notification']['ntfy_url']
@@ -359,34 +1453,380 @@ class HealthChecker:
                 f"{ntfy_url}/{ntfy_topic}",
                 data=message.encode('utf-8'),
                 headers={
-                    'Title': f'Infrastructure Health: {label}',
-                    'Priority': 'default',
-                    'Tags': 'health,heartbeat'
-                }
+                    'Title': title or f'Infrastructure Health: {label}',
+                    'Priority': priority,
+                    'Tags': tags
+                },
+                timeout=10
             )
 
             if response.status_code == 200:
                 print(f"Health report sent successfully (Score: {max(0, min(100, self.score))})")
-            else:
-                print(f"Failed to send notification: {response.status_code}")
+                return True
+            print(f"Failed to send notification: {response.status_code}")
 
         except Exception as e:
             print(f"Error sending notification: {e}")
+        return False
+
+    @property
+    def notify_on_change(self) -> bool:
+        """notification.mode is on_change (heartbeat only otherwise)"""
+        return self.config['notification'].get('mode', 'heartbeat') == 'on_change'
+
+    def _open_notify_state(self):
+        """Load what the last notification reported (local checker only)"""
+        if self.host_name is not None:
+            return None
+        state = NotificationState(self.config['notification'].get('state_path'))
+        state.load()
+        return state
+
+    def _current_state(self) -> Tuple[str, Dict[str, Dict]]:
+        """Score range name and keyed issues of this host and every fleet host"""
+        hosts = self.fleet.summaries() if self.fleet is not None else []
+        return self.get_score_range()[2], current_issues(self.issues, hosts)
+
+    def _heartbeat_interval(self) -> float:
+        return self.config.get('daemon', {}).get('intervals', {}).get('heartbeat', DEFAULT_INTERVALS['heartbeat'])
+
+    def _save_notify_state(self, heartbeat: bool = False) -> None:
+        """Remember the current state as notified"""
+        if self.notify_state is None:
+            return
+        self.notify_state.update(*self._current_state(), heartbeat=heartbeat)
+        try:
+            self.notify_state.save()
+        except OSError as e:
+            print(f"Warning: Could not save notification state: {e}")
+
+    def notify(self) -> bool:
+        """On-change mode: the heartbeat when it is due, else a change message when the state changed
+
+        Runs after every check. Nothing is sent until every enabled family has
+        a result, since a missing family would look like its issues cleared.
+        Change messages are at least notification.change_cooldown seconds
+        apart; the next one after the cooldown reports the net change since
+        the last message. Returns True when something was sent.
+        """
+        if not self.notify_on_change or self.notify_state is None:
+            return False
+        if any(family not in self.family_results for family in self.checks.enabled(self.config)):
+            return False
+
+        now = time.time()
+        if now - self.notify_state.heartbeat_at >= self._heartbeat_interval():
+            self.send_heartbeat()
+            return True
+
+        range_name, issues = self._current_state()
+        change = self.notify_state.diff(range_name, issues)
+        if change is None:
+            return False
+        cooldown = self.config['notification'].get('change_cooldown', 60)
+        if now - self.notify_state.notified_at < cooldown:
+            return False
+
+        emoji, label, _ = self.get_score_range()
+        minimums = {name: minimum for minimum, _, _, name in self.plan.score_ranges}
+        worse = (change['range_from'] is not None
+                 and minimums[change['range_to']] < minimums.get(change['range_from'], 0))
+        new_critical = any(issue['severity'] == 'critical' for issue in change['appeared'])
+
+        sent = self.send_notification(
+            self.format_change(change),
+            title=f"Infrastructure Health: {label} (changed)",
+            priority='high' if worse or new_critical else 'default',
+            tags='health,change'
+        )
+        if sent:
+            self._save_notify_state()
+        return sent
+
+    def format_change(self, change: Dict) -> str:
+        """Format what appeared and cleared since the last notification"""
+        emoji, label, _ = self.get_score_range()
+        ranges = self.config['score_ranges']
+
+        message = f"<b>{emoji} Infrastructure Health Changed</b>\n\n"
+        message += f"<b>Health Score:</b> {max(0, min(100, self.score))}/100 ({label})\n"
+        if change['range_from'] is not None and change['range_from'] != change['range_to']:
+            message += f"<b>Range:</b> {ranges[change['range_from']]['label']} → {label}\n"
+
+        if change['appeared']:
+            message += f"\n<b>⚠️ New Issues ({len(change['appeared'])})</b>\n"
+            for issue in sorted(change['appeared'], key=lambda x: SEVERITY_ORDER.get(x['severity'], 3)):
+                message += f"{SEVERITY_EMOJI.get(issue['severity'], '⚪')} {issue['component']}: {issue['issue']}\n"
+        if change['cleared']:
+            message += f"\n<b>✅ Cleared ({len(change['cleared'])})</b>\n"
+            for issue in change['cleared']:
+                message += f"{issue['component']}: {issue['issue']}\n"
+        return message
+
+    def build_report(self) -> Dict:
+        """Machine-readable report of the current results (--format json)"""
+        emoji, label, range_name = self.get_score_range()
+        _, issues = self._current_state()
+        report = {
+            'time': time.time(),
+            'host': self.fleet.local_name if self.fleet is not None else socket.gethostname(),
+            'score': max(0, min(100, self.score)),
+            'range': {'name': range_name, 'label': label, 'emoji': emoji},
+            'fingerprint': fingerprint(range_name, issues),
+            'issues': sorted(
+                ({**issue, 'key': key} for key, issue in issues.items()),
+                key=lambda x: (SEVERITY_ORDER.get(x['severity'], 3), -x['penalty'])
+            ),
+            'families': {
+                family: {'checked_at': result['checked_at'], 'penalty': result['penalty'],
+                         'issues': len(result['issues'])}
+                for family, result in self.family_results.items()
+            },
+            'details': self.details,
+        }
+        if self.fleet is not None:
+            report['fleet'] = self.fleet.summaries()
+        return report
+
+    def run_check_family(self, family: str) -> None:
+        """Run one check family and merge its result into the current report state
+
+        Each family keeps its latest penalties, issues and details, so families
+        can run on independent schedules and the report always combines the
+        most recent result of each.
+
+        Families may run concurrently (see run_checks): while a check runs,
+        score, issues and details are its own, and merging its result into the
+        report happens under a lock. A check that raises records nothing and
+        the exception propagates.
+        """
+        check = self.checks.load(family, self)
+        target = self.checks.specs[family].target
+        # Fleet hosts trace under the local check; only a top-level run is reported
+        top_level = tracing.current() is None
+
+        with tracing.span('check', family=family, host=self.host_name) as span:
+            # Remote hosts run while this host is checked, so a cycle lasts as long as the slowest
+            pending = self.fleet.submit(family) if self.fleet is not None else {}
+
+            state = self._local.state = CheckState()
+            self._local.plan = self._plan
+            try:
+                with tracing.span(target):
+                    check()
+            finally:
+                self._local.state = None
+                self._local.plan = None
+
+            if pending:
+                with tracing.span('fleet.collect', hosts=len(pending)):
+                    self.fleet.collect(family, pending)
+
+            self._merge_result(family, {
+                'penalty': 100 - state.score,
+                'issues': state.issues,
+                'details': state.details,
+                'checked_at': time.time()
+            })
+            span.set(issues=len(state.issues))
+
+        if top_level:
+            self._record_trace(family, span)
+
+    def _merge_result(self, family: str, result: Dict) -> None:
+        """Make result the family's latest, then log, record and export the new report"""
+        with self._lock:
+            previous = self.family_results.get(family)
+            self.family_results[family] = result
+            self._compose_results()
+            self._log_critical_changes(family, previous)
+            with tracing.span('history.record'):
+                self._record_history(family)
+            with tracing.span('exporter.update'):
+                self._update_exporter()
+
+    def _fail_check(self, family: str, message: str) -> None:
+        """Score a check that crashed or timed out (a late real result replaces this)"""
+        print(f"Warning: {message}", flush=True)
+        self._merge_result(family, failure_result(
+            'Health checker', message, self.config.get('checks', {}).get('failure_penalty', 5), severity='medium'
+        ))
+
+    def run_checks(self, families: Optional[List[str]] = None) -> Dict[str, str]:
+        """Run the given families (default: every enabled one) concurrently
+
+        Each family is limited to its timeout and the whole run to
+        checks.budget. Disabled families are skipped. Returns each family's
+        outcome ('ok', 'failed', 'timeout' or 'busy').
+        """
+        enabled = self.checks.enabled(self.config)
+        names = enabled if families is None else [family for family in families if family in enabled]
+        shared = self._shared_snapshot(self.plan.container_names)
+
+        def run_family(family):
+            # Families of this run share one container listing
+            self._local.containers = shared
+            try:
+                self.run_check_family(family)
+            finally:
+                self._local.containers = None
+
+        return self.checks.run(
+            names, run_family, self._fail_check,
+            timeout_for=self._check_timeout,
+            budget=self.config.get('checks', {}).get('budget')
+        )
+
+    def remediate(self, wait: Optional[float] = None) -> None:
+        """Start the actions the current issues call for, and report the actions that finished
+
+        wait is how long to wait for the started actions (one-shot runs);
+        the daemon reports them after a later check instead.
+        """
+        if self.remediation is None:
+            return
+
+        services = self.config['remediation'].get('services', {})
+        problems = {}
+        for issue in self.issues:
+            kind = issue.get('kind')
+            if kind is None:
+                continue
+            if kind == 'endpoint_timeout':
+                # Only endpoints mapped to the container that serves them can be restarted
+                action_target = services.get(issue['target'])
+            elif kind == 'disk_pressure':
+                action_target = '*'
+            else:
+                action_target = issue['target']
+            problems[(kind, issue['target'])] = action_target
+
+        with tracing.span('remediation', problems=len(problems)):
+            self.remediation.process(problems)
+            if wait:
+                self.remediation.wait(wait)
+        self._report_remediation()
+
+    def _report_remediation(self) -> None:
+        """Log finished remediation events and feed recovery times to the exporter"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for event in self.remediation.drain():
+            print(f"{timestamp}: REMEDIATION {self._describe_remediation(event)}", flush=True)
+            if event['outcome'] == 'recovered' and self.exporter is not None:
+                self.exporter.observe_recovery(event['action'], event['recovery_seconds'])
+
+    def _record_trace(self, name: str, span) -> None:
+        """Keep a finished top-level trace and rewrite the run report (when tracing)"""
+        if not tracing.enabled() or span is tracing.NULL_SPAN:
+            return
+        with self._lock:
+            self.traces[name] = span.to_dict()
+
+            path = self.config.get('tracing', {}).get('report_path')
+            if not path:
+                return
+            try:
+                write_json(path, self.run_report(), indent=2)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Warning: Could not write run report: {e}")
+
+    def run_report(self) -> Dict:
+        """JSON-serializable report of the latest trace of each check family and the heartbeat"""
+        return {
+            'generated_at': time.time(),
+            'score': max(0, min(100, self.score)),
+            'issues': len(self.issues),
+            'traces': self.traces,
+        }
+
+    def _update_exporter(self) -> None:
+        """Render a new /metrics snapshot, including per-host scores of the fleet"""
+        if self.exporter is None:
+            return
+        hosts = None
+        if self.fleet is not None:
+            hosts = {self.fleet.local_name: max(0, min(100, self.score))}
+            hosts.update({host['name']: host['score'] for host in self.fleet.summaries() if host['checked']})
+        remediation = self.remediation.summary() if self.remediation is not None else None
+        self.exporter.update(self.score, self.family_results, hosts=hosts, remediation=remediation)
+
+    def _record_history(self, family: str) -> None:
+        """Store the family's numeric details and the current score"""
+        if self.history is None:
+            return
+
+        values = {
+            key: value for key, value in self.family_results[family]['details'].items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        }
+        values['score'] = max(0, min(100, self.score))
+        try:
+            self.history.record(values)
+        except Exception as e:
+            print(f"Warning: Could not record metrics history: {e}")
+
+    def _compose_results(self) -> None:
+        """Rebuild score, issues and details from the latest result of each family"""
+        self.score = 100
+        self.issues = []
+        self.details = {}
+        for family in self.checks.names():
+            result = self.family_results.get(family)
+            if result is None:
+                continue
+            self.score -= result['penalty']
+            self.issues.extend(result['issues'])
+            self.details.update(result['details'])
+
+    def _log_critical_changes(self, family: str, previous) -> None:
+        """Print critical issues that appeared or cleared since the family last ran"""
+        def critical_components(result):
+            if not result:
+                return set()
+            return {i['component'] for i in result['issues'] if i['severity'] == 'critical'}
+
+        before = critical_components(previous)
+        current = self.family_results.get(family)
+        after = critical_components(current)
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        host = f"[{self.host_name}] " if self.host_name else ""
+
+        for issue in current['issues'] if current else []:
+            if issue['severity'] == 'critical' and issue['component'] not in before:
+                print(f"{timestamp}: CRITICAL {host}{issue['component']}: {issue['issue']}", flush=True)
+        for component in sorted(before - after):
+            print(f"{timestamp}: RECOVERED {host}{component}", flush=True)
+
+    def scheduled_heartbeat(self) -> None:
+        """Daemon heartbeat job; in on-change mode notify() sends the heartbeat when it is due"""
+        if not self.notify_on_change:
+            self.send_heartbeat()
+
+    def send_heartbeat(self, message: Optional[str] = None) -> None:
+        """Send the periodic report built from the latest family results"""
+        with tracing.span('heartbeat') as span:
+            if message is None:
+                with tracing.span('format'):
+                    message = self.format_message()
+            with tracing.span('ntfy.send'):
+                sent = self.send_notification(message)
+        self._record_trace('heartbeat', span)
+        # The full report covers every change so far, so it is also the new baseline
+        if sent:
+            self._save_notify_state(heartbeat=True)
 
     def run_health_check(self) -> int:
         """Run complete health check and return final score"""
         print("Starting infrastructure health check...")
 
         try:
-            print("Checking containers...")
-            self.check_containers()
-
-            print("Checking system resources...")
-            self.check_system_resources()
-
-            print("Checking service responses...")
-            self.check_service_responses()
+            # Every enabled check starts at once; a crash or timeout is scored, not fatal
+            for family in self.checks.enabled(self.config):
+                print(self.checks.specs[family].label)
+            self.run_checks()
+            self.remediate(wait=self.config.get('remediation', {}).get('wait', 60))
 
+            self._close_baselines()
             final_score = max(0, min(100, self.score))
             print(f"\nHealth check complete. Score: {final_score}/100")
             print(f"Issues found: {len(self.issues)}")
@@ -397,24 +1837,154 @@ class HealthChecker:
             print(f"Error during health check: {e}")
             raise
 
+def run_daemon(checker: HealthChecker) -> None:
+    """Run every check family on its own interval until SIGTERM/SIGINT"""
+    import signal
+
+    specs = checker.checks.specs
+    intervals = {
+        **{family: spec.interval for family, spec in specs.items()},
+        'heartbeat': DEFAULT_INTERVALS['heartbeat'],
+        **checker.config.get('daemon', {}).get('intervals', {}),
+    }
+    scheduler = Scheduler()
+
+    def run_family(family):
+        # A disabled family is skipped until a config reload enables it
+        checker.run_checks([family])
+        checker.remediate()
+        # In on-change mode, publish as soon as a check changes the state
+        checker.notify()
+
+    # Registration order matters: every family runs once before the first heartbeat
+    for family in specs:
+        scheduler.add_job(family, intervals[family], lambda f=family: run_family(f))
+    scheduler.add_job('heartbeat', intervals['heartbeat'], checker.scheduled_heartbeat)
+    if checker.plan_watcher is not None:
+        config_poll = checker.config.get('daemon', {}).get('config_poll', 5)
+        scheduler.add_job('config', config_poll, checker.reload_config, delay=config_poll)
+
+    def handle_signal(signum, frame):
+        print(f"Received signal {signum}, shutting down...", flush=True)
+        scheduler.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    checker.start_exporter()
+
+    # Catch up on events missed while stopped, then follow the stream
+    if checker.event_subscriber is not None:
+        checker._sync_container_events()
+        checker.event_subscriber.start()
+
+    schedule = ', '.join(f"{name}={interval}s" for name, interval in intervals.items())
+    print(f"Health checker daemon started ({schedule})", flush=True)
+    try:
+        scheduler.run()
+    finally:
+        if checker.event_subscriber is not None:
+            checker.event_subscriber.stop()
+            try:
+                checker.event_index.save()
+            except OSError as e:
+                print(f"Warning: Could not save container events: {e}")
+        if checker.exporter is not None:
+            checker.exporter.stop()
+        if checker.fleet is not None:
+            checker.fleet.stop()
+        checker._close_remediation()
+        checker._close_baselines()
+
+def run_profiled(checker: HealthChecker, mode: str, output: Optional[str] = None) -> int:
+    """Run one health check under a profiler, write its output and print the hottest functions"""
+    if mode == 'sample':
+        profiler = tracing.SamplingProfiler()
+        profiler.start()
+        try:
+            score = checker.run_health_check()
+        finally:
+            profiler.stop()
+        output = output or 'health_check.folded'
+        profiler.write(output)
+        print(f"\nSampled {profiler.samples} times; hottest frames (all threads, wall clock):")
+        for frame, samples in profiler.top():
+            print(f"{samples:8d}  {frame}")
+        print(f"Collapsed stacks written to {output} (flamegraph.pl or speedscope)")
+        return score
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        score = checker.run_health_check()
+    finally:
+        profiler.disable()
+    output = output or 'health_check.prof'
+    profiler.dump_stats(output)
+    print("\nTop functions by cumulative time (main thread; checks run on their own threads, so use "
+          "--profile sample to see them):")
+    pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+    print(f"Profile written to {output} (python -m pstats {output})")
+    return score
+
 def main():
     """Main entry point"""
     import argparse
 
     parser = argparse.ArgumentParser(description='Infrastructure Health Checker')
     parser.add_argument('--config', default='config.yml', help='Path to config file')
-    parser.add_argument('--dry-run', action='store_true', help='Run checks but do not send notification')
+    parser.add_argument('--dry-run', action='store_true', help='Run checks but do not send notification or take remediation actions')
     parser.add_argument('--verbose', action='store_true', help='Verbose output')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Run continuously, each check family on its own interval')
+    parser.add_argument('--trace', action='store_true',
+                        help='Time every check and sub-step, print the timings and write the run report')
+    parser.add_argument('--profile', nargs='?', const='cprofile', choices=['cprofile', 'sample'],
+                        help='Profile one check run: cprofile (main thread, exact) or sample (all threads)')
+    parser.add_argument('--profile-output', help='Profile file (default: health_check.prof or health_check.folded)')
+    parser.add_argument('--format', choices=['text', 'json'], default='text',
+                        help='Output: text (formatted message with --verbose/--dry-run) or json (structured report)')
 
     args = parser.parse_args()
+    if args.profile and args.daemon:
+        parser.error('--profile profiles a single run and cannot be combined with --daemon')
+
+    # With --format json, stdout carries only the report; progress and warnings go to stderr
+    output = sys.stdout
+    if args.format == 'json' and not args.daemon:
+        sys.stdout = sys.stderr
 
     try:
-        checker = HealthChecker(config_path=args.config)
-        score = checker.run_health_check()
+        checker = HealthChecker(config_path=args.config, trace=args.trace)
+        if args.dry_run and checker.remediation is not None:
+            # A dry run changes nothing: remediation only reports what it would do
+            checker.remediation.dry_run = True
+
+        if args.daemon:
+            run_daemon(checker)
+            sys.exit(0)
+
+        if args.profile:
+            score = run_profiled(checker, args.profile, args.profile_output)
+        else:
+            score = checker.run_health_check()
+
+        if args.trace:
+            import re
+            print(re.sub('<[^<]+?>', '', checker.format_timings()))
+            report_path = checker.config.get('tracing', {}).get('report_path')
+            if report_path:
+                print(f"Run report written to {report_path}")
 
         message = checker.format_message()
 
-        if args.verbose or args.dry_run:
+        if args.format == 'json':
+            output.write(json.dumps(checker.build_report(), indent=2, default=str) + "\n")
+            output.flush()
+        elif args.verbose or args.dry_run:
             print("\n" + "="*50)
             print("FORMATTED MESSAGE:")
             print("="*50)
@@ -424,10 +1994,14 @@ def main():
             print(clean_message)
             print("="*50)
 
-        if not args.dry_run:
-            checker.send_notification(message)
-        else:
+        if args.dry_run:
             print("\nDry run - notification not sent")
+        elif checker.notify_on_change:
+            # Frequent runs (e.g. from cron) publish only changes and the due heartbeat
+            if not checker.notify():
+                print("No change since the last notification, nothing sent")
+        else:
+            checker.send_heartbeat(message)
 
         # Exit with status based on score
         if score >= 75:
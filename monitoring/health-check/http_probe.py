@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+HTTP Endpoint Probes
+Concurrent service probes over a shared keep-alive connection pool
+
+Each probe records connect time (0 when a pooled connection is reused),
+time to first byte and total time separately.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import tracing
+
+# Connect timings are recorded per worker thread; a probe runs entirely on one thread
+_probe_timing = threading.local()
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _probe_timing.connect = time.perf_counter() - start
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _probe_timing.connect = time.perf_counter() - start
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections report how long connecting took"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+def create_session(pool_size: int = 10) -> requests.Session:
+    """Create a keep-alive session with connect timing on every pooled connection"""
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def probe_endpoint(session: requests.Session, endpoint, timeout: float) -> Dict:
+    """Probe a single endpoint (name, url and method attributes) and return its timings
+
+    Result keys: name, status ('ok', 'timeout', 'error'), status_code,
+    connect, ttfb, total (seconds) and error.
+    """
+    result = {
+        'name': endpoint.name,
+        'status': 'ok',
+        'status_code': None,
+        'connect': None,
+        'ttfb': None,
+        'total': None,
+        'error': None,
+    }
+
+    _probe_timing.connect = 0.0
+    start = time.perf_counter()
+    try:
+        response = session.request(
+            endpoint.method,
+            endpoint.url,
+            timeout=timeout,
+            stream=True
+        )
+        result['ttfb'] = time.perf_counter() - start
+        try:
+            response.content
+        finally:
+            response.close()
+        result['total'] = time.perf_counter() - start
+        result['connect'] = _probe_timing.connect
+        result['status_code'] = response.status_code
+    except requests.exceptions.Timeout as e:
+        result['status'] = 'timeout'
+        result['error'] = str(e)
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+
+    return result
+
+
+def probe_endpoints(session: requests.Session, endpoints: Sequence, timeout: float,
+                    deadline: float, max_concurrency: int = 8) -> List[Dict]:
+    """Probe endpoints concurrently and return results in endpoint order
+
+    Probes still running when the deadline expires are reported as timeouts.
+    """
+    if not endpoints:
+        return []
+
+    parent = tracing.current()
+
+    def run(endpoint) -> Dict:
+        with tracing.span('http.probe', parent=parent, endpoint=endpoint.name) as span:
+            result = probe_endpoint(session, endpoint, timeout)
+            span.set(status=result['status'], status_code=result['status_code'])
+            return result
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(endpoints))))
+    futures = [executor.submit(run, endpoint) for endpoint in endpoints]
+    try:
+        wait(futures, timeout=deadline)
+    finally:
+        # Do not block the report on stragglers; their own timeouts will end them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    for endpoint, future in zip(endpoints, futures):
+        if future.done() and not future.cancelled():
+            results.append(future.result())
+        else:
+            results.append({
+                'name': endpoint.name,
+                'status': 'timeout',
+                'status_code': None,
+                'connect': None,
+                'ttfb': None,
+                'total': None,
+                'error': f"Deadline of {deadline}s exceeded",
+            })
+    return results
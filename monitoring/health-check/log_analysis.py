@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Log Error Rates
+Counts error lines per container from Loki with one batched LogQL query
+
+A single metric query grouped by container and priority replaces one query
+per container, and results are cached for a short TTL so several consumers
+in the same cycle share one Loki round trip.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+
+def build_error_query(selector: str, pattern: str, window: int) -> str:
+    """LogQL counting lines that match pattern, per container and priority, over window seconds"""
+    # Backticks keep the regex raw, so patterns need no LogQL string escaping
+    return (f"sum by (container, priority) "
+            f"(count_over_time({selector} |~ `{pattern}` [{int(window)}s]))")
+
+
+class LokiErrorRates:
+    """TTL-cached error counts per container from a Loki instant query"""
+
+    def __init__(self, session: requests.Session, url: str, selector: str = '{job="docker"}',
+                 pattern: str = '(?i)(error|panic|fatal)', window: int = 300, ttl: float = 60.0,
+                 timeout: float = 5.0):
+        self.session = session
+        self.url = url.rstrip('/')
+        self.query = build_error_query(selector, pattern, window)
+        self.window = window
+        self.ttl = ttl
+        self.timeout = timeout
+        self.queries = 0
+        self._cached: Optional[Dict[str, Dict]] = None
+        self._cached_at = 0.0
+        self._lock = threading.Lock()
+
+    def fetch(self) -> Dict[str, Dict]:
+        """Error counts keyed by container: {'priority', 'errors', 'per_minute'}
+
+        Served from the cache while it is younger than ttl seconds; raises
+        requests.RequestException or ValueError when Loki cannot answer.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._cached is not None and now - self._cached_at < self.ttl:
+                return self._cached
+
+            self.queries += 1
+            response = self.session.get(
+                f"{self.url}/loki/api/v1/query",
+                params={'query': self.query},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json().get('data', {})
+            if data.get('resultType') != 'vector':
+                raise ValueError(f"Unexpected Loki result type: {data.get('resultType')}")
+
+            rates = {}
+            for sample in data.get('result', []):
+                labels = sample.get('metric', {})
+                container = labels.get('container')
+                if not container:
+                    continue
+                errors = float(sample['value'][1])
+                rates[container] = {
+                    'priority': labels.get('priority') or 'default',
+                    'errors': errors,
+                    'per_minute': errors / (self.window / 60.0),
+                }
+
+            self._cached = rates
+            self._cached_at = time.monotonic()
+            return rates
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Metrics History Store
+Compact SQLite (WAL) time-series store for samples and health scores
+
+Raw samples are kept for raw_retention seconds, then downsampled into
+fixed-width rollup buckets (count/min/avg/p95/max) that are kept for
+retention seconds. Memory use is bounded by SQLite's page cache, and each
+record() is a single short transaction so a sample every few seconds
+costs well under a millisecond of commit time.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    ts REAL NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_metric_ts ON samples (metric, ts);
+CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    metric TEXT NOT NULL,
+    ts REAL NOT NULL,
+    count INTEGER NOT NULL,
+    min REAL NOT NULL,
+    avg REAL NOT NULL,
+    p95 REAL NOT NULL,
+    max REAL NOT NULL,
+    PRIMARY KEY (metric, ts)
+) WITHOUT ROWID;
+"""
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(values)))
+    return values[rank - 1]
+
+
+def rollup_buckets(rows: Iterable[Tuple[str, float, float]], interval: float) -> Iterator[Tuple]:
+    """Rollup rows (metric, bucket, count, min, avg, p95, max) from (metric, ts, value) rows
+
+    rows must be ordered by metric, then ts; each bucket is emitted as soon
+    as the next one starts.
+    """
+    key, values = None, []
+    for metric, ts, value in rows:
+        bucket = (metric, math.floor(ts / interval) * interval)
+        if bucket != key:
+            if values:
+                yield rollup(key, values)
+            key, values = bucket, []
+        values.append(value)
+    if values:
+        yield rollup(key, values)
+
+
+def rollup(key: Tuple[str, float], values: List[float]) -> Tuple:
+    values.sort()
+    return (*key, len(values), values[0], sum(values) / len(values), percentile(values, 95), values[-1])
+
+
+def weighted_percentile(points: List[Tuple[float, int]], pct: float) -> float:
+    """Nearest-rank percentile of (value, weight) pairs"""
+    points = sorted(points)
+    total = sum(weight for _, weight in points)
+    if total == 0:
+        return 0.0
+    target = pct / 100.0 * total
+    running = 0
+    for value, weight in points:
+        running += weight
+        if running >= target:
+            return value
+    return points[-1][0]
+
+
+class MetricsStore:
+    """Append-mostly metric history with downsampling and retention"""
+
+    def __init__(self, path: str, retention: float = 7 * 86400, raw_retention: float = 86400,
+                 rollup_interval: float = 300, maintenance_interval: float = 600):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.retention = retention
+        self.raw_retention = raw_retention
+        self.rollup_interval = rollup_interval
+        self.maintenance_interval = maintenance_interval
+        self._last_maintenance = 0.0
+        self._lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA cache_size=-2048")  # KiB - bounds page cache memory
+        self.conn.execute("PRAGMA wal_autocheckpoint=1000")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    def record(self, values: Dict[str, float], ts: Optional[float] = None) -> None:
+        """Store one sample per metric at the same timestamp"""
+        ts = time.time() if ts is None else ts
+        rows = [(ts, metric, float(value)) for metric, value in values.items() if value is not None]
+        if not rows:
+            return
+
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany("INSERT INTO samples (ts, metric, value) VALUES (?, ?, ?)", rows)
+            self.conn.execute("COMMIT")
+
+        if ts - self._last_maintenance >= self.maintenance_interval:
+            self.maintain(now=ts)
+
+    def maintain(self, now: Optional[float] = None) -> None:
+        """Downsample raw samples past raw_retention and evict data past retention"""
+        now = time.time() if now is None else now
+        # Only roll up complete buckets so a bucket is never written twice
+        raw_cutoff = math.floor((now - self.raw_retention) / self.rollup_interval) * self.rollup_interval
+
+        with self._lock:
+            self.conn.execute("BEGIN")
+            # The (metric, ts) index returns samples bucket by bucket, so only one
+            # bucket's values are in memory however large the backlog is
+            rows = self.conn.execute(
+                "SELECT metric, ts, value FROM samples WHERE ts < ? ORDER BY metric, ts",
+                (raw_cutoff,)
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO rollups (metric, ts, count, min, avg, p95, max) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rollup_buckets(rows, self.rollup_interval)
+            )
+            self.conn.execute("DELETE FROM samples WHERE ts < ?", (raw_cutoff,))
+            self.conn.execute("DELETE FROM rollups WHERE ts < ?", (now - self.retention,))
+            self.conn.execute("COMMIT")
+            self._last_maintenance = now
+
+    def series(self, metric: str, since: float) -> List[Tuple[float, float]]:
+        """Raw (ts, value) points for a metric since a timestamp, oldest first"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT ts, value FROM samples WHERE metric = ? AND ts >= ? ORDER BY ts",
+                (metric, since)
+            ).fetchall()
+
+    def summarize(self, metric: str, since: float) -> Optional[Dict[str, float]]:
+        """min/avg/p95/max for a metric since a timestamp
+
+        Periods older than raw_retention come from rollups; their p95 is
+        approximated from the per-bucket p95 values weighted by sample count.
+        """
+        with self._lock:
+            raw = [row[0] for row in self.conn.execute(
+                "SELECT value FROM samples WHERE metric = ? AND ts >= ? ORDER BY value",
+                (metric, since)
+            )]
+            rolled = self.conn.execute(
+                "SELECT count, min, avg, p95, max FROM rollups WHERE metric = ? AND ts >= ?",
+                (metric, since)
+            ).fetchall()
+
+        count = len(raw) + sum(r[0] for r in rolled)
+        if count == 0:
+            return None
+
+        if rolled:
+            points = [(v, 1) for v in raw] + [(r[3], r[0]) for r in rolled]
+            p95 = weighted_percentile(points, 95)
+        else:
+            p95 = percentile(raw, 95)
+
+        return {
+            'count': count,
+            'min': min([r[1] for r in rolled] + raw[:1]),
+            'avg': (sum(raw) + sum(r[0] * r[2] for r in rolled)) / count,
+            'p95': p95,
+            'max': max([r[4] for r in rolled] + raw[-1:]),
+        }
+
+    def time_in_buckets(self, metric: str, since: float, classify, max_gap: float = 300,
+                        now: Optional[float] = None) -> Dict[str, float]:
+        """Seconds spent in each bucket returned by classify(value)
+
+        Each sample holds until the next one, capped at max_gap so periods
+        when nothing was recording are not attributed to any bucket.
+        """
+        now = time.time() if now is None else now
+        points = self.series(metric, since)
+        durations: Dict[str, float] = {}
+        for i, (ts, value) in enumerate(points):
+            next_ts = points[i + 1][0] if i + 1 < len(points) else now
+            bucket = classify(value)
+            durations[bucket] = durations.get(bucket, 0.0) + min(max(0.0, next_ts - ts), max_gap)
+        return durations
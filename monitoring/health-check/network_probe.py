@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Network Reachability Probes
+Concurrent TCP-connect, DNS and ICMP probes with one deadline for the whole run
+
+Every probe of every target is its own task on its own thread, so a run over
+many targets takes about one probe timeout however many of them are
+unreachable. Several probes per target give packet loss and RTT percentiles
+rather than a single sample.
+"""
+
+import itertools
+import os
+import random
+import socket
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+import tracing
+from metrics_store import percentile
+
+DNS_TYPES = {'A': 1, 'AAAA': 28, 'NS': 2, 'MX': 15, 'TXT': 16}
+DNS_RCODES = {1: 'FORMERR', 2: 'SERVFAIL', 3: 'NXDOMAIN', 4: 'NOTIMP', 5: 'REFUSED'}
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+# Echo identifiers for raw sockets, which see every ICMP reply on the host
+_icmp_ids = itertools.count(os.getpid() & 0xffff)
+
+
+class ProbeError(Exception):
+    """A probe that got an answer, but not a healthy one (refused, SERVFAIL, ...)"""
+
+
+class ProbeUnsupported(Exception):
+    """A probe type this process cannot send (ICMP without CAP_NET_RAW or ping_group_range)"""
+
+
+class ProbeSkipped(Exception):
+    """A probe that never started before the deadline (neither sent nor lost)"""
+
+
+def probe_tcp(host: str, port: int, timeout: float) -> float:
+    """Seconds to complete a TCP handshake (name resolution is not timed)"""
+    family, kind, proto, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+    with socket.socket(family, kind, proto) as sock:
+        sock.settimeout(timeout)
+        start = time.perf_counter()
+        sock.connect(address)
+        return time.perf_counter() - start
+
+
+def build_dns_query(query_id: int, name: str, qtype: int = 1) -> bytes:
+    """A recursive DNS query for one name (RFC 1035 wire format)"""
+    question = b''.join(
+        bytes([len(label)]) + label.encode('idna') for label in name.rstrip('.').split('.')
+    ) + b'\x00'
+    return struct.pack('!HHHHHH', query_id, 0x0100, 1, 0, 0, 0) + question + struct.pack('!HH', qtype, 1)
+
+
+def probe_dns(name: str, timeout: float, server: Optional[str] = None, port: int = 53,
+              qtype: str = 'A') -> float:
+    """Seconds for a DNS server to answer a query for name
+
+    With a server, one UDP query is sent to it directly, so the answer is
+    bounded by timeout and measures that server alone. Without one the
+    system resolver is used, which has its own timeouts; the run deadline
+    still bounds it.
+    """
+    if server is None:
+        start = time.perf_counter()
+        try:
+            socket.getaddrinfo(name, None)
+        except socket.gaierror as e:
+            raise ProbeError(f"Resolution failed: {e}")
+        return time.perf_counter() - start
+
+    query_id = random.getrandbits(16)
+    family, kind, proto, _, address = socket.getaddrinfo(server, port, type=socket.SOCK_DGRAM)[0]
+    with socket.socket(family, kind, proto) as sock:
+        start = time.perf_counter()
+        sock.sendto(build_dns_query(query_id, name, DNS_TYPES.get(qtype, 1)), address)
+        while True:
+            remaining = timeout - (time.perf_counter() - start)
+            if remaining <= 0:
+                raise socket.timeout("DNS query timed out")
+            sock.settimeout(remaining)
+            data, _ = sock.recvfrom(4096)
+            if len(data) < 12:
+                continue
+            reply_id, flags = struct.unpack('!HH', data[:4])
+            # Ignore stray datagrams and anything that is not a response to this query
+            if reply_id != query_id or not flags & 0x8000:
+                continue
+            rtt = time.perf_counter() - start
+            rcode = flags & 0x000f
+            if rcode:
+                raise ProbeError(f"DNS {DNS_RCODES.get(rcode, f'rcode {rcode}')} for {name}")
+            return rtt
+
+
+def icmp_checksum(data: bytes) -> int:
+    """Internet checksum (RFC 1071)"""
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def _icmp_socket():
+    """Unprivileged ping socket if the kernel allows it, else a raw socket
+
+    Returns (socket, raw). Raw replies carry the IP header and every echo
+    reply on the host; ping sockets get only their own, without the header.
+    """
+    try:
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP), False
+    except PermissionError:
+        pass
+    try:
+        return socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP), True
+    except PermissionError:
+        raise ProbeUnsupported("ICMP needs CAP_NET_RAW or net.ipv4.ping_group_range")
+
+
+def probe_icmp(host: str, timeout: float, sequence: int = 1) -> float:
+    """Seconds for an ICMP echo request to be answered (IPv4)"""
+    address = socket.gethostbyname(host)
+    ident = next(_icmp_ids) & 0xffff
+    payload = struct.pack('!d', time.time()) + b'healthcheck'
+    header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, ident, sequence)
+    packet = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, icmp_checksum(header + payload),
+                         ident, sequence) + payload
+
+    sock, raw = _icmp_socket()
+    with sock:
+        start = time.perf_counter()
+        sock.sendto(packet, (address, 0))
+        while True:
+            remaining = timeout - (time.perf_counter() - start)
+            if remaining <= 0:
+                raise socket.timeout("ICMP echo timed out")
+            sock.settimeout(remaining)
+            data, (source, _) = sock.recvfrom(1024)
+            if raw:
+                data = data[(data[0] & 0x0f) * 4:]
+            if len(data) < 8 or source != address:
+                continue
+            kind, _, _, reply_ident, reply_sequence = struct.unpack('!BBHHH', data[:8])
+            # Ping sockets rewrite the identifier, so it only identifies raw replies
+            if kind == ICMP_ECHO_REPLY and reply_sequence == sequence and (not raw or reply_ident == ident):
+                return time.perf_counter() - start
+
+
+def probe_once(target: Dict, timeout: float, sequence: int) -> float:
+    """Send one probe of the target's type and return its RTT in seconds"""
+    kind = target.get('type', 'tcp')
+    if kind == 'tcp':
+        return probe_tcp(target['host'], int(target['port']), timeout)
+    if kind == 'dns':
+        return probe_dns(target['query'], timeout, server=target.get('server'),
+                         port=int(target.get('port', 53)), qtype=target.get('record', 'A'))
+    if kind == 'icmp':
+        return probe_icmp(target['host'], timeout, sequence)
+    raise ValueError(f"Unknown probe type: {kind}")
+
+
+def summarize_probes(target: Dict, outcomes: List) -> Dict:
+    """Loss and RTT percentiles (seconds) for one target from its probe outcomes
+
+    Each outcome is an RTT or the exception that ended the probe. Status is
+    'ok' with no loss, 'degraded' with some, 'down' with all probes lost,
+    'unsupported' when the probe type cannot be sent at all and 'skipped'
+    when no probe started before the deadline. Skipped probes are not counted
+    as sent, so they never count as loss.
+    """
+    skipped = [outcome for outcome in outcomes if isinstance(outcome, ProbeSkipped)]
+    outcomes = [outcome for outcome in outcomes if not isinstance(outcome, ProbeSkipped)]
+    rtts = sorted(outcome for outcome in outcomes if isinstance(outcome, float))
+    errors = [outcome for outcome in outcomes if not isinstance(outcome, float)]
+    sent = len(outcomes)
+
+    result = {
+        'name': target['name'],
+        'type': target.get('type', 'tcp'),
+        'sent': sent,
+        'received': len(rtts),
+        'loss_percent': 100.0 * (sent - len(rtts)) / sent if sent else 0.0,
+        'rtt_min': rtts[0] if rtts else None,
+        'rtt_p50': percentile(rtts, 50) if rtts else None,
+        'rtt_p95': percentile(rtts, 95) if rtts else None,
+        'rtt_max': rtts[-1] if rtts else None,
+        'error': str(errors[-1]) if errors else str(skipped[-1]) if skipped and not rtts else None,
+    }
+
+    if not sent:
+        result['status'] = 'skipped'
+    elif errors and all(isinstance(error, ProbeUnsupported) for error in errors):
+        result['status'] = 'unsupported'
+    elif not rtts:
+        result['status'] = 'down'
+    elif errors:
+        result['status'] = 'degraded'
+    else:
+        result['status'] = 'ok'
+    return result
+
+
+def probe_targets(targets: List[Dict], count: int = 3, timeout: float = 1.0, deadline: Optional[float] = None,
+                  interval: float = 0.05, max_concurrency: Optional[int] = None) -> List[Dict]:
+    """Probe every target count times, concurrently, and summarize in target order
+
+    Probes of one target start interval seconds apart so they sample the path
+    independently. Each probe gets its own thread, so probes of unreachable
+    targets never hold up the others; max_concurrency caps the threads where
+    that is too many. Probes still running when the deadline expires count as
+    lost, probes that never started (capped, or delayed past the deadline) as
+    skipped.
+    """
+    if not targets:
+        return []
+
+    if deadline is None:
+        deadline = timeout + interval * count + 0.5
+    ends_at = time.monotonic() + deadline
+    parent = tracing.current()
+
+    tasks = [(target, attempt) for target in targets for attempt in range(count)]
+    # Set once a probe is actually sent; unfinished probes that were not are skipped, not lost
+    started = [False] * len(tasks)
+
+    def run(index: int, target: Dict, attempt: int) -> float:
+        time.sleep(attempt * interval)
+        probe_timeout = min(timeout, ends_at - time.monotonic())
+        if probe_timeout <= 0:
+            raise ProbeSkipped(f"Deadline of {deadline}s exceeded before the probe started")
+        started[index] = True
+        with tracing.span('network.probe', parent=parent, target=target['name'], attempt=attempt + 1):
+            return probe_once(target, probe_timeout, attempt + 1)
+
+    workers = len(tasks) if max_concurrency is None else max(1, min(max_concurrency, len(tasks)))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = [executor.submit(run, index, target, attempt) for index, (target, attempt) in enumerate(tasks)]
+    try:
+        wait(futures, timeout=max(0.0, ends_at - time.monotonic()))
+    finally:
+        # Do not block the report on stragglers; their own timeouts will end them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    outcomes: Dict[int, List] = {}
+    for index, ((target, _), future) in enumerate(zip(tasks, futures)):
+        if future.cancelled() or (not future.done() and not started[index]):
+            outcome = ProbeSkipped(f"Deadline of {deadline}s exceeded before the probe started")
+        elif not future.done():
+            outcome = socket.timeout(f"Deadline of {deadline}s exceeded")
+        elif future.exception() is not None:
+            outcome = future.exception()
+        else:
+            outcome = future.result()
+        outcomes.setdefault(id(target), []).append(outcome)
+
+    return [summarize_probes(target, outcomes[id(target)]) for target in targets]
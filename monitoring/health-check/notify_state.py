@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Notification State
+Remembers what the last notification reported, to publish only on change
+
+The state is a set of issue keys plus the score range, hashed into one
+fingerprint and persisted as a small JSON file. An issue key ignores the
+numbers in the issue text, so "High CPU usage (85.2%)" and "(91.0%)" are
+the same issue, while a new component, a different problem or a change of
+severity is a new one. Comparing against the last *notified* state (not the
+last check) means a problem that flaps back within the cooldown is never sent.
+"""
+
+import hashlib
+import re
+import time
+from typing import Dict, Iterable, List, Optional
+
+from state_file import LOAD_ERRORS, read_json, write_json
+
+_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+
+
+def issue_key(issue: Dict, host: Optional[str] = None) -> str:
+    """Stable identity of an issue across runs: host, component, severity and wording"""
+    wording = _NUMBER.sub('#', issue['issue'])
+    prefix = f"[{host}] " if host else ""
+    return f"{prefix}{issue['component']}|{issue['severity']}|{wording}"
+
+
+def fingerprint(range_name: str, keys: Iterable[str]) -> str:
+    """Hash of a score range and a set of issue keys"""
+    digest = hashlib.sha256(range_name.encode('utf-8'))
+    for key in sorted(keys):
+        digest.update(b'\0' + key.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class NotificationState:
+    """Last notified score range and issues, persisted between runs"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.range_name: Optional[str] = None
+        self.issues: Dict[str, Dict] = {}
+        self.notified_at = 0.0
+        self.heartbeat_at = 0.0
+
+    @property
+    def fingerprint(self) -> Optional[str]:
+        if self.range_name is None:
+            return None
+        return fingerprint(self.range_name, self.issues)
+
+    def load(self) -> None:
+        """Load the persisted state, ignoring a missing or unreadable file"""
+        try:
+            state = read_json(self.path)
+        except LOAD_ERRORS as e:
+            print(f"Warning: Could not load notification state from {self.path}: {e}")
+            return
+        if state is None:
+            return
+
+        self.range_name = state.get('range')
+        self.issues = state.get('issues', {})
+        self.notified_at = state.get('notified_at', 0.0)
+        self.heartbeat_at = state.get('heartbeat_at', 0.0)
+
+    def save(self) -> None:
+        """Persist the state atomically"""
+        if not self.path:
+            return
+        state = {
+            'fingerprint': self.fingerprint,
+            'range': self.range_name,
+            'issues': self.issues,
+            'notified_at': self.notified_at,
+            'heartbeat_at': self.heartbeat_at,
+        }
+        write_json(self.path, state)
+
+    def diff(self, range_name: str, issues: Dict[str, Dict]) -> Optional[Dict]:
+        """What changed since the last notification, or None when nothing did
+
+        issues maps issue keys to issues. The first run after a fresh start
+        has no previous state, so it reports every current issue as new.
+        """
+        if self.range_name == range_name and self.issues.keys() == issues.keys():
+            return None
+        return {
+            'range_from': self.range_name,
+            'range_to': range_name,
+            'appeared': [issues[key] for key in issues if key not in self.issues],
+            'cleared': [self.issues[key] for key in self.issues if key not in issues],
+        }
+
+    def update(self, range_name: str, issues: Dict[str, Dict], heartbeat: bool = False,
+               now: Optional[float] = None) -> None:
+        """Record a sent notification (a heartbeat also restarts the heartbeat interval)"""
+        now = time.time() if now is None else now
+        self.range_name = range_name
+        # Only what the change message needs, so the file stays small
+        self.issues = {
+            key: {'component': issue['component'], 'severity': issue['severity'], 'issue': issue['issue']}
+            for key, issue in issues.items()
+        }
+        self.notified_at = now
+        if heartbeat:
+            self.heartbeat_at = now
+
+
+def current_issues(issues: List[Dict], hosts: Iterable[Dict] = ()) -> Dict[str, Dict]:
+    """Issue keys of this host's issues and of each fleet host summary's issues"""
+    keyed = {issue_key(issue): issue for issue in issues}
+    for host in hosts:
+        for issue in host['issues']:
+            keyed[issue_key(issue, host['name'])] = {**issue, 'component': f"[{host['name']}] {issue['component']}"}
+    return keyed
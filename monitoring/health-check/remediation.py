@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Auto-Remediation
+Corrective actions for the issues checks detect, with cooldowns and circuit breakers
+
+Checks tag the issues an action can fix with a kind and a target. After each
+check the engine maps them to actions:
+
+- container_down      -> restart_container (the stopped container)
+- endpoint_timeout    -> restart_container (the endpoint's container)
+- forwarder_unhealthy -> restart_container (the Telegram forwarder)
+- log_growth          -> truncate_logs (the container's json-log)
+- disk_pressure       -> truncate_logs (every json-log above the size limit)
+
+Actions run on a small thread pool, so a slow restart never holds up the
+checks. Each action target has a cooldown, and each action has a circuit
+breaker: after `failures` consecutive actions that raised or did not clear
+their issue within verify_after, the action is paused for `reset` seconds,
+then a single trial is let through. In dry-run mode the engine only says
+what it would do.
+
+An incident lasts from the first check reporting an issue to the first one
+that no longer does. For remediated incidents the time from detection to
+action and to recovery is recorded. Incidents, cooldowns and breakers are
+persisted, so one-shot runs from cron honour them as well.
+"""
+
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from check_registry import describe_error
+from state_file import LOAD_ERRORS, read_json, write_json
+
+# Issue kind -> action that fixes it
+RULES = {
+    'container_down': 'restart_container',
+    'endpoint_timeout': 'restart_container',
+    'forwarder_unhealthy': 'restart_container',
+    'log_growth': 'truncate_logs',
+    'disk_pressure': 'truncate_logs',
+}
+
+
+def restart_container(docker_api, name: str, stop_timeout: int = 10) -> str:
+    """Restart (or start) a container through the Docker API"""
+    docker_api.restart(name, timeout=stop_timeout)
+    return f"Restarted {name}"
+
+
+def truncate_logs(docker_api, names: Optional[Iterable[str]], max_bytes: int, root: str = '') -> Optional[str]:
+    """Empty the json-file logs of names (None: every running container) at or above max_bytes
+
+    Docker appends to the log with O_APPEND, so truncating in place is safe
+    while the container runs. root is prepended to LogPath when the host's
+    /var/lib/docker is mounted into this container. Returns None when no log
+    was large enough.
+    """
+    from disk_growth import format_bytes
+
+    if names is None:
+        names = [container['Id'] for container in docker_api.containers()]
+    truncated, freed = [], 0
+    for name in names:
+        attrs = docker_api.inspect_container(name)
+        if attrs['HostConfig']['LogConfig']['Type'] != 'json-file' or not attrs.get('LogPath'):
+            continue
+        path = root + attrs['LogPath']
+        size = os.stat(path).st_size
+        if size < max_bytes:
+            continue
+        os.truncate(path, 0)
+        truncated.append(attrs['Name'].lstrip('/'))
+        freed += size
+
+    if not truncated:
+        return None
+    return f"Truncated the log of {', '.join(truncated)} ({format_bytes(freed)} freed)"
+
+
+class CircuitBreaker:
+    """Pauses an action after consecutive failures; lets one trial through after reset seconds"""
+
+    __slots__ = ('threshold', 'reset', 'failures', 'opened_at')
+
+    def __init__(self, threshold: int = 3, reset: float = 3600):
+        self.threshold = threshold
+        self.reset = reset
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    def state(self, now: float) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if now - self.opened_at >= self.reset else 'open'
+
+    def record(self, success: bool, now: float) -> None:
+        if success:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        # A failed half-open trial opens the breaker for another reset period
+        if self.failures >= self.threshold:
+            self.opened_at = now
+
+
+class RemediationEngine:
+    """Incidents, the actions started for them, and what came of those actions"""
+
+    def __init__(self, actions: Dict[str, Callable[[str], Optional[str]]], state_path: Optional[str] = None,
+                 dry_run: bool = False, max_concurrency: int = 2, cooldown: float = 900, verify_after: float = 180,
+                 breaker_failures: int = 3, breaker_reset: float = 3600, history: int = 50):
+        """actions maps action names to fn(target) -> what was done, or None when nothing needed doing"""
+        self.actions = actions
+        self.state_path = state_path
+        self.dry_run = dry_run
+        self.cooldown = cooldown
+        self.verify_after = verify_after
+        self.breakers = {name: CircuitBreaker(breaker_failures, breaker_reset) for name in actions}
+        # "kind|target" -> incident; "action|target" -> time of the last action on it
+        self.incidents: Dict[str, Dict] = {}
+        self.last_action: Dict[str, float] = {}
+        # Finished actions and recoveries, newest last, for reports
+        self.records: deque = deque(maxlen=history)
+        self.counts: Counter = Counter()
+        self._events: List[Dict] = []
+        self._in_flight: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix='remediation')
+
+    def process(self, problems: Dict[Tuple[str, str], Optional[str]], now: Optional[float] = None) -> None:
+        """Track incidents and start the actions they need
+
+        problems maps (kind, target) of every current issue to the target of
+        its action (the container to restart, '*' for every log), or None
+        when there is nothing to act on.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            for key in [key for key in self.incidents if tuple(key.split('|', 1)) not in problems]:
+                self._close(self.incidents.pop(key), now)
+
+            for (kind, target), action_target in problems.items():
+                key = f"{kind}|{target}"
+                incident = self.incidents.get(key)
+                if incident is None:
+                    incident = self.incidents[key] = {'kind': kind, 'target': target, 'detected_at': now}
+                action = RULES.get(kind)
+                if action_target is None or action not in self.actions:
+                    continue
+
+                # An action that did not clear its issue in time counts against its breaker
+                if incident.get('outcome') == 'ok' and not incident.get('verified') \
+                        and now - incident['done_at'] >= self.verify_after:
+                    incident['verified'] = True
+                    self.breakers[action].record(False, now)
+                    self._record(incident, 'ineffective', now)
+                self._start(key, incident, action, action_target, now)
+            self._save()
+
+    def _start(self, key: str, incident: Dict, action: str, action_target: str, now: float) -> None:
+        """Start action on action_target unless it is running, cooling down or its breaker is open"""
+        slot = f"{action}|{action_target}"
+        if slot in self._in_flight:
+            return
+        # Wait for the outcome of this incident's last action before judging it
+        if incident.get('acted_at') is not None and (
+                incident.get('outcome') is None or (incident['outcome'] == 'ok' and not incident.get('verified'))):
+            return
+        if now - self.last_action.get(slot, 0.0) < self.cooldown:
+            return
+        state = self.breakers[action].state(now)
+        if state == 'open' or (state == 'half_open' and any(s.startswith(f"{action}|") for s in self._in_flight)):
+            return
+
+        self.last_action[slot] = now
+        if self.dry_run:
+            self.counts[(action, 'dry_run')] += 1
+            self._record({**incident, 'action': action, 'action_target': action_target}, 'dry_run', now)
+            return
+
+        incident.update(action=action, action_target=action_target, acted_at=now,
+                        outcome=None, done_at=None, verified=False)
+        self._in_flight[slot] = self._executor.submit(self._run, key, slot, action, action_target)
+
+    def _run(self, key: str, slot: str, action: str, action_target: str) -> None:
+        """Run one action (pool thread) and record its outcome"""
+        started = time.time()
+        try:
+            detail = self.actions[action](action_target)
+            outcome = 'ok' if detail is not None else 'noop'
+        except Exception as e:
+            detail, outcome = describe_error(e), 'failed'
+
+        now = time.time()
+        with self._lock:
+            self._in_flight.pop(slot, None)
+            self.counts[(action, outcome)] += 1
+            if outcome == 'failed':
+                self.breakers[action].record(False, now)
+            incident = self.incidents.get(key)
+            if incident is not None:
+                incident.update(outcome=outcome, done_at=now)
+            self._record({'kind': key.split('|', 1)[0], 'target': key.split('|', 1)[1], 'action': action,
+                          'action_target': action_target, 'detail': detail, 'seconds': now - started},
+                         outcome, now)
+
+    def _close(self, incident: Dict, now: float) -> None:
+        """An incident's issue cleared; if an action caused that, record the recovery time"""
+        if incident.get('outcome') != 'ok':
+            return
+        self.breakers[incident['action']].record(True, now)
+        self._record({**incident, 'recovery_seconds': now - incident['detected_at'],
+                      'action_seconds': incident['acted_at'] - incident['detected_at']}, 'recovered', now)
+
+    def _record(self, entry: Dict, outcome: str, now: float) -> None:
+        event = {key: entry.get(key) for key in ('kind', 'target', 'action', 'action_target', 'detail', 'seconds',
+                                                 'recovery_seconds', 'action_seconds') if entry.get(key) is not None}
+        event.update(outcome=outcome, at=now)
+        self.records.append(event)
+        self._events.append(event)
+
+    def drain(self) -> List[Dict]:
+        """Events (actions started in dry-run, finished actions, recoveries) since the last call"""
+        with self._lock:
+            events, self._events = self._events, []
+            if events:
+                self._save()
+        return events
+
+    def wait(self, timeout: float) -> None:
+        """Wait up to timeout for running actions (one-shot runs, before exiting)"""
+        with self._lock:
+            futures = list(self._in_flight.values())
+        if futures:
+            wait(futures, timeout=timeout)
+
+    def summary(self) -> Dict:
+        """Action counts by outcome and breaker states, for the exporter and the report"""
+        now = time.time()
+        with self._lock:
+            return {
+                'counts': dict(self.counts),
+                'breakers': {name: breaker.state(now) for name, breaker in self.breakers.items()},
+            }
+
+    def load(self) -> None:
+        """Load persisted incidents, cooldowns and breakers, ignoring a missing or unreadable file"""
+        try:
+            state = read_json(self.state_path)
+            if state is None:
+                return
+            self.incidents = state.get('incidents', {})
+            self.last_action = state.get('last_action', {})
+            self.records.extend(state.get('records', []))
+            for name, (failures, opened_at) in state.get('breakers', {}).items():
+                if name in self.breakers:
+                    self.breakers[name].failures, self.breakers[name].opened_at = failures, opened_at
+        except LOAD_ERRORS as e:
+            print(f"Warning: Could not load remediation state from {self.state_path}: {e}")
+            return
+        # Actions cut short by a restart are judged like any other action
+        for incident in self.incidents.values():
+            if incident.get('acted_at') is not None and incident.get('outcome') is None:
+                incident.update(outcome='failed', done_at=incident['acted_at'])
+
+    def _save(self) -> None:
+        """Persist the state atomically (caller holds the lock)"""
+        if not self.state_path:
+            return
+        now = time.time()
+        state = {
+            'incidents': self.incidents,
+            # Cooldowns that ran out no longer matter
+            'last_action': {slot: at for slot, at in self.last_action.items() if now - at < self.cooldown},
+            'breakers': {name: [b.failures, b.opened_at] for name, b in self.breakers.items()},
+            'records': list(self.records),
+        }
+        try:
+            write_json(self.state_path, state)
+        except OSError as e:
+            print(f"Warning: Could not save remediation state: {e}")
+
+    def stop(self) -> None:
+        """Stop taking actions; running ones finish on their own"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
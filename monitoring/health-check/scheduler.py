@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+In-Process Scheduler
+Runs named jobs at fixed intervals inside one long-lived process
+
+Jobs are started one at a time from the scheduler thread, but that does not
+serialize the work they do. The health checker's jobs run each check family
+on its own registry thread (HealthChecker.run_checks), and a family that
+times out keeps running while later jobs, config reloads included, go on.
+State the jobs share (Docker client, HTTP sessions, last results) must
+therefore be thread-safe or locked. A job that raises is logged and
+rescheduled; it never stops the loop.
+"""
+
+import heapq
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+
+class Job:
+    def __init__(self, name: str, interval: float, func: Callable[[], None]):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = 0.0
+
+
+class Scheduler:
+    """Fixed-interval scheduler driven by a monotonic clock"""
+
+    def __init__(self):
+        self._queue: List[Tuple[float, int, Job]] = []
+        self._sequence = 0
+        self._stop = threading.Event()
+        self.jobs = {}
+
+    def add_job(self, name: str, interval: float, func: Callable[[], None], delay: float = 0.0) -> Job:
+        """Register a job; it first runs after delay seconds, then every interval seconds"""
+        job = Job(name, interval, func)
+        self.jobs[name] = job
+        self._push(time.monotonic() + delay, job)
+        return job
+
+    def _push(self, due: float, job: Job) -> None:
+        # Sequence keeps registration order for jobs due at the same instant
+        heapq.heappush(self._queue, (due, self._sequence, job))
+        self._sequence += 1
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self) -> None:
+        """Run jobs until stop() is called"""
+        while self._queue and not self._stop.is_set():
+            due, _, job = self._queue[0]
+            wait = due - time.monotonic()
+            if wait > 0:
+                # Event.wait returns early when stop() is called
+                if self._stop.wait(wait):
+                    break
+                continue
+
+            heapq.heappop(self._queue)
+            start = time.monotonic()
+            try:
+                job.func()
+            except Exception as e:
+                job.failures += 1
+                print(f"{datetime.now():%Y-%m-%d %H:%M:%S}: Job '{job.name}' failed: {e}", flush=True)
+            finally:
+                job.runs += 1
+                job.last_duration = time.monotonic() - start
+
+            # Skip missed slots instead of running a burst to catch up
+            next_due = due + job.interval
+            now = time.monotonic()
+            if next_due <= now:
+                next_due = now + job.interval
+            self._push(next_due, job)
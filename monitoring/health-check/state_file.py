@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+State Files
+Atomic JSON persistence shared by every component that keeps state in /app/data
+
+Writers go to a uniquely named temporary file next to the target and rename
+it over the target, so a reader or a crash mid-write never sees a partial
+file, and two threads saving the same file do not share a temporary file.
+Both functions raise; owners decide whether a failure is worth a warning.
+"""
+
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+# What a loader catches around read_json and its own decoding of the mapping
+LOAD_ERRORS = (OSError, ValueError, KeyError, TypeError)
+
+
+def read_json(path: Optional[str]) -> Optional[Dict]:
+    """The mapping stored at path, or None when path is unset or the file does not exist
+
+    Raises OSError when the file cannot be read and ValueError when it is not
+    a JSON object.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        state = json.load(f)
+    if not isinstance(state, dict):
+        raise ValueError(f"expected a JSON object, got {type(state).__name__}")
+    return state
+
+
+def write_json(path: str, state: Any, indent: Optional[int] = None) -> None:
+    """Write state to path atomically, creating its directory if needed
+
+    Raises OSError, or TypeError/ValueError for state JSON cannot encode; the
+    temporary file is removed on failure.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or '.', prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f, indent=indent)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Check Tracing
+Timing spans around checks and their sub-steps, and a sampling profiler
+
+span() is a context manager that records how long a block took. Spans nest
+per thread; work handed to a thread pool passes parent=current() so its spans
+land under the check that started it. Every finished span is appended to the
+trace of its root span, which becomes one entry of the JSON run report.
+
+While tracing is disabled span() returns a shared no-op object, so the
+instrumented code pays one function call per span and nothing else.
+"""
+
+import collections
+import itertools
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+_enabled = False
+_local = threading.local()
+_span_ids = itertools.count(1)
+
+
+class _NullSpan:
+    """Stands in for a span while tracing is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """One timed block; the root span of a trace also collects its finished descendants"""
+
+    __slots__ = ('id', 'name', 'attrs', 'parent', 'root', 'records', 'thread',
+                 'started_at', 'start', 'duration', 'error')
+
+    def __init__(self, name: str, attrs: Dict, parent: Optional['Span'] = None):
+        self.id = next(_span_ids)
+        self.name = name
+        self.attrs = attrs
+        self.parent = parent
+        self.root = parent.root if parent is not None else self
+        # Appending is atomic, so pool threads add to the root's list without a lock
+        self.records: Optional[List['Span']] = [] if parent is None else None
+        self.thread = None
+        self.started_at = None
+        self.start = None
+        self.duration = None
+        self.error = None
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        self.thread = threading.current_thread().name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _local.stack.pop()
+        # Spans finishing after their root (a straggler past a deadline) are dropped with it
+        self.root.records.append(self)
+        return False
+
+    def set(self, **attrs) -> None:
+        """Add attributes known only once the block has run (status code, counts, ...)"""
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict:
+        """This root's trace: its timing and every finished span under it, in start order"""
+        origin = self.start
+        spans = sorted(self.records, key=lambda span: span.start)
+        return {
+            'name': self.name,
+            'attrs': self.attrs,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'error': self.error,
+            'spans': [
+                {
+                    'id': span.id,
+                    'parent': span.parent.id if span.parent is not None else None,
+                    'name': span.name,
+                    'attrs': span.attrs,
+                    'thread': span.thread,
+                    'offset_ms': round((span.start - origin) * 1000, 3),
+                    'duration_ms': round(span.duration * 1000, 3),
+                    'error': span.error,
+                }
+                for span in spans if span is not self
+            ],
+        }
+
+
+def enable(enabled: bool = True) -> None:
+    """Turn span recording on or off for the whole process"""
+    global _enabled
+    _enabled = enabled
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def current() -> Optional[Span]:
+    """The innermost open span on this thread, to pass as parent to pool work"""
+    if not _enabled:
+        return None
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+
+def span(name: str, parent: Optional[Span] = None, **attrs):
+    """Context manager timing a block under parent (default: the current span of this thread)"""
+    if not _enabled:
+        return NULL_SPAN
+    return Span(name, attrs, parent if parent is not None else current())
+
+
+def slowest(trace: Dict, count: int = 3) -> List[Dict]:
+    """The slowest spans of a trace that have no children (where the time actually went)"""
+    parents = {entry['parent'] for entry in trace['spans']}
+    leaves = [entry for entry in trace['spans'] if entry['id'] not in parents]
+    return sorted(leaves, key=lambda entry: -entry['duration_ms'])[:count]
+
+
+class SamplingProfiler:
+    """Samples the stack of every thread at a fixed interval
+
+    Unlike cProfile, which only sees the thread it runs on, this shows time
+    spent in pool threads (Docker inspects, probes, stats calls). Output is
+    in the collapsed-stack format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: collections.Counter = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            names.update((thread.ident, thread.name) for thread in threading.enumerate())
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                # Pool threads get numbered names; fold them so their stacks add up
+                thread, _, number = names.get(ident, 'thread').rpartition('_')
+                if not thread or not number.isdigit():
+                    thread = names.get(ident, 'thread')
+                self.stacks[';'.join([thread] + stack[::-1])] += 1
+            self.samples += 1
+
+    def write(self, path: str) -> None:
+        """Write collapsed stacks, one 'frame;frame;... count' line each"""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top(self, count: int = 20) -> List[tuple]:
+        """(frame, samples) of the frames most often on top of a stack"""
+        leaves: collections.Counter = collections.Counter()
+        for stack, samples in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += samples
+        return leaves.most_common(count)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Alert Coalescing
+Collapses repeated notifications into periodic digests during alert storms
+
+Notifications are keyed by (topic, title, tags). The first one in a window
+is forwarded immediately; repeats inside the window are only counted and
+summarized as a single "N× in last M minutes" digest when the window
+closes. The key table is an LRU bounded by max_keys, so memory stays
+constant however long a storm lasts.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+Key = Tuple[str, str, Tuple[str, ...]]
+
+
+def alert_key(topic: str, notification: Dict[str, Any]) -> Key:
+    """Dedup key: topic, title and the (unordered) tag set"""
+    return (topic, notification.get('title') or '', tuple(sorted(notification.get('tags') or [])))
+
+
+class AlertCoalescer:
+    """Keyed dedup window with digest emission and TTL/LRU eviction"""
+
+    def __init__(self, emit_digest: Callable[[str, Dict[str, Any], int, float], None],
+                 window: float = 300.0, max_keys: int = 1000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.emit_digest = emit_digest
+        self.window = window
+        self.max_keys = max_keys
+        self.clock = clock
+        self.suppressed_total = 0
+        self.digests_total = 0
+        self._entries: 'OrderedDict[Key, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def offer(self, topic: str, notification: Dict[str, Any]) -> bool:
+        """Record a notification; True means forward it now, False means it was folded in"""
+        key = alert_key(topic, notification)
+        now = self.clock()
+        evicted = []
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry['window_start'] < self.window:
+                entry['repeats'] += 1
+                entry['last'] = notification
+                self._entries.move_to_end(key)
+                self.suppressed_total += 1
+                return False
+
+            if entry is not None and entry['repeats']:
+                evicted.append((key, entry))
+            self._entries[key] = {'window_start': now, 'repeats': 0, 'last': notification}
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_keys:
+                evicted.append(self._entries.popitem(last=False))
+
+        # Emit outside the lock; pending repeats are never silently discarded
+        for old_key, old_entry in evicted:
+            if old_entry['repeats']:
+                self._emit(old_key, old_entry, now)
+        return True
+
+    def flush_due(self) -> None:
+        """Emit digests for closed windows and evict keys that went quiet"""
+        now = self.clock()
+        due = []
+
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if now - entry['window_start'] < self.window:
+                    continue
+                if entry['repeats']:
+                    due.append((key, dict(entry)))
+                    # Storm still going: start a new window for the next digest
+                    entry['window_start'] = now
+                    entry['repeats'] = 0
+                else:
+                    del self._entries[key]
+
+        for key, entry in due:
+            self._emit(key, entry, now)
+
+    def _emit(self, key: Key, entry: Dict[str, Any], now: float) -> None:
+        self.digests_total += 1
+        elapsed = now - entry['window_start']
+        self.emit_digest(key[0], entry['last'], entry['repeats'], elapsed)
+
+    def start(self, interval: float = 1.0) -> None:
+        """Flush due windows on a background thread"""
+        def run():
+            while not self._stop.wait(interval):
+                self.flush_due()
+
+        self._thread = threading.Thread(target=run, name='alert-coalescer', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flush thread and emit any pending digests"""
+        self._stop.set()
+        now = self.clock()
+        with self._lock:
+            pending = [(key, entry) for key, entry in self._entries.items() if entry['repeats']]
+            self._entries.clear()
+        for key, entry in pending:
+            self._emit(key, entry, now)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Telegram Delivery Queue
+Bounded queue between ntfy intake and Telegram delivery
+
+Workers share one keep-alive session, respect a token bucket sized to
+Telegram's per-chat limits, honor HTTP 429 retry_after and retry other
+transient failures with jittered exponential backoff.
+"""
+
+import logging
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger('ntfy-telegram-forwarder')
+
+# Delivery latency histogram bucket bounds in seconds (enqueue -> Telegram ack)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event: Optional[threading.Event] = None) -> bool:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+class DeliveryMetrics:
+    """Counters, queue depth and a latency histogram for delivery"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {
+            'enqueued': 0,
+            'sent': 0,
+            'failed': 0,
+            'dropped': 0,
+            'retries': 0,
+            'rate_limited': 0,
+        }
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += amount
+
+    def observe_latency(self, seconds: float) -> None:
+        with self._lock:
+            self.latency_count += 1
+            self.latency_sum += seconds
+            self.latency_max = max(self.latency_max, seconds)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    self.latency_buckets[i] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                'latency_count': self.latency_count,
+                'latency_sum': self.latency_sum,
+                'latency_max': self.latency_max,
+                'latency_avg': self.latency_sum / self.latency_count if self.latency_count else 0.0,
+                'latency_buckets': list(zip(LATENCY_BUCKETS, self.latency_buckets)),
+            }
+
+
+def create_telegram_session(pool_size: int = 4) -> requests.Session:
+    """Create a keep-alive session for the Telegram Bot API"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def post_message(session: requests.Session, api_url: str, token: str, chat_id: str,
+                 text: str, timeout: float = 10) -> Tuple[str, Optional[float], str]:
+    """Send one message and classify the outcome
+
+    Returns (status, retry_after, error) where status is 'ok', 'retry'
+    (transient: network error, 429, 5xx) or 'fail' (permanent 4xx).
+    """
+    payload = {
+        'chat_id': chat_id,
+        'text': text,
+        'parse_mode': 'HTML',
+        'disable_web_page_preview': True
+    }
+
+    try:
+        response = session.post(f"{api_url}/bot{token}/sendMessage", json=payload, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        return 'retry', None, str(e)
+
+    if response.status_code == 200:
+        return 'ok', None, ''
+
+    retry_after = None
+    description = f"HTTP {response.status_code}"
+    try:
+        body = response.json()
+        description = body.get('description', description)
+        retry_after = body.get('parameters', {}).get('retry_after')
+    except ValueError:
+        pass
+
+    if response.status_code == 429:
+        if retry_after is None:
+            retry_after = float(response.headers.get('Retry-After', 1))
+        return 'retry', float(retry_after), description
+    if response.status_code >= 500:
+        return 'retry', None, description
+    return 'fail', None, description
+
+
+class DeliveryQueue:
+    """Bounded queue drained by worker threads into the Telegram Bot API"""
+
+    def __init__(self, api_url: str, token: str, chat_id: str, maxsize: int = 1000,
+                 workers: int = 1, rate: float = 1.0, burst: float = 3.0, max_attempts: int = 6,
+                 base_backoff: float = 1.0, max_backoff: float = 60.0, enqueue_timeout: float = 1.0,
+                 on_complete: Optional[Callable[[Dict[str, Any], bool], None]] = None):
+        self.api_url = api_url
+        self.token = token
+        self.chat_id = chat_id
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.enqueue_timeout = enqueue_timeout
+        # Called with (meta, delivered) once a message is sent or given up on
+        self.on_complete = on_complete
+        self.bucket = TokenBucket(rate, burst)
+        self.metrics = DeliveryMetrics()
+        self.session = create_telegram_session(workers)
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._workers_count = workers
+        self._workers: List[threading.Thread] = []
+        self._stop = threading.Event()
+        # A 429 applies to the whole chat, so every worker pauses until this time
+        self._paused_until = 0.0
+        self._pause_lock = threading.Lock()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def alive(self) -> bool:
+        """True while at least one worker thread runs"""
+        return any(worker.is_alive() for worker in self._workers)
+
+    def start(self) -> None:
+        for i in range(self._workers_count):
+            worker = threading.Thread(target=self._work, name=f"telegram-delivery-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, text: str, meta: Optional[Dict[str, Any]] = None) -> bool:
+        """Queue a message; returns False (and counts a drop) if the queue stays full"""
+        item = {'text': text, 'meta': meta or {}, 'enqueued_at': time.time(), 'attempts': 0}
+        try:
+            self._queue.put(item, timeout=self.enqueue_timeout)
+        except queue.Full:
+            self.metrics.incr('dropped')
+            logger.error(f"Delivery queue full ({self._queue.maxsize}), dropping message")
+            return False
+        self.metrics.incr('enqueued')
+        return True
+
+    def stop(self, drain_timeout: float = 10.0) -> None:
+        """Give queued messages up to drain_timeout seconds, then stop workers"""
+        deadline = time.monotonic() + drain_timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stop.set()
+
+    def _pause(self, seconds: float) -> None:
+        with self._pause_lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _wait_if_paused(self) -> bool:
+        while True:
+            with self._pause_lock:
+                remaining = self._paused_until - time.monotonic()
+            if remaining <= 0:
+                return True
+            if self._stop.wait(remaining):
+                return False
+
+    def _backoff(self, attempts: int) -> float:
+        # Full jitter: uniform between 0 and the exponential ceiling
+        ceiling = min(self.max_backoff, self.base_backoff * (2 ** (attempts - 1)))
+        return random.uniform(0, ceiling)
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            try:
+                self._deliver(item)
+            finally:
+                self._queue.task_done()
+
+    def _complete(self, item: Dict[str, Any], delivered: bool) -> None:
+        if self.on_complete is None:
+            return
+        try:
+            self.on_complete(item['meta'], delivered)
+        except Exception as e:
+            logger.error(f"Delivery completion callback failed: {e}")
+
+    def _deliver(self, item: Dict[str, Any]) -> None:
+        while not self._stop.is_set():
+            if not self._wait_if_paused() or not self.bucket.acquire(self._stop):
+                return
+
+            item['attempts'] += 1
+            status, retry_after, error = post_message(
+                self.session, self.api_url, self.token, self.chat_id, item['text']
+            )
+
+            if status == 'ok':
+                self.metrics.incr('sent')
+                self.metrics.observe_latency(time.time() - item['enqueued_at'])
+                logger.info("Message sent to Telegram successfully")
+                self._complete(item, True)
+                return
+
+            if status == 'fail' or item['attempts'] >= self.max_attempts:
+                self.metrics.incr('failed')
+                logger.error(f"Failed to send message to Telegram after {item['attempts']} attempt(s): {error}")
+                self._complete(item, False)
+                return
+
+            self.metrics.incr('retries')
+            if retry_after is not None:
+                self.metrics.incr('rate_limited')
+                logger.warning(f"Telegram rate limit hit, retrying after {retry_after}s")
+                self._pause(retry_after)
+            else:
+                delay = self._backoff(item['attempts'])
+                logger.warning(f"Telegram delivery failed ({error}), retrying in {delay:.1f}s")
+                if self._stop.wait(delay):
+                    return
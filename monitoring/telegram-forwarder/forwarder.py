@@ -8,9 +8,18 @@ import os
 import sys
 import json
 import time
+import random
+import signal
 import logging
+import threading
 import requests
-from typing import Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, List, Optional, Tuple
+
+from coalesce import AlertCoalescer
+from delivery import DeliveryQueue, create_telegram_session, post_message
+from outbox import Outbox
+from telemetry import ForwarderTelemetry, StatusServer
 
 # Configure logging
 logging.basicConfig(
@@ -21,9 +30,46 @@ logger = logging.getLogger('ntfy-telegram-forwarder')
 
 # Configuration from environment variables
 NTFY_URL = os.getenv('NTFY_URL', 'http://oci-ntfy')
-NTFY_TOPICS = os.getenv('NTFY_TOPICS', 'monitoring-alerts').split(',')
+NTFY_TOPICS = [t.strip() for t in os.getenv('NTFY_TOPICS', 'monitoring-alerts').split(',') if t.strip()]
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+
+# ntfy sends a keepalive every 45s by default; a silent stream past this is stalled
+NTFY_READ_TIMEOUT = float(os.getenv('NTFY_READ_TIMEOUT', '90'))
+RECONNECT_MIN_DELAY = float(os.getenv('RECONNECT_MIN_DELAY', '1'))
+RECONNECT_MAX_DELAY = float(os.getenv('RECONNECT_MAX_DELAY', '60'))
+
+# Telegram delivery: one message/second per chat with a small burst (Bot API limits)
+DELIVERY_QUEUE_SIZE = int(os.getenv('DELIVERY_QUEUE_SIZE', '1000'))
+DELIVERY_WORKERS = int(os.getenv('DELIVERY_WORKERS', '1'))
+TELEGRAM_RATE_PER_SECOND = float(os.getenv('TELEGRAM_RATE_PER_SECOND', '1'))
+TELEGRAM_BURST = float(os.getenv('TELEGRAM_BURST', '3'))
+DELIVERY_MAX_ATTEMPTS = int(os.getenv('DELIVERY_MAX_ATTEMPTS', '6'))
+METRICS_LOG_INTERVAL = float(os.getenv('METRICS_LOG_INTERVAL', '300'))
+
+# Storm coalescing: repeats of (topic, title, tags) within the window become one digest
+DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+DEDUP_WINDOW = float(os.getenv('DEDUP_WINDOW', '300'))
+DEDUP_MAX_KEYS = int(os.getenv('DEDUP_MAX_KEYS', '1000'))
+
+# Durable outbox and per-topic resume cursor (replayed with since=<id> on reconnect)
+OUTBOX_ENABLED = os.getenv('OUTBOX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+OUTBOX_DIR = os.getenv('OUTBOX_DIR', '/app/data')
+OUTBOX_COMMIT_INTERVAL = float(os.getenv('OUTBOX_COMMIT_INTERVAL', '0.2'))
+
+# /healthz and /metrics; a stream with no event for HEALTH_STALE_AFTER seconds is unhealthy
+STATUS_ENABLED = os.getenv('STATUS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+STATUS_HOST = os.getenv('STATUS_HOST', '0.0.0.0')
+STATUS_PORT = int(os.getenv('STATUS_PORT', '9106'))
+HEALTH_STALE_AFTER = float(os.getenv('HEALTH_STALE_AFTER', str(NTFY_READ_TIMEOUT)))
+
+# Shared keep-alive session for direct sends and the delivery queue (set up in main)
+telegram_session = create_telegram_session()
+delivery_queue: Optional[DeliveryQueue] = None
+coalescer: Optional[AlertCoalescer] = None
+outbox: Optional[Outbox] = None
+telemetry: Optional[ForwarderTelemetry] = None
 
 # Priority emoji mapping
 PRIORITY_EMOJI = {
@@ -105,73 +151,269 @@ def format_message(notification: Dict[str, Any]) -> str:
     return '\n'.join(message_parts)
 
 
-def send_to_telegram(message: str) -> bool:
-    """Send message to Telegram"""
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+def format_digest(topic: str, notification: Dict[str, Any], repeats: int, elapsed: float) -> str:
+    """Format a storm digest for repeats folded into one alert"""
+    minutes = max(1, round(elapsed / 60))
+    digest = dict(notification)
+    digest['topic'] = topic
+    digest['message'] = (
+        f"🔁 Repeated {repeats}× in last {minutes} minutes\n\n"
+        f"Latest: {notification.get('message', 'No message')}"
+    )
+    return format_message(digest)
 
-    payload = {
-        'chat_id': TELEGRAM_CHAT_ID,
-        'text': message,
-        'parse_mode': 'HTML',
-        'disable_web_page_preview': True
-    }
 
-    try:
-        response = requests.post(url, json=payload, timeout=10)
-        response.raise_for_status()
+def send_to_telegram(message: str) -> bool:
+    """Send message to Telegram directly (bypassing the delivery queue)"""
+    status, _, error = post_message(
+        telegram_session, TELEGRAM_API_URL, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, message
+    )
+    if status == 'ok':
         logger.info(f"Message sent to Telegram successfully")
         return True
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Failed to send message to Telegram: {e}")
-        return False
 
+    logger.error(f"Failed to send message to Telegram: {error}")
+    return False
+
+
+def create_outbox() -> Outbox:
+    """Open the durable outbox and start its group commits"""
+    global outbox
+    outbox = Outbox(OUTBOX_DIR, commit_interval=OUTBOX_COMMIT_INTERVAL)
+    outbox.start()
+    return outbox
+
+
+def on_delivery_complete(meta: Dict[str, Any], delivered: bool) -> None:
+    """Acknowledge a message in the outbox once it is sent or given up on"""
+    if outbox is not None and meta.get('id'):
+        outbox.ack(meta['id'])
+    if telemetry is not None:
+        # Only live messages carry their ntfy time; digests and replays would skew the histogram
+        telemetry.delivered(meta.get('topic', 'unknown'), delivered, meta.get('time'))
+
+
+def replay_outbox() -> None:
+    """Re-queue messages recorded before a restart but never delivered"""
+    if outbox is None:
+        return
+    pending = outbox.pending()
+    if pending:
+        logger.info(f"Replaying {len(pending)} undelivered message(s) from the outbox")
+    for record in pending:
+        deliver(record['text'], {'topic': record['topic'], 'id': record['id']})
+
+
+def create_delivery_queue() -> DeliveryQueue:
+    """Create and start the rate-limited delivery queue"""
+    global delivery_queue
+    delivery_queue = DeliveryQueue(
+        TELEGRAM_API_URL,
+        TELEGRAM_BOT_TOKEN,
+        TELEGRAM_CHAT_ID,
+        maxsize=DELIVERY_QUEUE_SIZE,
+        workers=DELIVERY_WORKERS,
+        rate=TELEGRAM_RATE_PER_SECOND,
+        burst=TELEGRAM_BURST,
+        max_attempts=DELIVERY_MAX_ATTEMPTS,
+        on_complete=on_delivery_complete
+    )
+    delivery_queue.start()
+    return delivery_queue
+
+
+def create_coalescer() -> AlertCoalescer:
+    """Create and start the alert storm coalescer"""
+    global coalescer
+
+    def emit_digest(topic, notification, repeats, elapsed):
+        logger.info(f"Sending digest for '{topic}': {repeats} repeat(s) of '{notification.get('title', '')}'")
+        deliver(format_digest(topic, notification, repeats, elapsed), {'topic': topic, 'digest': True})
+
+    coalescer = AlertCoalescer(emit_digest, window=DEDUP_WINDOW, max_keys=DEDUP_MAX_KEYS)
+    coalescer.start()
+    return coalescer
+
+
+def deliver(telegram_message: str, meta: Dict[str, Any]) -> None:
+    """Hand a formatted message to the delivery queue, or send it directly without one"""
+    if delivery_queue is not None:
+        delivery_queue.submit(telegram_message, meta)
+    else:
+        delivered = send_to_telegram(telegram_message)
+        on_delivery_complete(meta, delivered)
+
+
+def log_delivery_metrics() -> None:
+    """Log queue depth and delivery latency"""
+    if delivery_queue is None:
+        return
+    stats = delivery_queue.metrics.snapshot()
+    logger.info(
+        f"Delivery: depth={delivery_queue.depth} sent={stats['sent']} failed={stats['failed']} "
+        f"dropped={stats['dropped']} retries={stats['retries']} rate_limited={stats['rate_limited']} "
+        f"latency_avg={stats['latency_avg']:.2f}s latency_max={stats['latency_max']:.2f}s"
+        + (f" coalesced={coalescer.suppressed_total} digests={coalescer.digests_total}" if coalescer else "")
+    )
 
-def subscribe_to_ntfy(topic: str):
-    """Subscribe to ntfy topic and forward messages"""
-    url = f"{NTFY_URL}/{topic}/json"
 
-    logger.info(f"Subscribing to {url}")
+def create_telemetry() -> ForwarderTelemetry:
+    """Create the per-topic stream state and counters behind /healthz and /metrics"""
+    global telemetry
+    telemetry = ForwarderTelemetry(NTFY_TOPICS, stale_after=HEALTH_STALE_AFTER)
+    return telemetry
+
+
+def backlog() -> Dict[str, int]:
+    """Messages waiting to be sent (queue) and recorded but not yet acknowledged (outbox)"""
+    depths = {}
+    if delivery_queue is not None:
+        depths['queue'] = delivery_queue.depth
+    if outbox is not None:
+        depths['outbox'] = outbox.depth
+    return depths
+
+
+def health_status() -> Tuple[bool, Dict[str, Any]]:
+    """(healthy, body) for /healthz"""
+    return telemetry.status(backlog(), delivery_queue.alive if delivery_queue is not None else True)
+
+
+def metrics_body() -> bytes:
+    """Prometheus text for /metrics"""
+    return telemetry.render(backlog(), delivery_queue.metrics.snapshot() if delivery_queue is not None else None)
+
+
+def create_status_server() -> Optional[StatusServer]:
+    """Serve /healthz and /metrics; the forwarder keeps running if the port is taken"""
+    server = StatusServer(health_status, metrics_body, host=STATUS_HOST, port=STATUS_PORT)
+    try:
+        server.start()
+    except OSError as e:
+        logger.error(f"Could not serve /healthz and /metrics on {STATUS_HOST}:{STATUS_PORT}: {e}")
+        return None
+    return server
+
+
+def create_ntfy_session(pool_size: int) -> requests.Session:
+    """Create a session whose connection pool holds one stream per topic"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def handle_notification(topic: str, notification: Dict[str, Any]) -> None:
+    """Forward one ntfy message event to Telegram"""
+    msg_id = notification.get('id')
+
+    # A resumed stream can replay messages that were already handled
+    if outbox is not None and outbox.seen(msg_id):
+        logger.debug(f"Skipping already handled message {msg_id} on '{topic}'")
+        return
+
+    logger.info(f"Received notification from topic '{topic}': {notification.get('message', '')[:50]}")
+    if telemetry is not None:
+        telemetry.received(topic)
+
+    # Repeats inside the dedup window are folded into a later digest
+    if coalescer is not None and not coalescer.offer(topic, notification):
+        logger.debug(f"Coalesced repeat on '{topic}': {notification.get('title', '')}")
+        if telemetry is not None:
+            telemetry.coalesced(topic)
+        if outbox is not None and msg_id:
+            outbox.skip(topic, msg_id)
+        return
+
+    # Record durably, then hand off to the delivery queue so a slow Telegram API never stalls the stream
+    telegram_message = format_message(notification)
+    if outbox is not None and msg_id:
+        outbox.add(topic, msg_id, telegram_message)
+    deliver(telegram_message, {'topic': topic, 'id': msg_id, 'time': notification.get('time')})
+
+
+def subscribe_to_ntfy(topic: str, session: Optional[requests.Session] = None,
+                      stop_event: Optional[threading.Event] = None):
+    """Subscribe to ntfy topic and forward messages
+
+    Reconnects with jittered exponential backoff that is tracked per topic,
+    so one failing topic never delays the others.
+    """
+    base_url = f"{NTFY_URL}/{topic}/json"
+    session = session or requests.Session()
+    stop_event = stop_event or threading.Event()
+    delay = RECONNECT_MIN_DELAY
+
+    logger.info(f"Subscribing to {base_url}")
+
+    while not stop_event.is_set():
+        # Resume after the last durably recorded message so nothing published during the gap is lost
+        since = outbox.cursor(topic) if outbox is not None else None
+        url = f"{base_url}?since={since}" if since else base_url
 
-    while True:
         try:
-            response = requests.get(url, stream=True, timeout=None)
+            response = session.get(url, stream=True, timeout=(10, NTFY_READ_TIMEOUT))
             response.raise_for_status()
+            delay = RECONNECT_MIN_DELAY
+            if telemetry is not None:
+                telemetry.connected(topic)
 
             for line in response.iter_lines():
+                if stop_event.is_set():
+                    break
                 if line:
                     try:
                         notification = json.loads(line.decode('utf-8'))
+                        if telemetry is not None:
+                            telemetry.event(topic)
 
                         # Skip keepalive messages
                         if notification.get('event') == 'keepalive':
-                            logger.debug("Received keepalive")
+                            logger.debug(f"Received keepalive on '{topic}'")
                             continue
 
                         # Process message events
                         if notification.get('event') == 'message':
-                            logger.info(f"Received notification from topic '{topic}': {notification.get('message', '')[:50]}")
-
-                            # Format and send to Telegram
-                            telegram_message = format_message(notification)
-                            send_to_telegram(telegram_message)
+                            handle_notification(topic, notification)
 
                     except json.JSONDecodeError as e:
-                        logger.error(f"Failed to parse notification: {e}")
+                        logger.error(f"Failed to parse notification on '{topic}': {e}")
                         continue
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Connection error: {e}")
-            logger.info("Reconnecting in 5 seconds...")
-            time.sleep(5)
+            response.close()
 
-        except KeyboardInterrupt:
-            logger.info("Shutting down...")
-            sys.exit(0)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Connection error on '{topic}': {e}")
 
         except Exception as e:
-            logger.error(f"Unexpected error: {e}")
-            logger.info("Reconnecting in 5 seconds...")
-            time.sleep(5)
+            logger.error(f"Unexpected error on '{topic}': {e}")
+
+        if stop_event.is_set():
+            break
+
+        if telemetry is not None:
+            telemetry.disconnected(topic)
+        wait = delay * random.uniform(0.5, 1.5)
+        logger.info(f"Reconnecting to '{topic}' in {wait:.1f} seconds...")
+        stop_event.wait(wait)
+        delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+
+def start_subscribers(topics: List[str], stop_event: threading.Event) -> List[threading.Thread]:
+    """Start one subscriber thread per topic, all sharing one connection pool"""
+    session = create_ntfy_session(len(topics))
+    threads = []
+    for topic in topics:
+        thread = threading.Thread(
+            target=subscribe_to_ntfy,
+            args=(topic, session, stop_event),
+            name=f"ntfy-{topic}",
+            daemon=True
+        )
+        thread.start()
+        threads.append(thread)
+    return threads
 
 
 def test_telegram_connection():
@@ -203,16 +445,49 @@ def main():
     # Test Telegram connection
     test_telegram_connection()
 
-    # For now, subscribe to the first topic
-    # In the future, we can handle multiple topics with threads
-    if NTFY_TOPICS:
-        topic = NTFY_TOPICS[0].strip()
-        logger.info(f"Starting subscription to topic: {topic}")
-        subscribe_to_ntfy(topic)
-    else:
+    if not NTFY_TOPICS:
         logger.error("No topics configured")
         sys.exit(1)
 
+    stop_event = threading.Event()
+
+    def handle_signal(signum, frame):
+        logger.info("Shutting down...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    create_telemetry()
+    if OUTBOX_ENABLED:
+        create_outbox()
+    create_delivery_queue()
+    if DEDUP_ENABLED:
+        create_coalescer()
+    status_server = create_status_server() if STATUS_ENABLED else None
+    replay_outbox()
+
+    logger.info(f"Starting subscriptions to topics: {', '.join(NTFY_TOPICS)}")
+    threads = start_subscribers(NTFY_TOPICS, stop_event)
+
+    # Subscriber threads are daemons; blocked reads end with the process
+    last_metrics_log = time.monotonic()
+    while not stop_event.is_set() and any(t.is_alive() for t in threads):
+        stop_event.wait(1)
+        if time.monotonic() - last_metrics_log >= METRICS_LOG_INTERVAL:
+            log_delivery_metrics()
+            last_metrics_log = time.monotonic()
+
+    if coalescer is not None:
+        coalescer.stop()
+    delivery_queue.stop()
+    if outbox is not None:
+        outbox.stop()
+    if status_server is not None:
+        status_server.stop()
+    log_delivery_metrics()
+    sys.exit(0)
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Durable Outbox
+Append-only on-disk log of alerts plus a per-topic ntfy resume cursor
+
+Every forwarded ntfy message is appended to the outbox before delivery and
+acknowledged once Telegram accepts it. Writes are buffered and made durable
+by a group commit (write + fsync) every commit_interval seconds; the cursor
+(last durably recorded ntfy message id per topic) only advances with that
+commit. After a restart, unacknowledged entries are replayed and each topic
+resumes with since=<cursor>. Message ids are remembered so a replayed
+stream never delivers the same message twice.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger('ntfy-telegram-forwarder')
+
+
+class Outbox:
+    """Group-committed outbox with ntfy cursors and message id dedup"""
+
+    def __init__(self, directory: str, commit_interval: float = 0.2, seen_limit: int = 10000,
+                 compact_bytes: int = 4 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.log_path = os.path.join(directory, 'outbox.log')
+        self.cursor_path = os.path.join(directory, 'cursor.json')
+        self.commit_interval = commit_interval
+        self.seen_limit = seen_limit
+        self.compact_bytes = compact_bytes
+
+        self.cursors: Dict[str, str] = {}
+        self.commits = 0
+        self._pending: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._seen: 'OrderedDict[str, None]' = OrderedDict()
+        self._buffer: List[str] = []
+        self._buffer_cursors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._load()
+        self._compact()
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+
+    def _load(self) -> None:
+        if os.path.exists(self.cursor_path):
+            try:
+                with open(self.cursor_path, 'r', encoding='utf-8') as f:
+                    self.cursors = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not read ntfy cursor, resuming without it: {e}")
+
+        if not os.path.exists(self.log_path):
+            return
+
+        with open(self.log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write; everything before it is intact
+                    continue
+                msg_id = record.get('id')
+                if record.get('op') == 'add':
+                    self._pending[msg_id] = record
+                    self._remember(msg_id)
+                elif record.get('op') == 'ack':
+                    self._pending.pop(msg_id, None)
+                elif record.get('op') == 'seen':
+                    self._remember(msg_id)
+
+    def _remember(self, msg_id: str) -> None:
+        self._seen[msg_id] = None
+        self._seen.move_to_end(msg_id)
+        while len(self._seen) > self.seen_limit:
+            self._seen.popitem(last=False)
+
+    def _compact(self) -> None:
+        """Rewrite the log with only pending entries and recently seen ids"""
+        tmp_path = f"{self.log_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for msg_id in self._seen:
+                if msg_id not in self._pending:
+                    f.write(json.dumps({'op': 'seen', 'id': msg_id}) + '\n')
+            for record in self._pending.values():
+                f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.log_path)
+
+    def seen(self, msg_id: Optional[str]) -> bool:
+        """True if this ntfy message id was already recorded (replayed stream)"""
+        with self._lock:
+            return msg_id is not None and msg_id in self._seen
+
+    def cursor(self, topic: str) -> Optional[str]:
+        """Last durably recorded ntfy message id for a topic"""
+        with self._lock:
+            return self.cursors.get(topic)
+
+    def add(self, topic: str, msg_id: str, text: str) -> None:
+        """Record a message that is about to be delivered"""
+        record = {'op': 'add', 'id': msg_id, 'topic': topic, 'text': text, 'ts': time.time()}
+        with self._lock:
+            self._pending[msg_id] = record
+            self._remember(msg_id)
+            self._buffer.append(json.dumps(record))
+            self._buffer_cursors[topic] = msg_id
+
+    def skip(self, topic: str, msg_id: str) -> None:
+        """Record a message that was handled without delivery (e.g. coalesced)"""
+        with self._lock:
+            self._remember(msg_id)
+            self._buffer.append(json.dumps({'op': 'seen', 'id': msg_id}))
+            self._buffer_cursors[topic] = msg_id
+
+    def ack(self, msg_id: str) -> None:
+        """Mark a message as delivered (or permanently failed)"""
+        with self._lock:
+            if self._pending.pop(msg_id, None) is not None:
+                self._buffer.append(json.dumps({'op': 'ack', 'id': msg_id}))
+
+    @property
+    def depth(self) -> int:
+        """Entries recorded but not yet acknowledged"""
+        with self._lock:
+            return len(self._pending)
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Entries recorded but not yet acknowledged, oldest first"""
+        with self._lock:
+            return list(self._pending.values())
+
+    def flush(self) -> None:
+        """Group commit: write and fsync buffered records, then advance cursors"""
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+            cursors, self._buffer_cursors = self._buffer_cursors, {}
+
+        if not lines:
+            return
+
+        self._log.write('\n'.join(lines) + '\n')
+        self._log.flush()
+        os.fsync(self._log.fileno())
+
+        with self._lock:
+            self.cursors.update(cursors)
+            snapshot = dict(self.cursors)
+        tmp_path = f"{self.cursor_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.cursor_path)
+        self.commits += 1
+
+        if self._log.tell() > self.compact_bytes:
+            with self._lock:
+                self._log.close()
+                self._compact()
+                self._log = open(self.log_path, 'a', encoding='utf-8')
+
+    def start(self) -> None:
+        """Run group commits on a background thread"""
+        def run():
+            while not self._stop.wait(self.commit_interval):
+                try:
+                    self.flush()
+                except OSError as e:
+                    logger.error(f"Outbox commit failed: {e}")
+
+        self._thread = threading.Thread(target=run, name='outbox-commit', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop group commits after a final flush"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+        self._log.close()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Forwarder Telemetry
+Per-topic stream state and counters, served on /healthz and /metrics
+
+Subscriber threads record connects, reconnects and every event their stream
+delivers (open, keepalive, message); delivery completions record what was
+sent per topic and the time from ntfy's `time` to the Telegram ack. ntfy
+timestamps have one-second resolution, so that histogram starts at 1s.
+
+/healthz answers 200 while every topic's stream is connected and has shown
+an event within stale_after seconds (ntfy sends a keepalive every 45s), and
+503 otherwise; the JSON body also carries backlog depth and counters for
+HealthChecker. /metrics renders the Prometheus text format on each scrape;
+there are only a few series per topic.
+"""
+
+import bisect
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger('ntfy-telegram-forwarder')
+
+# ntfy `time` -> Telegram ack histogram bucket bounds in seconds
+END_TO_END_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300, 900, 3600)
+
+# DeliveryMetrics counters exported as forwarder_delivery_<name>_total: (counter, help)
+DELIVERY_COUNTERS = [
+    ('enqueued', 'Messages handed to the delivery queue'),
+    ('dropped', 'Messages dropped because the delivery queue stayed full'),
+    ('retries', 'Telegram send attempts that were retried'),
+    ('rate_limited', 'Telegram 429 responses'),
+]
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class TopicState:
+    """Stream state and counters of one ntfy topic"""
+
+    __slots__ = ('connected', 'connected_at', 'last_event', 'reconnects', 'received', 'coalesced', 'sent', 'failed')
+
+    def __init__(self):
+        self.connected = False
+        self.connected_at: Optional[float] = None
+        self.last_event: Optional[float] = None
+        self.reconnects = 0
+        self.received = 0
+        self.coalesced = 0
+        self.sent = 0
+        self.failed = 0
+
+
+class ForwarderTelemetry:
+    """Thread-safe topic states plus the end-to-end delivery histogram"""
+
+    def __init__(self, topics: Iterable[str], stale_after: float = 90):
+        self.stale_after = stale_after
+        self.started = time.time()
+        self.topics: Dict[str, TopicState] = {topic: TopicState() for topic in topics}
+        self.end_to_end_buckets = [0] * len(END_TO_END_BUCKETS)
+        self.end_to_end_count = 0
+        self.end_to_end_sum = 0.0
+        self._lock = threading.Lock()
+
+    def _topic(self, topic: str) -> TopicState:
+        # Replays from an outbox written under an older NTFY_TOPICS can carry other topics
+        state = self.topics.get(topic)
+        if state is None:
+            state = self.topics[topic] = TopicState()
+        return state
+
+    def connected(self, topic: str) -> None:
+        now = time.time()
+        with self._lock:
+            state = self._topic(topic)
+            state.connected, state.connected_at, state.last_event = True, now, now
+
+    def disconnected(self, topic: str) -> None:
+        """The stream ended or failed; the subscriber is about to reconnect"""
+        with self._lock:
+            state = self._topic(topic)
+            state.connected = False
+            state.reconnects += 1
+
+    def event(self, topic: str) -> None:
+        """Any event (open, keepalive, message) proves the stream is alive"""
+        with self._lock:
+            self._topic(topic).last_event = time.time()
+
+    def received(self, topic: str) -> None:
+        with self._lock:
+            self._topic(topic).received += 1
+
+    def coalesced(self, topic: str) -> None:
+        with self._lock:
+            self._topic(topic).coalesced += 1
+
+    def delivered(self, topic: str, delivered: bool, ntfy_time: Optional[float] = None) -> None:
+        """Count a finished delivery; ntfy_time (the message's ntfy timestamp) feeds the histogram"""
+        with self._lock:
+            state = self._topic(topic)
+            if not delivered:
+                state.failed += 1
+                return
+            state.sent += 1
+            if ntfy_time is None:
+                return
+            seconds = max(0.0, time.time() - ntfy_time)
+            index = bisect.bisect_left(END_TO_END_BUCKETS, seconds)
+            if index < len(self.end_to_end_buckets):
+                self.end_to_end_buckets[index] += 1
+            self.end_to_end_count += 1
+            self.end_to_end_sum += seconds
+
+    def status(self, backlog: Dict[str, int], delivery_alive: bool) -> Tuple[bool, Dict[str, Any]]:
+        """(healthy, /healthz body); backlog maps stages to their depth"""
+        now = time.time()
+        problems = []
+        topics = {}
+        with self._lock:
+            for topic, state in self.topics.items():
+                age = now - state.last_event if state.last_event is not None else None
+                if not state.connected:
+                    problems.append(f"{topic}: stream disconnected")
+                elif age is not None and age > self.stale_after:
+                    problems.append(f"{topic}: no keepalive for {age:.0f}s")
+                topics[topic] = {
+                    'connected': state.connected,
+                    'connected_for': now - state.connected_at if state.connected else None,
+                    'keepalive_age': age,
+                    'reconnects': state.reconnects,
+                    'received': state.received,
+                    'coalesced': state.coalesced,
+                    'sent': state.sent,
+                    'failed': state.failed,
+                }
+        if not delivery_alive:
+            problems.append("delivery workers stopped")
+
+        return not problems, {
+            'status': 'ok' if not problems else 'unhealthy',
+            'problems': problems,
+            'uptime': now - self.started,
+            'topics': topics,
+            'backlog': backlog,
+        }
+
+    def render(self, backlog: Dict[str, int], delivery: Optional[Dict[str, Any]] = None) -> bytes:
+        """Prometheus text body; delivery is DeliveryMetrics.snapshot() (enqueue -> ack latency)"""
+        now = time.time()
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+        def histogram(name: str, help_text: str, buckets: Iterable[Tuple[float, int]],
+                      count: int, total: float, cumulative: bool = False) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            running = 0
+            for bound, bucket in buckets:
+                running = bucket if cumulative else running + bucket
+                lines.append(f"{name}_bucket{format_labels({'le': format_value(bound)})} {running}")
+            lines.append(f"{name}_bucket{format_labels({'le': '+Inf'})} {count}")
+            lines.append(f"{name}_count {count}")
+            lines.append(f"{name}_sum {format_value(total)}")
+
+        with self._lock:
+            topics = list(self.topics.items())
+            metric('forwarder_messages_received_total', 'counter', 'ntfy messages received per topic',
+                   [({'topic': topic}, state.received) for topic, state in topics])
+            metric('forwarder_messages_coalesced_total', 'counter', 'Repeats folded into storm digests per topic',
+                   [({'topic': topic}, state.coalesced) for topic, state in topics])
+            metric('forwarder_messages_sent_total', 'counter', 'Messages acknowledged by Telegram per topic',
+                   [({'topic': topic}, state.sent) for topic, state in topics])
+            metric('forwarder_messages_failed_total', 'counter', 'Messages Telegram never accepted per topic',
+                   [({'topic': topic}, state.failed) for topic, state in topics])
+            metric('forwarder_reconnects_total', 'counter', 'ntfy stream reconnects per topic',
+                   [({'topic': topic}, state.reconnects) for topic, state in topics])
+            metric('forwarder_stream_connected', 'gauge', 'Whether the ntfy stream of the topic is connected',
+                   [({'topic': topic}, 1 if state.connected else 0) for topic, state in topics])
+            metric('forwarder_keepalive_age_seconds', 'gauge',
+                   'Seconds since the last event (open, keepalive or message) on the stream of the topic',
+                   [({'topic': topic}, now - state.last_event) for topic, state in topics
+                    if state.last_event is not None])
+            histogram('forwarder_end_to_end_seconds', 'Time from the ntfy message time to the Telegram ack',
+                      zip(END_TO_END_BUCKETS, self.end_to_end_buckets), self.end_to_end_count, self.end_to_end_sum)
+
+        metric('forwarder_backlog', 'gauge', 'Messages waiting per stage (queue: to send, outbox: not yet acked)',
+               [({'stage': stage}, depth) for stage, depth in backlog.items()])
+        if delivery:
+            for counter, help_text in DELIVERY_COUNTERS:
+                metric(f"forwarder_delivery_{counter}_total", 'counter', help_text, [({}, delivery[counter])])
+            histogram('forwarder_delivery_latency_seconds', 'Time from enqueue to the Telegram ack',
+                      delivery['latency_buckets'], delivery['latency_count'], delivery['latency_sum'],
+                      cumulative=True)
+        metric('forwarder_uptime_seconds', 'gauge', 'Seconds since the forwarder started', [({}, now - self.started)])
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class StatusServer:
+    """Embedded HTTP server for GET /healthz and GET /metrics"""
+
+    def __init__(self, health: Callable[[], Tuple[bool, Dict[str, Any]]], metrics: Callable[[], bytes],
+                 host: str = '0.0.0.0', port: int = 9106):
+        self.health = health
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> None:
+        """Serve on a background thread"""
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='status-server', daemon=True).start()
+        logger.info(f"Serving /healthz and /metrics on {self.host}:{self._server.server_address[1]}")
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                try:
+                    if path == '/healthz':
+                        healthy, status = server.health()
+                        code, content_type = (200 if healthy else 503), 'application/json'
+                        body = json.dumps(status).encode('utf-8')
+                    elif path == '/metrics':
+                        code, content_type, body = 200, PROMETHEUS_CONTENT_TYPE, server.metrics()
+                    else:
+                        self.send_error(404)
+                        return
+                except Exception as e:
+                    logger.error(f"Status request {path} failed: {e}")
+                    self.send_error(500)
+                    return
+
+                self.send_response(code)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler